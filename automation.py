@@ -1,44 +1,93 @@
 import time
 import os
-import schedule
+import argparse
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
-from blocks_download import MainBlockProcessor, FileManager, BlockTimestampFinder, EtherAPI
+from blocks_download import MainBlockProcessor, FileManager, BlockTimestampFinder, EtherAPI, BlockService, BlockDownloader
+from blocks_stream import HeadWatcher, ConfirmationWindow
 from config import Config
 import blocks_extractor
 import wallets_update
 import database_tool
 import blocks_remover
+import balance_ledger
 from logger import logger
+from metrics import metrics, MetricsServer
+from profiler import StageProfiler, create_profiler, add_profile_arguments, apply_profile_arguments
 from error_handler import ErrorHandler, CustomProcessingError
 
 
 @ErrorHandler.ehdc()
 class TaskScheduler:
-    def __init__(self, block_processor, update_interval, check_interrupt=None):
+    def __init__(self, block_processor, update_interval, check_interrupt=None, head_watcher=None,
+                 interrupt_poll_interval=1.0, metrics_file=None, metrics_server=None):
         self.block_processor = block_processor
         self.update_interval = update_interval
         self.check_interrupt = check_interrupt or (lambda: False)
+        self.head_watcher = head_watcher
+        self.interrupt_poll_interval = interrupt_poll_interval
+        self.metrics_file = metrics_file
+        self.metrics_server = metrics_server
         self.is_running = False
+        self.wake_event = threading.Event()
+        self.stop_requested = False
+        self.next_run_time = None
 
 
     def run(self):                           
         self.schedule_regular_updates()
-        while True:            
-            if self.check_interrupt():
-                logger.info("Automation process stopped by user")
-                self.clear_scheduled_tasks() 
-                break 
 
-            schedule.run_pending()          
-            self.print_scheduled_jobs()  
-            time.sleep(1)  
+        if self.head_watcher:
+            self.head_watcher.start(on_new_head=self.trigger)
+
+        if self.metrics_server:
+            self.metrics_server.start()
+
+        try:
+            while True:
+                if self.stop_requested or self.check_interrupt():
+                    logger.info("Automation process stopped by user")
+                    self.clear_scheduled_tasks()
+                    break
+
+                if self.wake_event.is_set() or time.monotonic() >= self.next_run_time:
+                    self.wake_event.clear()
+                    self.run_task()
+                    self.schedule_regular_updates()
+
+                self.wait_for_next_event()
+
+        finally:
+            if self.head_watcher:
+                self.head_watcher.stop()
+            if self.metrics_server:
+                self.metrics_server.stop()
+            self.block_processor.shutdown()
+            database_tool.DatabaseManager.close_shared()
+
+
+    def wait_for_next_event(self):
+        # check_interrupt is a plain callable, so it is re-checked at most every interrupt_poll_interval #
+        time_to_deadline = max(0.0, self.next_run_time - time.monotonic())
+        self.wake_event.wait(min(time_to_deadline, self.interrupt_poll_interval))
+
+
+    def trigger(self, block_number=None):
+        if block_number is not None:
+            logger.debug(f"New head {block_number}, waking scheduler")
+        self.wake_event.set()
+
+
+    def stop(self):
+        self.stop_requested = True
+        self.wake_event.set()
 
 
     def schedule_regular_updates(self):
-        logger.info("Scheduling regular updates.")
-        self.clear_scheduled_tasks()                  
-        schedule.every(self.update_interval).minutes.do(self.run_task)
+        self.next_run_time = time.monotonic() + self.update_interval * 60
+        self.print_scheduled_jobs()
 
 
     def run_task(self):       
@@ -47,6 +96,8 @@ class TaskScheduler:
             return
 
         self.is_running = True
+        # the registry is cumulative (it is also served to Prometheus), the run summary is the change since here #
+        run_metrics_state = metrics.export_state()
         
         try:
             self.block_processor.run_sequential_processing()
@@ -57,18 +108,26 @@ class TaskScheduler:
         finally:
             logger.debug("Task ended")
             self.is_running = False
+            self.report_metrics(run_metrics_state)
+
+
+    def report_metrics(self, run_metrics_state=None):
+        for line in metrics.summary(since=run_metrics_state):
+            logger.info(f"Metric {line}")
+
+        if self.metrics_file:
+            metrics.dump(self.metrics_file)
 
             
     def clear_scheduled_tasks(self):
         logger.debug("Clearing scheduling tasks")
-        schedule.clear()
+        self.next_run_time = None
+        self.wake_event.clear()
 
 
     def print_scheduled_jobs(self):
-        jobs = schedule.get_jobs()
-        logger.debug(f"number of scheduled jobs: {len(jobs)}")
-        for job in jobs:
-            logger.debug(f"Job: {job} - Time interval: {job.interval} {job.unit} - Last time activated: {job.last_run}")
+        seconds_left = max(0.0, self.next_run_time - time.monotonic())
+        logger.debug(f"Next update in {seconds_left:.1f}s (interval: {self.update_interval} minutes)")
 
 
 @ErrorHandler.ehd()
@@ -81,7 +140,8 @@ class BlockProcessor:
                  data_processor,
                  start_date,
                  progress_callback=None,
-                 check_interrupt=None):
+                 check_interrupt=None,
+                 profiler=None):
     
         self.config = config
         self.progress_manager = progress_manager
@@ -91,6 +151,7 @@ class BlockProcessor:
         self.start_date = start_date                
         self.progress_callback = progress_callback or (lambda *args, **kwargs: None)
         self.check_interrupt = check_interrupt or (lambda: False)              
+        self.profiler = profiler or StageProfiler(None, enabled=False)
 
 
     def run_sequential_processing(self):                        
@@ -108,7 +169,8 @@ class BlockProcessor:
             logger.info(f"Initializing progress for date: {target_date}")
             first_block = self.block_timestamp_finder.get_timestamp_of_first_block_on_target_date(target_date)
             last_block = self.block_timestamp_finder.get_timestamp_of_last_block_on_target_date(target_date)
-            self.progress_manager.create_date_progress(target_date, first_block, last_block)
+            task_names = [task["name"] for task in self.data_processor.build_task_graph()]
+            self.progress_manager.create_date_progress(target_date, first_block, last_block, task_names)
 
 
     def process_remaining_tasks(self, target_date):
@@ -121,7 +183,8 @@ class BlockProcessor:
 
     def process_unfetched_blocks(self, target_date):
         if not self.progress_manager.is_block_fetching_complete(target_date):
-            self.block_fetcher.start_block_fetching(target_date)
+            with self.profiler.profile("blocks_fetched", target_date):
+                self.block_fetcher.start_block_fetching(target_date)
 
         if not self.progress_manager.is_today(target_date):                     
             self.progress_manager.update_task_progress(target_date, task_name="blocks_fetched")
@@ -141,10 +204,15 @@ class BlockProcessor:
             self.data_processor.update_all_tasks(target_date)
 
 
+    def shutdown(self):
+        self.data_processor.shutdown()
+
+
 @ErrorHandler.ehdc()
 class BlockFetcher:
 
-    def __init__(self, config, file_manager, main_block_processor, progress_manager, progress_callback=None, check_interrupt=None):               
+    def __init__(self, config, file_manager, main_block_processor, progress_manager, progress_callback=None, check_interrupt=None,
+                 confirmation_window=None):
         self.config = config
         self.file_manager = file_manager
         self.progress_manager = progress_manager
@@ -152,25 +220,47 @@ class BlockFetcher:
         self.fetched_block_numbers = self.file_manager.load_from_json(self.config.BLOCKS_DATA_FILE)
         self.progress_callback = progress_callback or  (lambda *args, **kwargs: None)
         self.check_interrupt = check_interrupt or (lambda: False)
+        self.confirmation_window = confirmation_window
 
 
     def start_block_fetching(self, target_date):            
         first_block, last_block = self.progress_manager.get_block_range_for_date(target_date)        
+
+        if self.confirmation_window and self.progress_manager.is_today(target_date):
+            confirmed_last_block = last_block - self.confirmation_window.depth
+            finalized_blocks = self.sync_unconfirmed_blocks(max(first_block, confirmed_last_block + 1), last_block)
+            self.save_new_blocks(finalized_blocks)
+            last_block = confirmed_last_block
+
         new_blocks = self.fetch_blocks(first_block, last_block)
         self.save_new_blocks(new_blocks)
+
+
+    def sync_unconfirmed_blocks(self, first_block, last_block):
+        self.confirmation_window.revalidate()
+
+        for block_number in range(first_block, last_block + 1):
+            if block_number not in self.confirmation_window.blocks:
+                self.confirmation_window.fetch_block(block_number)
+
+        finalized_blocks = self.confirmation_window.prune(last_block)
+        self.confirmation_window.save()
+        logger.info(f"Unconfirmed blocks: {len(self.confirmation_window.blocks)}, finalized: {len(finalized_blocks)}.")
+        return finalized_blocks
         
 
     def save_new_blocks(self, new_blocks):
         if new_blocks:
             self.fetched_block_numbers = self.file_manager.load_from_json(self.config.BLOCKS_DATA_FILE)  
             unique_new_blocks = self.get_unique_new_blocks(new_blocks)
-            self.file_manager.save_block_data_to_json(unique_new_blocks, self.config.BLOCKS_DATA_FILE)
+            self.fetched_block_numbers.extend(sorted(unique_new_blocks))
+            self.file_manager.save_to_json(self.fetched_block_numbers, self.config.BLOCKS_DATA_FILE)
 
 
     def fetch_blocks(self, first_block, last_block):
             logger.info(f"Fetching blocks in range: {first_block} - {last_block}.")
-            blocks_to_fetch = list(range(first_block, last_block + 1))
-            new_blocks = [block for block in blocks_to_fetch if block not in self.fetched_block_numbers]
+            fetched_blocks_set = set(self.fetched_block_numbers)
+            new_blocks = [block for block in range(first_block, last_block + 1) if block not in fetched_blocks_set]
 
             if new_blocks:
                 logger.info(f"Number of new blocks: {len(new_blocks)}.")
@@ -191,15 +281,29 @@ class BlockFetcher:
     
 @ErrorHandler.ehdc()
 class ProgressManager:
+    # timings of all dates are kept under their own key, next to the per-date task flags #
+    TIMINGS_KEY = "task_timings"
+
     def __init__(self, config, ether_api, check_interrupt=None):
         self.config = config
         self.progress = self.load_progress()
         self.ether_api = ether_api
         self.check_interrupt = check_interrupt or (lambda: False)  
+        self.lock = threading.RLock()
 
     def update_task_progress(self, target_date, task_name):
-        self.progress[target_date][task_name] = True
-        self.save_progress()
+        with self.lock:
+            self.progress[target_date][task_name] = True
+            self.save_progress()
+
+    def record_task_timing(self, target_date, task_name, duration):
+        with self.lock:
+            timings = self.progress.setdefault(self.TIMINGS_KEY, {}).setdefault(target_date, {})
+            timings[task_name] = round(duration, 3)
+            self.save_progress()
+
+    def get_task_timings(self, target_date):
+        return self.progress.get(self.TIMINGS_KEY, {}).get(target_date, {})
         
     def is_task_complete(self, target_date, task_name):        
         return self.progress.get(target_date, {}).get(task_name, False)       
@@ -214,15 +318,13 @@ class ProgressManager:
         return all(self.progress[target_date].values())
 
     
-    def create_date_progress(self, target_date, first_block, last_block):    
+    # task flags come from the task graph, so date completion covers every task that will run #
+    def create_date_progress(self, target_date, first_block, last_block, task_names):    
         self.progress[target_date] = {
             "first_block": first_block,
             "last_block": last_block,
             "blocks_fetched": False,
-            "reports_generated": False,
-            "balances_updated": False,
-            "data_exported": False,
-            "data_cleaned": False,
+            **{task_name: False for task_name in task_names},
         }
         self.save_progress()
 
@@ -239,7 +341,7 @@ class ProgressManager:
 
     def save_progress(self):
         if not self.check_interrupt(): 
-            with open(self.config.PROGRESS_DATA_FILE, "w") as f:
+            with self.lock, open(self.config.PROGRESS_DATA_FILE, "w") as f:
                 print("Saving self.progress to file.")
                 json.dump(self.progress, f, indent=4)
 
@@ -260,30 +362,184 @@ class ProgressManager:
         return target_date == datetime.utcnow().date().strftime("%Y-%m-%d")
 
 
+@ErrorHandler.ehdc()
+class TaskGraphExecutor:
+    def __init__(self, progress_manager, max_workers=4, profiler=None):
+        self.progress_manager = progress_manager
+        self.max_workers = max_workers
+        self.profiler = profiler or StageProfiler(None, enabled=False)
+        # one pool for all dates, so worker threads and their database connections are reused #
+        self.executor = None
+
+
+    def get_executor(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="TaskGraph")
+        return self.executor
+
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+    def run(self, target_date, tasks):
+        tasks_by_name = self.validate_graph(tasks)
+        completed = {name for name in tasks_by_name if self.progress_manager.is_task_complete(target_date, name)}
+        pending = [name for name in tasks_by_name if name not in completed]
+        timings = {}
+        running = {}
+        first_error = None
+
+        executor = self.get_executor()
+        while pending or running:
+            if first_error is None:
+                for name in self.get_ready_tasks(pending, completed, tasks_by_name):
+                    pending.remove(name)
+                    logger.info(f"[{target_date}] Starting task: {name}")
+                    future = executor.submit(self.run_single_task, name, tasks_by_name[name]["function"], target_date)
+                    running[future] = name
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    duration = future.result()
+                except Exception as e:
+                    logger.error(f"[{target_date}] Task {name} failed: {e}")
+                    first_error = first_error or e
+                    continue
+
+                completed.add(name)
+                timings[name] = duration
+                self.progress_manager.update_task_progress(target_date, name)
+                self.progress_manager.record_task_timing(target_date, name, duration)
+                metrics.histogram("automation_task_seconds", "Duration of automation tasks", task=name).observe(duration)
+                logger.info(f"[{target_date}] Task {name} finished in {duration:.2f}s")
+
+        if first_error is not None:
+            raise first_error
+
+        self.log_timings_summary(target_date, timings)
+        return timings
+
+
+    def run_single_task(self, name, function, target_date):
+        start_time = time.perf_counter()
+        with self.profiler.profile(name, target_date):
+            function(target_date)
+        return time.perf_counter() - start_time
+
+
+    @staticmethod
+    def get_ready_tasks(pending, completed, tasks_by_name):
+        return [name for name in pending if all(dep in completed for dep in tasks_by_name[name]["depends_on"])]
+
+
+    @staticmethod
+    def validate_graph(tasks):
+        tasks_by_name = {task["name"]: task for task in tasks}
+
+        for task in tasks:
+            for dependency in task["depends_on"]:
+                if dependency not in tasks_by_name:
+                    raise ValueError(f"Task {task['name']} depends on unknown task {dependency}")
+
+        visited = set()
+        visiting = set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle detected at task {name}")
+            visiting.add(name)
+            for dependency in tasks_by_name[name]["depends_on"]:
+                visit(dependency)
+            visiting.remove(name)
+            visited.add(name)
+
+        for name in tasks_by_name:
+            visit(name)
+
+        return tasks_by_name
+
+
+    @staticmethod
+    def log_timings_summary(target_date, timings):
+        if not timings:
+            return
+
+        for name, duration in sorted(timings.items(), key=lambda item: item[1], reverse=True):
+            logger.info(f"[{target_date}] Task timing: {name} - {duration:.2f}s")
+
+        slowest_task = max(timings, key=timings.get)
+        logger.info(f"[{target_date}] Dominant task: {slowest_task} ({timings[slowest_task]:.2f}s)")
+
+
 @ErrorHandler.ehdc()
 class DataProcessor:
-    def __init__(self, config, progress_manager):
+    def __init__(self, config, progress_manager, task_executor=None, profiler=None):
         self.config = config
         self.progress_manager = progress_manager
-        
+        self.task_executor = task_executor or TaskGraphExecutor(progress_manager, config.TASK_WORKERS, profiler)
+
 
-    def process_task(self, target_date, task_name, task_function):
-        if not self.progress_manager.is_task_complete(target_date, task_name):
-            task_function(target_date)
-            self.progress_manager.update_task_progress(target_date, task_name)
+    def build_task_graph(self):
+        block_readers = ["reports_generated"]
+        source_tasks = []
+
+        if self.config.COLUMNAR_STORE:
+            source_tasks.append({"name": "columns_ingested", "function": self.ingest_columns, "depends_on": []})
+
+        if self.config.BALANCE_LEDGER:
+            block_readers.append("ledger_updated")
+            source_tasks.append({"name": "ledger_updated", "function": self.update_balance_ledger,
+                                 "depends_on": [task["name"] for task in source_tasks]})
+
+        return source_tasks + [
+            {"name": "reports_generated", "function": self.generate_reports,
+             "depends_on": ["columns_ingested"] if self.config.COLUMNAR_STORE else []},
+            {"name": "balances_updated", "function": self.update_wallet_balances, "depends_on": ["reports_generated"]},
+            {"name": "data_exported", "function": self.export_to_database, "depends_on": ["reports_generated"]},
+            {"name": "wallets_exported", "function": self.export_wallets_to_database, "depends_on": ["balances_updated"]},
+            # block files are removed only after every task reading them is done #
+            {"name": "data_cleaned", "function": self.clean_blocks_data, "depends_on": block_readers},
+        ]
 
 
     def update_all_tasks(self, target_date):
+        self.task_executor.run(target_date, self.build_task_graph())
+
+
+    def shutdown(self):
+        self.task_executor.shutdown()
 
-        data_tasks = [
-            {"name": "reports_generated", "function": self.generate_reports},
-            {"name": "balances_updated", "function": self.update_wallet_balances},     
-            {"name": "data_exported", "function": self.export_to_database},
-            {"name": "data_cleaned", "function": self.clean_blocks_data},  
+
+    def ingest_columns(self, target_date):
+        # numpy is only needed when the columnar store is enabled #
+        from columnar_store import ColumnarStoreFactory
+        store = ColumnarStoreFactory.get_store(self.config)
+        file_manager = FileManager()
+        ether_api = EtherAPI(self.config)
+        block_service = BlockService(ether_api, self.config.FETCH_RECEIPTS)
+        block_downloader = BlockDownloader(ether_api, file_manager, self.config, block_service)
+        block_file_processor = blocks_extractor.BlockFileProcessor(block_downloader, file_manager)
+
+        first_block, last_block = self.progress_manager.get_block_range_for_date(target_date)
+        json_files = [
+            os.path.join(self.config.BLOCKS_DATA_DIR, f"block_{block_number}.json")
+            for block_number in range(first_block, last_block + 1)
         ]
+        store.ingest_day(target_date, block_file_processor, json_files)
 
-        for task in data_tasks:
-            self.process_task(target_date, task["name"], task["function"])
+
+    def update_balance_ledger(self, target_date):
+        balance_ledger.BalanceLedgerFactory.fold_day(target_date, self.config)
 
 
     def generate_reports(self, target_date):
@@ -293,13 +549,13 @@ class DataProcessor:
     
     def generate_hourly_report(self, target_date):
         extract_date = f"{target_date} 00:00:00"
-        hourly_extractor = blocks_extractor.ExtractorFactory.create_extractor('hourly', extract_date)
+        hourly_extractor = blocks_extractor.ExtractorFactory.create_extractor('hourly')
         hourly_extractor.extract_data(extract_date)
 
 
     def generate_daily_report(self, target_date):
         extract_date = f"{target_date} 00:00:00"
-        daily_extractor = blocks_extractor.ExtractorFactory.create_extractor('daily', extract_date)
+        daily_extractor = blocks_extractor.ExtractorFactory.create_extractor('daily')
         daily_extractor.extract_data(extract_date)
             
 
@@ -317,8 +573,11 @@ class DataProcessor:
         data_type = "hourly"
         input_file_name = f"{target_date}_hourly_data.json"
         database_factory['data_importer'].import_data_to_combined_table(input_file_name, data_type)        
-        input_file_name = "Biggest_wallets_activity.json"
-        database_factory['save_biggest_wallets'].save_biggest_wallets_activity_database(input_file_name)           
+
+
+    def export_wallets_to_database(self, target_date):
+        database_factory = database_tool.DatabaseFactory.create_database_components()
+        database_factory['save_biggest_wallets'].save_wallet_activity_database(target_date, target_date)
 
 
     def clean_blocks_data(self, target_date):       
@@ -331,11 +590,20 @@ class DataProcessor:
 class AutomationFactory:
     @staticmethod
     @ErrorHandler.ehdc()
-    def create_automator(config, start_date, update_interval=0.01, progress_callback=None, check_interrupt=None):        
+    def create_automator(config, start_date, update_interval=0.01, progress_callback=None, check_interrupt=None,
+                         follow_head=None):
         ether_api = EtherAPI(config)
         file_manager = FileManager()
         main_block_processor = MainBlockProcessor(config)      
         progress_manager = ProgressManager(config, ether_api)         
+
+        confirmation_window = None
+        if config.REORG_WINDOW:
+            confirmation_window = ConfirmationWindow(
+                config, ether_api, BlockService(ether_api, config.FETCH_RECEIPTS), file_manager, config.CONFIRMATION_DEPTH,
+                config.CONFIRMATION_WINDOW_FILE
+            )
+            confirmation_window.load()
         
         block_fetcher = BlockFetcher(
             config=config,            
@@ -344,10 +612,12 @@ class AutomationFactory:
             progress_manager=progress_manager,
             progress_callback=progress_callback,
             check_interrupt=check_interrupt,
+            confirmation_window=confirmation_window,
         )
                         
         block_timestamp_finder = BlockTimestampFinder(ether_api)
-        data_processor = DataProcessor(config, progress_manager)
+        profiler = create_profiler(config, config.TASK_WORKERS)
+        data_processor = DataProcessor(config, progress_manager, profiler=profiler)
         
         block_processor = BlockProcessor(            
             config=config,
@@ -358,18 +628,35 @@ class AutomationFactory:
             start_date=start_date,
             progress_callback=progress_callback,
             check_interrupt=check_interrupt,
+            profiler=profiler,
         )
         
+        follow_head = config.FOLLOW_HEAD if follow_head is None else follow_head
+        head_watcher = HeadWatcher(
+            ether_api=ether_api,
+            poll_interval=config.HEAD_POLL_INTERVAL,
+            max_backoff=config.HEAD_MAX_BACKOFF,
+        ) if follow_head else None
+
+        metrics_server = MetricsServer(metrics, config.METRICS_PORT) if config.METRICS_PORT else None
+
         task_scheduler = TaskScheduler(
             block_processor=block_processor,
             update_interval=update_interval,
             check_interrupt=check_interrupt,
+            head_watcher=head_watcher,
+            metrics_file=config.METRICS_FILE,
+            metrics_server=metrics_server,
         )
 
         return task_scheduler
 
 
 if __name__ == "__main__":       
+    parser = argparse.ArgumentParser(description="Run the block processing automation.")
+    add_profile_arguments(parser)
+    apply_profile_arguments(parser.parse_args())
+
     config = Config()
     automator = AutomationFactory.create_automator(
         config=config,
@@ -0,0 +1,202 @@
+from config import Config
+from database_tool import DatabaseManager, SchemaMigrator
+from blocks_extractor import TransactionProcessor, ExtractorFactory
+from error_handler import ErrorHandler
+from logger import logger
+
+
+GWEI = 10**9
+SQL_VARIABLES_LIMIT = 500
+
+
+@ErrorHandler.ehdc()
+class BalanceLedger:
+    # balances are exact integers split into gwei and a wei remainder (0 <= wei < 1 gwei), #
+    # because wei amounts do not fit into SQLite 64-bit integers #
+    BALANCE_UPSERT_QUERY = '''
+        INSERT INTO ledger_balances (address_id, balance_gwei, balance_wei) VALUES (?, ?, ?)
+        ON CONFLICT(address_id) DO UPDATE SET
+            balance_gwei = excluded.balance_gwei,
+            balance_wei = excluded.balance_wei
+    '''
+
+    # labels and lower bounds (in gwei) follow WalletClassifier #
+    HOLDING_CLASSES = [
+        ("Above 10000 ETH", 10000 * GWEI),
+        ("1000-10000 ETH", 1000 * GWEI),
+        ("100-1000 ETH", 100 * GWEI),
+        ("10-100 ETH", 10 * GWEI),
+        ("1-10 ETH", GWEI),
+        ("0.1-1 ETH", GWEI // 10),
+    ]
+
+    # balances at the end of a date are the latest snapshot of each address not after that date #
+    SNAPSHOT_BALANCES_QUERY = '''
+        SELECT s.address_id, s.balance_gwei, s.balance_wei FROM ledger_snapshots AS s
+        WHERE s.date = (
+            SELECT MAX(date) FROM ledger_snapshots WHERE address_id = s.address_id AND date <= ?
+        )
+    '''
+
+    # without receipts only the gas limit is known, so fees are left out rather than overcharged #
+    def __init__(self, db_manager, include_fees=False):
+        self.db_manager = db_manager
+        self.include_fees = include_fees
+
+    def is_day_folded(self, date):
+        with self.db_manager as db:
+            return db.execute_query('SELECT 1 FROM ledger_days WHERE date = ?', (date,)).fetchone() is not None
+
+    def fold_day(self, date, transactions_by_hour):
+        if self.is_day_folded(date):
+            logger.info(f"Ledger already contains {date}, skipping.")
+            return 0
+
+        net_flows = {}
+        for transactions in transactions_by_hour.values():
+            for address, flow_wei in self.get_net_flows(transactions, self.include_fees).items():
+                net_flows[address] = net_flows.get(address, 0) + flow_wei
+
+        with self.db_manager as db:
+            with db.transaction():
+                last_date = db.execute_query('SELECT MAX(date) FROM ledger_days').fetchone()[0]
+                # balances carry every folded day, a past day would be missing from all later snapshots #
+                if last_date and last_date > date:
+                    raise ValueError(f"Cannot fold {date} after {last_date}, ledger days must be folded in order.")
+
+                address_ids = self.get_address_ids(db, list(net_flows))
+                balances = self.get_balances_by_id(db, list(address_ids.values()))
+
+                balance_rows = []
+                for address, flow_wei in net_flows.items():
+                    address_id = address_ids[address]
+                    balance_gwei, balance_wei = divmod(balances.get(address_id, 0) + flow_wei, GWEI)
+                    balance_rows.append((address_id, balance_gwei, balance_wei))
+
+                db.execute_many(self.BALANCE_UPSERT_QUERY, balance_rows)
+                db.execute_many(
+                    'INSERT OR REPLACE INTO ledger_snapshots (address_id, date, balance_gwei, balance_wei) '
+                    'VALUES (?, ?, ?, ?)',
+                    [(address_id, date, balance_gwei, balance_wei) for address_id, balance_gwei, balance_wei in balance_rows]
+                )
+                db.execute_query(
+                    'INSERT INTO ledger_days (date, addresses_count) VALUES (?, ?)', (date, len(balance_rows))
+                )
+
+        logger.info(f"Ledger folded {date}: {len(net_flows)} addresses changed.")
+        return len(net_flows)
+
+    # dictionaries from block files, or columnar views with their own vectorized implementation #
+    @staticmethod
+    def get_net_flows(transactions, include_fees=False):
+        if not isinstance(transactions, list):
+            return transactions.net_flows_wei(include_fees)
+
+        net_flows = {}
+        for transaction in transactions:
+            value_wei = int(transaction["value"], 16)
+            sender = transaction["from"]
+            receiver = transaction["to"]
+
+            fee_wei = TransactionProcessor.get_fee_wei(transaction) if include_fees and "gasUsed" in transaction else 0
+            net_flows[sender] = net_flows.get(sender, 0) - value_wei - fee_wei
+            if receiver is not None:
+                net_flows[receiver] = net_flows.get(receiver, 0) + value_wei
+
+        return net_flows
+
+    @staticmethod
+    def get_address_ids(db, addresses):
+        db.execute_many('INSERT OR IGNORE INTO ledger_addresses (address) VALUES (?)', [(a,) for a in addresses])
+
+        address_ids = {}
+        for start in range(0, len(addresses), SQL_VARIABLES_LIMIT):
+            chunk = addresses[start:start + SQL_VARIABLES_LIMIT]
+            rows = db.execute_query(
+                f'SELECT id, address FROM ledger_addresses WHERE address IN ({",".join("?" * len(chunk))})', chunk
+            ).fetchall()
+            address_ids.update((address, address_id) for address_id, address in rows)
+
+        return address_ids
+
+    @staticmethod
+    def get_balances_by_id(db, address_ids):
+        balances = {}
+        for start in range(0, len(address_ids), SQL_VARIABLES_LIMIT):
+            chunk = address_ids[start:start + SQL_VARIABLES_LIMIT]
+            rows = db.execute_query(
+                f'SELECT address_id, balance_gwei, balance_wei FROM ledger_balances '
+                f'WHERE address_id IN ({",".join("?" * len(chunk))})', chunk
+            ).fetchall()
+            balances.update((address_id, balance_gwei * GWEI + balance_wei) for address_id, balance_gwei, balance_wei in rows)
+
+        return balances
+
+    def get_balance_wei(self, address, date=None):
+        with self.db_manager as db:
+            if date is None:
+                row = db.execute_query('''
+                    SELECT b.balance_gwei, b.balance_wei FROM ledger_balances AS b
+                    JOIN ledger_addresses AS a ON a.id = b.address_id WHERE a.address = ?
+                ''', (address,)).fetchone()
+            else:
+                row = db.execute_query('''
+                    SELECT s.balance_gwei, s.balance_wei FROM ledger_snapshots AS s
+                    JOIN ledger_addresses AS a ON a.id = s.address_id
+                    WHERE a.address = ? AND s.date <= ? ORDER BY s.date DESC LIMIT 1
+                ''', (address, date)).fetchone()
+
+        return row[0] * GWEI + row[1] if row else 0
+
+    def get_top_holders(self, top_n=10, date=None):
+        balances_query, parameters = self.get_balances_source(date)
+
+        with self.db_manager as db:
+            rows = db.execute_query(f'''
+                SELECT a.address, b.balance_gwei, b.balance_wei FROM ({balances_query}) AS b
+                JOIN ledger_addresses AS a ON a.id = b.address_id
+                ORDER BY b.balance_gwei DESC, b.balance_wei DESC LIMIT ?
+            ''', (*parameters, top_n)).fetchall()
+
+        return [
+            {"wallet address": address, "balance wei": balance_gwei * GWEI + balance_wei,
+             "balance": (balance_gwei * GWEI + balance_wei) / 10**18}
+            for address, balance_gwei, balance_wei in rows
+        ]
+
+    def classify_holdings(self, date=None):
+        balances_query, parameters = self.get_balances_source(date)
+        cases = " ".join(f"WHEN balance_gwei >= {lower_bound} THEN '{label}'" for label, lower_bound in self.HOLDING_CLASSES)
+
+        with self.db_manager as db:
+            rows = db.execute_query(f'''
+                SELECT CASE {cases} ELSE 'Below 0.1 ETH' END AS classification, COUNT(*)
+                FROM ({balances_query}) GROUP BY classification
+            ''', parameters).fetchall()
+
+        return dict(rows)
+
+    def get_balances_source(self, date):
+        if date is None:
+            return 'SELECT address_id, balance_gwei, balance_wei FROM ledger_balances', ()
+        return self.SNAPSHOT_BALANCES_QUERY, (date,)
+
+
+class BalanceLedgerFactory:
+    @staticmethod
+    def create_ledger(config=None):
+        config = config or Config()
+        db_manager = DatabaseManager.get_shared(config.DB_FILENAME, config.DB_CACHE_SIZE_KB, config.DB_MMAP_SIZE)
+        SchemaMigrator(db_manager).migrate()
+        return BalanceLedger(db_manager, config.FETCH_RECEIPTS)
+
+    @staticmethod
+    def fold_day(date, config=None, check_interrupt=None):
+        config = config or Config()
+        ledger = BalanceLedgerFactory.create_ledger(config)
+        transactions_grouper = ExtractorFactory.create_transactions_grouper(config)
+        transactions_by_hour = transactions_grouper.group_transactions_by_hour(None, check_interrupt, date)
+
+        day_transactions = {hour: transactions for hour, transactions in transactions_by_hour.items()
+                            if hour.startswith(date)}
+        return ledger.fold_day(date, day_transactions)
@@ -0,0 +1,475 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import statistics
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from config import Config
+from logger import logger
+from error_handler import ErrorHandler
+from blocks_download import EtherAPI, FileManager, BlockService, BlockDownloader
+from blocks_extractor import (BlockFileProcessor, TransactionsGrouper, TransactionProcessor, WalletUpdater,
+                              ExtractorFactory, process_transactions)
+from database_tool import DatabaseManager, SchemaMigrator, DataCalculator, DataImporter, RollupBuilder, WalletSketchStore
+from chart_data import ChartDataProvider
+from wallets_update import WalletActivityStore, WalletInfoManager
+from synthetic_chain import SyntheticChain, SyntheticChainServer
+
+
+STAGES = [
+    "download",
+    "download_full_block",
+    "load_blocks",
+    "group_by_hour",
+    "wallet_update",
+    "hourly_extraction",
+    "daily_extraction",
+    "db_import",
+    "wallet_activity",
+    "chart_queries",
+]
+
+# representative queries of the charts module (charts.py needs matplotlib) #
+CHART_QUERIES = [
+    'SELECT date, transactions_number FROM combined_data WHERE data_type="hourly"',
+    'SELECT date, average_transaction_fee FROM combined_data WHERE data_type="hourly"',
+    'SELECT date, wallet_0_1_eth FROM combined_data WHERE data_type="hourly"',
+    'SELECT period_start AS date, transactions_number FROM rollups WHERE period="daily"',
+    'SELECT period_start AS date, active_wallets FROM rollups WHERE period="daily"',
+    'SELECT period_start AS date, average_transaction_fee FROM rollups WHERE period="weekly"',
+]
+
+BENCHMARK_DAY = "2024-01-01"
+BENCHMARK_START_TIMESTAMP = 1704067200
+
+
+@ErrorHandler.ehd()
+def create_benchmark_config(base_dir, api_url):
+    """
+    Copies the application configuration with every path moved into `base_dir`,
+    so benchmarks never touch the real blocks, results or database.
+    """
+    config = SimpleNamespace(**vars(Config()))
+    config.BASE_DIR = base_dir
+    config.API_URL = api_url
+    config.API_KEY = "benchmark"
+    config.RPC_URL = ""
+    config.REQUEST_DELAY = 0.0
+    config.FETCH_RECEIPTS = False
+    config.COLUMNAR_STORE = False
+    config.DB_FILENAME = os.path.join(base_dir, "benchmark.db")
+    config.INTERESTING_INFO_DIR = os.path.join(base_dir, "interesting_info")
+    config.WALLETS_ACTIVITY_FILENAME = os.path.join(config.INTERESTING_INFO_DIR, "Biggest_wallets_activity.json")
+    config.OUTPUT_FILE_PATH = config.WALLETS_ACTIVITY_FILENAME
+    config.BLOCKS_DATA_DIR = os.path.join(base_dir, "blocks_data")
+    config.BLOCKS_DATA_FILE = os.path.join(base_dir, "blocks_data.json")
+    config.PROGRESS_DATA_FILE = os.path.join(base_dir, "progress.json")
+    config.COLUMNAR_DIR = os.path.join(base_dir, "columnar_data")
+    config.JSON_FILES = []
+
+    os.makedirs(config.INTERESTING_INFO_DIR, exist_ok=True)
+    os.makedirs(config.BLOCKS_DATA_DIR, exist_ok=True)
+    return config
+
+
+@ErrorHandler.ehdc()
+class PipelineBenchmark:
+    """
+    Times the stages of the pipeline on synthetic data of several sizes.
+
+    Every stage is prepared outside the measured time and run `repeats` times on a fresh
+    workspace; the median is reported together with the throughput of the stage.
+
+    Parameters
+    ----------
+    sizes : list of int
+        Dataset sizes in blocks.
+    repeats : int, optional
+        Measured runs of every stage (default is 3).
+    stages : list of str, optional
+        Stages to run, in pipeline order (default is all of `STAGES`).
+    transactions_per_block : int, optional
+        Average transactions in a synthetic block (default is 150).
+    latency : float, optional
+        Seconds of latency injected into every API request of the download stages (default is 0.0).
+    download_limit : int, optional
+        Maximum number of blocks downloaded per run, downloads are much slower than
+        the local stages (default is 200).
+    seed : int, optional
+        Seed of the synthetic chain (default is 0).
+    work_dir : str, optional
+        Directory for the workspaces, a temporary directory is used and removed if not given.
+    """
+    def __init__(self, sizes, repeats=3, stages=None, transactions_per_block=150, latency=0.0,
+                 download_limit=200, seed=0, work_dir=None):
+        unknown_stages = set(stages or []) - set(STAGES)
+        if unknown_stages:
+            raise ValueError(f"Unknown benchmark stages: {sorted(unknown_stages)}")
+
+        self.sizes = sizes
+        self.repeats = repeats
+        self.stages = [stage for stage in STAGES if stage in (stages or STAGES)]
+        self.transactions_per_block = transactions_per_block
+        self.latency = latency
+        self.download_limit = download_limit
+        self.seed = seed
+        self.work_dir = work_dir
+        self.chain = None
+        self.server = None
+
+
+    def run(self):
+        """
+        Runs every selected stage at every dataset size.
+
+        Returns
+        -------
+        dict
+            Report with the run parameters, the environment and one result per stage and size.
+        """
+        work_dir = self.work_dir or tempfile.mkdtemp(prefix="benchmarks_")
+        self.chain = SyntheticChain(seed=self.seed, start_timestamp=BENCHMARK_START_TIMESTAMP,
+                                    head_block=20_000_000 + max(self.sizes),
+                                    transactions_per_block=self.transactions_per_block)
+        self.server = SyntheticChainServer(self.chain, latency=self.latency, seed=self.seed)
+        self.server.start()
+
+        results = []
+        try:
+            for size in self.sizes:
+                config = self.create_workspace(os.path.join(work_dir, f"size_{size}"), size)
+                for stage in self.stages:
+                    results.append(self.measure(stage, size, config))
+        finally:
+            self.server.stop()
+            if not self.work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        return {
+            "created": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "processor": platform.processor(),
+                "cpu_count": os.cpu_count(),
+            },
+            "parameters": {
+                "sizes": self.sizes,
+                "repeats": self.repeats,
+                "transactions_per_block": self.transactions_per_block,
+                "latency": self.latency,
+                "download_limit": self.download_limit,
+                "seed": self.seed,
+            },
+            "results": results,
+        }
+
+
+    def create_workspace(self, base_dir, size):
+        config = create_benchmark_config(base_dir, self.server.url)
+        block_numbers = self.get_block_numbers(size)
+
+        for block_number in block_numbers:
+            FileManager.save_to_json(
+                self.chain.get_block_data(block_number),
+                os.path.join(config.BLOCKS_DATA_DIR, f"block_{block_number}.json")
+            )
+        config.JSON_FILES = [os.path.join(config.BLOCKS_DATA_DIR, f"block_{number}.json") for number in block_numbers]
+        FileManager.save_to_json(block_numbers, config.BLOCKS_DATA_FILE)
+
+        logger.info(f"Benchmark workspace with {size} blocks created in {base_dir}")
+        return config
+
+
+    def get_block_numbers(self, size):
+        return list(range(self.chain.first_block, self.chain.first_block + size))
+
+
+    def measure(self, stage, size, config):
+        """
+        Measures one stage; `prepare_<stage>` builds a fresh callable for every run and returns it
+        with the number of processed items, only the callable itself is timed.
+        """
+        prepare = getattr(self, f"prepare_{stage}")
+        timings = []
+        items, unit = 0, ""
+
+        for _ in range(self.repeats):
+            run_stage, items, unit = prepare(config, size)
+            started = time.perf_counter()
+            run_stage()
+            timings.append(time.perf_counter() - started)
+
+        median = statistics.median(timings)
+        logger.info(f"Benchmark {stage} at {size} blocks: median {median:.4f}s over {self.repeats} runs")
+        return {
+            "name": stage,
+            "size": size,
+            "items": items,
+            "unit": unit,
+            "seconds": timings,
+            "median": median,
+            "min": min(timings),
+            "throughput": items / median if median else None,
+        }
+
+
+    def prepare_download(self, config, size):
+        download_dir = self.reset_download_dir(config)
+        api = EtherAPI(config)
+        download_config = SimpleNamespace(**{**vars(config), "BLOCKS_DATA_DIR": download_dir,
+                                             "BLOCKS_DATA_FILE": os.path.join(download_dir, "fetched.json")})
+        block_downloader = BlockDownloader(api, FileManager(), download_config, BlockService(api))
+        block_numbers = self.get_block_numbers(min(size, self.download_limit))
+
+        def run_stage():
+            fetched_block_numbers = []
+            for block_number in block_numbers:
+                block_downloader.download_single_block(block_number, fetched_block_numbers)
+
+        return run_stage, len(block_numbers), "blocks"
+
+
+    # single eth_getBlockByNumber per block, as used by the head follower #
+    def prepare_download_full_block(self, config, size):
+        download_dir = self.reset_download_dir(config)
+        block_service = BlockService(EtherAPI(config))
+        block_numbers = self.get_block_numbers(min(size, self.download_limit))
+
+        def run_stage():
+            for block_number in block_numbers:
+                FileManager.save_to_json(
+                    block_service.fetch_full_block(block_number),
+                    os.path.join(download_dir, f"block_{block_number}.json")
+                )
+
+        return run_stage, len(block_numbers), "blocks"
+
+
+    @staticmethod
+    def reset_download_dir(config):
+        download_dir = os.path.join(config.BASE_DIR, "downloaded")
+        shutil.rmtree(download_dir, ignore_errors=True)
+        os.makedirs(download_dir)
+        return download_dir
+
+
+    def prepare_load_blocks(self, config, size):
+        block_file_processor = self.create_block_file_processor(config)
+
+        def run_stage():
+            for json_file in config.JSON_FILES:
+                block_file_processor.load_block_data(json_file)
+
+        return run_stage, size, "blocks"
+
+
+    def prepare_group_by_hour(self, config, size):
+        transactions_grouper = TransactionsGrouper(self.create_block_file_processor(config), config)
+        return transactions_grouper.group_transactions_by_hour, size, "blocks"
+
+
+    def prepare_wallet_update(self, config, size):
+        transactions_by_hour = TransactionsGrouper(self.create_block_file_processor(config), config) \
+            .group_transactions_by_hour()
+        transaction_processor = TransactionProcessor()
+        wallet_updater = WalletUpdater()
+
+        def run_stage():
+            for transactions in transactions_by_hour.values():
+                process_transactions(transactions, transaction_processor, wallet_updater)
+
+        return run_stage, self.count_transactions(transactions_by_hour), "transactions"
+
+
+    def prepare_hourly_extraction(self, config, size):
+        extractor = ExtractorFactory.create_extractor("hourly", config)
+        return lambda: extractor.extract_data(f"{BENCHMARK_DAY} 00:00:00"), size, "blocks"
+
+
+    def prepare_daily_extraction(self, config, size):
+        extractor = ExtractorFactory.create_extractor("daily", config)
+        return lambda: extractor.extract_data(f"{BENCHMARK_DAY} 00:00:00"), size, "blocks"
+
+
+    def prepare_db_import(self, config, size):
+        hourly_file = self.ensure_result_file(config, "hourly")
+        with open(hourly_file, "r") as file:
+            entries_count = len(json.load(file))
+
+        db_manager = self.create_database(config)
+        sketch_store = WalletSketchStore(db_manager)
+        data_calculator = DataCalculator(db_manager, RollupBuilder(db_manager, sketch_store))
+        data_importer = DataImporter(config, db_manager, data_calculator)
+
+        def run_stage():
+            data_importer.import_data_to_combined_table(os.path.basename(hourly_file), "hourly")
+            db_manager.close_all()
+
+        return run_stage, entries_count, "hourly entries"
+
+
+    def prepare_wallet_activity(self, config, size):
+        daily_file = self.ensure_result_file(config, "daily")
+        with open(daily_file, "r") as file:
+            daily_data = json.load(file)
+        wallets_count = len(daily_data["top 5 buyers"]) + len(daily_data["top 5 sellers"])
+
+        wallet_info_manager = WalletInfoManager(config, WalletActivityStore(self.create_database(config)))
+
+        def run_stage():
+            wallet_info_manager.save_top_wallets_info(os.path.basename(daily_file))
+            wallet_info_manager.activity_store.db_manager.close_all()
+
+        return run_stage, wallets_count, "wallets"
+
+
+    def prepare_chart_queries(self, config, size):
+        self.ensure_result_file(config, "hourly")
+        db_manager = self.create_database(config)
+        sketch_store = WalletSketchStore(db_manager)
+        DataImporter(config, db_manager, DataCalculator(db_manager, RollupBuilder(db_manager, sketch_store))) \
+            .import_data_to_combined_table(f"{BENCHMARK_DAY}_hourly_data.json", "hourly")
+        chart_data_provider = ChartDataProvider(db_manager)
+
+        def run_stage():
+            for sql_query in CHART_QUERIES:
+                chart_data_provider.get_chart_data(sql_query)
+            db_manager.close_all()
+
+        return run_stage, len(CHART_QUERIES), "queries"
+
+
+    @staticmethod
+    def create_block_file_processor(config):
+        api = EtherAPI(config)
+        file_manager = FileManager()
+        block_downloader = BlockDownloader(api, file_manager, config, BlockService(api))
+        return BlockFileProcessor(block_downloader, file_manager)
+
+
+    @staticmethod
+    def create_database(config):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(config.DB_FILENAME + suffix):
+                os.remove(config.DB_FILENAME + suffix)
+
+        db_manager = DatabaseManager(config.DB_FILENAME, config.DB_CACHE_SIZE_KB, config.DB_MMAP_SIZE)
+        SchemaMigrator(db_manager).migrate()
+        return db_manager
+
+
+    @staticmethod
+    def ensure_result_file(config, extractor_type):
+        result_file = os.path.join(config.INTERESTING_INFO_DIR, f"{BENCHMARK_DAY}_{extractor_type}_data.json")
+        if not os.path.exists(result_file):
+            ExtractorFactory.create_extractor(extractor_type, config).extract_data(f"{BENCHMARK_DAY} 00:00:00")
+        return result_file
+
+
+    @staticmethod
+    def count_transactions(transactions_by_hour):
+        return sum(len(transactions) for transactions in transactions_by_hour.values())
+
+
+@ErrorHandler.ehd()
+def compare_reports(report, baseline, tolerance=0.1):
+    """
+    Compares median times of a report with a baseline report.
+
+    Parameters
+    ----------
+    report : dict
+        The current report of `PipelineBenchmark.run`.
+    baseline : dict
+        An earlier report.
+    tolerance : float, optional
+        Relative change of the median still considered unchanged (default is 0.1).
+
+    Returns
+    -------
+    list of dict
+        One entry per current result with the baseline median, the relative change and a status:
+        "regression", "improvement", "unchanged" or "new".
+    """
+    baseline_medians = {(result["name"], result["size"]): result["median"] for result in baseline.get("results", [])}
+
+    comparison = []
+    for result in report["results"]:
+        baseline_median = baseline_medians.get((result["name"], result["size"]))
+        entry = {"name": result["name"], "size": result["size"], "median": result["median"],
+                 "baseline_median": baseline_median, "change": None, "status": "new"}
+
+        if baseline_median:
+            entry["change"] = result["median"] / baseline_median - 1
+            if entry["change"] > tolerance:
+                entry["status"] = "regression"
+            elif entry["change"] < -tolerance:
+                entry["status"] = "improvement"
+            else:
+                entry["status"] = "unchanged"
+
+        comparison.append(entry)
+
+    return comparison
+
+
+@ErrorHandler.ehd()
+def format_comparison(comparison):
+    lines = [f"{'stage':<22}{'size':>8}{'median [s]':>14}{'baseline [s]':>14}{'change':>10}  status"]
+    for entry in comparison:
+        baseline_median = f"{entry['baseline_median']:.4f}" if entry["baseline_median"] else "-"
+        change = f"{entry['change']:+.1%}" if entry["change"] is not None else "-"
+        lines.append(f"{entry['name']:<22}{entry['size']:>8}{entry['median']:>14.4f}{baseline_median:>14}"
+                     f"{change:>10}  {entry['status']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    """
+    Running the benchmark suite, e.g. before a deployment:
+
+        python benchmarks.py --sizes 100 1000 --baseline benchmarks/baseline.json
+
+    The exit code is 1 when any stage is slower than the baseline by more than the tolerance.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pipeline benchmarks on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=None)
+    parser.add_argument("--transactions-per-block", type=int, default=150)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--download-limit", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="report file, benchmarks/benchmark_<time>.json by default")
+    parser.add_argument("--baseline", default=None, help="report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    arguments = parser.parse_args()
+
+    benchmark = PipelineBenchmark(arguments.sizes, arguments.repeats, arguments.stages, arguments.transactions_per_block,
+                                  arguments.latency, arguments.download_limit, arguments.seed)
+    benchmark_report = benchmark.run()
+
+    if arguments.baseline:
+        with open(arguments.baseline, "r") as baseline_file:
+            benchmark_report["comparison"] = compare_reports(benchmark_report, json.load(baseline_file),
+                                                             arguments.tolerance)
+        benchmark_report["baseline"] = arguments.baseline
+    else:
+        benchmark_report["comparison"] = compare_reports(benchmark_report, {})
+
+    output_path = arguments.output or os.path.join(
+        Config().BASE_DIR, "benchmarks", f"benchmark_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    FileManager.save_to_json(benchmark_report, output_path)
+
+    print(format_comparison(benchmark_report["comparison"]))
+    print(f"Report saved to {output_path}")
+    sys.exit(1 if any(entry["status"] == "regression" for entry in benchmark_report["comparison"]) else 0)
@@ -3,11 +3,14 @@ import time
 import requests 
 import json
 import os
+import logging
 from PyQt5.QtWidgets import QInputDialog
 from datetime import datetime, timezone, timedelta
 from config import Config
 from logger import logger
 from error_handler import ErrorHandler, CustomProcessingError
+from metrics import metrics
+from urllib.parse import urlparse, parse_qs
 from typing import Any
  
 
@@ -317,6 +320,93 @@ class EtherAPI:
         return transactions
 
 
+    def get_block(self, block_number: int, full_transactions: bool = True) -> dict:
+        """
+        Retrieves a whole block (header and transactions) with a single request.
+
+        Parameters
+        ----------
+        block_number : int
+            The number of the block to retrieve.
+        full_transactions : bool, optional
+            If True, transactions are returned as objects, otherwise only their hashes (default is True).
+
+        Returns
+        -------
+        dict
+            The raw block object as returned by `eth_getBlockByNumber`.
+        """
+        logger.debug(f"Requesting block {block_number}")
+
+        params = {
+            'tag': Utils.int_to_hex(block_number),
+            'boolean': 'true' if full_transactions else 'false'
+        }
+        endpoint = self._build_endpoint('proxy', 'eth_getBlockByNumber', params)
+        response = self._get_response(endpoint)
+        result = self._parse_response(response, "result")
+
+        Utils.check_empty_result(result, f"result for block {block_number}")
+        Utils.check_type(result, dict, "block")
+
+        return result
+
+
+    def get_block_receipts(self, block_number: int) -> list[dict]:
+        """
+        Retrieves the receipts of all transactions in a block with a single `eth_getBlockReceipts` call
+        to the JSON-RPC node configured in `RPC_URL`. Etherscan's proxy module has no such action.
+
+        Parameters
+        ----------
+        block_number : int
+            The number of the block whose receipts are to be retrieved.
+
+        Returns
+        -------
+        list[dict]
+            A list of transaction receipts, including `transactionHash`, `gasUsed` and `effectiveGasPrice`.
+        """
+        logger.debug(f"Requesting receipts for block {block_number}")
+
+        if not self.config.RPC_URL:
+            raise ValueError("Block receipts need RPC_URL, Etherscan's proxy module has no eth_getBlockReceipts action")
+
+        result = self._call_rpc("eth_getBlockReceipts", [Utils.int_to_hex(block_number)])
+        Utils.check_type(result, list, "receipts")
+        return result
+
+
+    def _call_rpc(self, method: str, params: list, timeout: int | None = None):
+        """
+        Sends a single JSON-RPC call to the node configured in `RPC_URL` and returns its result.
+        """
+        with metrics.timer("api_request_duration_seconds", "Etherscan API request latency", action=method):
+            response = requests.post(
+                self.config.RPC_URL, json={"jsonrpc": "2.0", "id": 1, "method": method, "params": params}, timeout=timeout
+            )
+            response.raise_for_status()
+
+        metrics.counter("api_requests_total", "Successful Etherscan API requests", action=method).inc()
+        metrics.counter("api_response_bytes_total", "Bytes downloaded from the Etherscan API").inc(len(response.content))
+        return self._parse_rpc_result(response)
+
+
+    @staticmethod
+    def _parse_rpc_result(response: requests.Response):
+        """
+        Returns the `result` of a proxy or JSON-RPC response, raising ValueError when the API rejected the call
+        (a JSON-RPC `error`, or Etherscan's `"status": "0"` answer, e.g. for an unsupported action).
+        """
+        data = response.json()
+        if data.get("error"):
+            error = data["error"]
+            raise ValueError(f"RPC error: {error.get('message', error) if isinstance(error, dict) else error}")
+        if data.get("status") == "0":
+            raise ValueError(f"API error: {data.get('result') or data.get('message')}")
+        return data.get("result")
+
+
     @staticmethod
     def _get_response(endpoint: str, timeout: int | None = None) -> requests.Response:
         """
@@ -341,9 +431,20 @@ class EtherAPI:
             - `requests.TooManyRedirects`: When too many redirects are encountered.
             - `requests.HTTPError`: When the server returns an HTTP error.
         """
+        action = parse_qs(urlparse(endpoint).query).get("action", ["unknown"])[0]
+
         logger.debug("Sending GET request")
-        response = requests.get(endpoint, timeout=timeout)
-        response.raise_for_status()
+        try:
+            with metrics.timer("api_request_duration_seconds", "Etherscan API request latency", action=action):
+                response = requests.get(endpoint, timeout=timeout)
+                response.raise_for_status()
+        except requests.RequestException as e:
+            metrics.counter("api_request_errors_total", "Failed Etherscan API requests",
+                            action=action, error=e.__class__.__name__).inc()
+            raise
+
+        metrics.counter("api_requests_total", "Successful Etherscan API requests", action=action).inc()
+        metrics.counter("api_response_bytes_total", "Bytes downloaded from the Etherscan API").inc(len(response.content))
         logger.debug(f"Request succeeded with status code: {response.status_code}")
         return response
 
@@ -373,7 +474,8 @@ class EtherAPI:
         if not self.config.API_URL or not self.config.API_KEY:
             raise ValueError("Missing API_URL or API_KEY in configuration")
 
-        logger.debug(f"Building endpoint with params: {params}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Building endpoint with params: {params}")
 
         url = f"{self.config.API_URL}?module={module}&action={action}&apikey={self.config.API_KEY}"
 
@@ -425,8 +527,10 @@ class FileManager:
         """
         Utils.check_empty_result(data, "data to save")
 
-        with open(file_path, 'w') as json_file:
-            json.dump(data, json_file, indent=4)  # type: ignore
+        with metrics.timer("json_save_seconds", "Time of serializing and writing JSON files"):
+            with open(file_path, 'w') as json_file:
+                json.dump(data, json_file, indent=4)  # type: ignore
+                metrics.counter("json_bytes_written_total", "Bytes of JSON files written").inc(json_file.tell())
 
         logger.debug(f"Data saved to JSON file: {file_path}")
 
@@ -446,8 +550,10 @@ class FileManager:
         dict or list
             The data loaded from the JSON file.
         """
-        with open(file_path, 'r') as file:
-            data = json.load(file)
+        with metrics.timer("json_load_seconds", "Time of reading and parsing JSON files"):
+            with open(file_path, 'r') as file:
+                data = json.load(file)
+                metrics.counter("json_bytes_read_total", "Bytes of JSON files read").inc(file.tell())
 
         logger.debug(f"Data loaded from JSON file: {file_path}")
         return data
@@ -498,10 +604,12 @@ class Utils:
                 raise ValueError(f"Empty {data_type}.")
 
     @staticmethod
+    @ErrorHandler.skip_ehd
     def hex_to_int(hex_value: str) -> int:
         return int(hex_value, 16)
 
     @staticmethod
+    @ErrorHandler.skip_ehd
     def int_to_hex(int_number: int) -> str:
         return hex(int_number)
 
@@ -750,10 +858,18 @@ class BlockService:
     ----------
     ether_api : EtherAPI
         API for fetching data from the blockchain.
+    fetch_receipts : bool
+        If True, fetched blocks are enriched with `gasUsed` and `effectiveGasPrice` from their receipts,
+        which requires `RPC_URL`.
     """
 
-    def __init__(self, ether_api: EtherAPI):
+    def __init__(self, ether_api: EtherAPI, fetch_receipts: bool = False):
+        # receipts are fetched in bulk from a JSON-RPC node, one Etherscan call per transaction is too expensive #
+        if fetch_receipts and not ether_api.config.RPC_URL:
+            raise ValueError("FETCH_RECEIPTS requires RPC_URL pointing at a node supporting eth_getBlockReceipts")
+
         self.ether_api = ether_api
+        self.fetch_receipts = fetch_receipts
 
     def fetch_block_data(self, block_number: int) -> dict:
         """
@@ -775,12 +891,86 @@ class BlockService:
         timestamp = self.ether_api.get_block_timestamp(block_number)
         transactions = self.ether_api.get_block_transactions(block_number)
 
-        return {
+        block_data = {
             "block_number": block_number,
             "timestamp": timestamp,
             "transactions": transactions
         }
 
+        if self.fetch_receipts:
+            self.add_receipts(block_data)
+
+        return block_data
+
+    def fetch_full_block(self, block_number: int) -> dict:
+        """
+        Fetches the data of a specified block with a single API request, including
+        the block hash and parent hash used for chain continuity checks.
+
+        Parameters
+        ----------
+        block_number : int
+            The number of the block to fetch.
+
+        Returns
+        -------
+        dict
+            A dictionary containing the block data:
+            - block_number : int
+            - hash : str
+            - parent_hash : str
+            - timestamp : int
+            - transactions : list
+        """
+        block = self.ether_api.get_block(block_number)
+        transactions = block.get("transactions")
+        Utils.check_type(transactions, list, "transactions")
+
+        block_data = {
+            "block_number": block_number,
+            "hash": block["hash"],
+            "parent_hash": block["parentHash"],
+            "timestamp": Utils.hex_to_int(block["timestamp"]),
+            "transactions": transactions
+        }
+
+        if self.fetch_receipts:
+            self.add_receipts(block_data)
+
+        return block_data
+
+    def add_receipts(self, block_data: dict) -> dict:
+        """
+        Copies `gasUsed` and `effectiveGasPrice` from the block receipts into the block transactions,
+        so the real fees are stored with the block and no receipt has to be fetched again.
+
+        Parameters
+        ----------
+        block_data : dict
+            Block data with `block_number` and `transactions` keys; modified in place.
+
+        Returns
+        -------
+        dict
+            The enriched block data.
+        """
+        if block_data.get("receipts"):
+            return block_data
+
+        receipts = {
+            receipt["transactionHash"]: receipt
+            for receipt in self.ether_api.get_block_receipts(block_data["block_number"])
+        }
+
+        for transaction in block_data["transactions"]:
+            receipt = receipts.get(transaction.get("hash"))
+            if receipt:
+                transaction["gasUsed"] = receipt["gasUsed"]
+                transaction["effectiveGasPrice"] = receipt.get("effectiveGasPrice", transaction.get("gasPrice"))
+
+        block_data["receipts"] = True
+        return block_data
+
     @staticmethod
     def is_block_fetched(block_number: int, fetched_block_numbers: list) -> bool:
         """
@@ -1074,6 +1264,7 @@ class MultiProcessor:
         """
         if block_number is not None:
             fetched_block_numbers.append(block_number)
+            metrics.counter("blocks_downloaded_total", "Blocks downloaded by the worker pool").inc()
             logger.info(f"Block {block_number} added to fetched_block_numbers.")
 
 
@@ -1124,11 +1315,36 @@ class MultiProcessor:
         """
 
         def error_callback(e):
+            metrics.counter("block_download_errors_total", "Blocks failed in the worker pool").inc()
             logger.error(f"Error occurred in async process: {e}")
 
         return error_callback
 
 
+    @staticmethod
+    def handle_worker_result(outcome, callback, error_callback):
+        """
+        Merges the metrics measured by a worker into the parent registry, then passes
+        the task result to `callback`, or its exception to `error_callback`.
+
+        Parameters
+        ----------
+        outcome : tuple
+            (result, exception or None, exported metrics) as returned by `run_with_metrics`.
+        callback : callable
+            Called with the result of a successful task.
+        error_callback : callable
+            Called with the exception of a failed task.
+        """
+        result, error, metrics_state = outcome
+        metrics.merge_state(metrics_state)
+
+        if error is not None:
+            error_callback(error)
+        else:
+            callback(result)
+
+
     def _create_interrupt_checker(self, check_interrupt):
         def check_interrupt_wrapper():
             if check_interrupt:
@@ -1173,18 +1389,23 @@ class MultiProcessor:
 
                 logger.info(f"Adding block to process: {block_number}")
 
+                error_callback = self._create_error_callback()
                 self.apply_async(
-                    process_func,
-                    args=(block_number, fetched_block_numbers, self.interrupt_flag),
-                    callback=lambda x: self.update_progress(
-                        x,
-                        progress_callback,
-                        len(target_block_numbers),
-                        fetched_block_numbers,
-                        save_callback,
-                        save_interval
+                    run_with_metrics,
+                    args=(process_func, (block_number, fetched_block_numbers, self.interrupt_flag)),
+                    callback=lambda outcome, error_callback=error_callback: self.handle_worker_result(
+                        outcome,
+                        lambda x: self.update_progress(
+                            x,
+                            progress_callback,
+                            len(target_block_numbers),
+                            fetched_block_numbers,
+                            save_callback,
+                            save_interval
+                        ),
+                        error_callback
                     ),
-                    error_callback=self._create_error_callback()
+                    error_callback=error_callback
                 )
                 time.sleep(0.5)
 
@@ -1229,6 +1450,7 @@ class MultiProcessor:
         save_interval : int, optional
             The interval at which progress should be saved, defaults to 50
         """
+        started = time.perf_counter()
         try:
             check_interrupt_wrapper = self._create_interrupt_checker(check_interrupt)
 
@@ -1246,6 +1468,24 @@ class MultiProcessor:
             self.pool.close()
             self.pool.join()
 
+            # measured in the parent, the per-request metrics arrive with every worker result #
+            elapsed = time.perf_counter() - started
+            metrics.histogram("download_run_seconds", "Duration of worker pool download runs").observe(elapsed)
+            metrics.gauge("download_blocks_per_second", "Throughput of the last worker pool download run").set(
+                self.total_processed_blocks.value / elapsed if elapsed else 0.0
+            )
+
+
+# runs in a pool worker: its registry is a copy of the parent's, so it is cleared and only the metrics #
+# of this task are sent back with the result; exceptions are returned too, so their metrics are not lost #
+def run_with_metrics(func, args):
+    metrics.reset()
+    try:
+        result, error = func(*args), None
+    except Exception as e:
+        result, error = None, e
+    return result, error, metrics.export_state()
+
 
 @ErrorHandler.ehdc()
 class MainBlockProcessor:
@@ -1270,7 +1510,7 @@ class MainBlockProcessor:
         self.config = config
         self.ether_api = EtherAPI(self.config)
         self.file_manager = FileManager()
-        self.block_service = BlockService(self.ether_api)
+        self.block_service = BlockService(self.ether_api, self.config.FETCH_RECEIPTS)
         self.block_downloader = BlockDownloader(self.ether_api, self.file_manager, self.config, self.block_service)
         self.block_processor = BlockProcessor(self.ether_api, self.file_manager, self.config, self.block_service)
     
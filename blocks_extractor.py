@@ -1,10 +1,15 @@
 import os
 import json
+import logging
+import time
 import heapq
 from datetime import datetime, timedelta, timezone
-from blocks_download import Config, EtherAPI, FileManager, BlockDownloader
+from blocks_download import Config, EtherAPI, FileManager, BlockDownloader, BlockService
 from logger import logger
 from error_handler import ErrorHandler
+from metrics import metrics
+from database_tool import DatabaseManager, SchemaMigrator, WalletSketchStore
+from sketches import build_hour_sketches
 from typing import Optional, Callable, Union
 
 
@@ -44,7 +49,7 @@ class BlockFileProcessor:
             block_data = self.file_manager.load_from_json(json_file)
             if not block_data:
                 logger.warning(f"File {json_file} is empty or corrupted. Attempting to fetch missing data.")
-                block_number = int(json_file.split('_')[1].split('.')[0])
+                block_number = int(os.path.basename(json_file).split('_')[1].split('.')[0])
                 self.block_downloader.download_single_block(block_number, [])
                 block_data = self.file_manager.load_from_json(json_file)
 
@@ -74,21 +79,26 @@ class TransactionsGrouper:
         A dictionary to store transactions grouped by hour.
     config: Config
         Configuration object containing settings.
+    columnar_store: ColumnarTransactionStore, optional
+        Store of days already decoded into columns; such days are read from it instead of JSON files.
     """
-    def __init__(self, block_file_processor: BlockFileProcessor, config: Config):
+    def __init__(self, block_file_processor: BlockFileProcessor, config: Config, columnar_store=None):
         self.block_file_processor = block_file_processor        
         self.transactions_by_hour = {}
         self.config = config
+        self.columnar_store = columnar_store
 
     def group_transactions_by_hour(
         self,
         progress_callback: Optional[Callable[[int, int], None]] = None,
-        check_interrupt: Optional[Callable[[], bool]] = None
+        check_interrupt: Optional[Callable[[], bool]] = None,
+        day: Optional[str] = None
     )   -> dict:
         """
         Groups transactions according to hour.
         Iterates through each JSON file listed in the configuration JSON FILES directory,
-        loading block data and grouping transactions.
+        loading block data and grouping transactions. When `day` is given and the columnar store
+        holds it, the hours are returned as zero-copy column views instead.
 
         Parameters
         ----------
@@ -96,22 +106,31 @@ class TransactionsGrouper:
             A callback function to report progress.
         check_interrupt : callable, optional
             A function to check if processing should be interrupted
+        day : str, optional
+            Day in the format "%Y-%m-%d" that is going to be analysed.
 
         Returns
         -------
         dict
             A dictionary where keys are hour strings and values are lists of transactions
-            that occurred during that hour.
+            (or `TransactionColumns` views) that occurred during that hour.
         """
+        if day and self.columnar_store and self.columnar_store.has_day(day):
+            logger.info(f"Reading transactions of {day} from the columnar store.")
+            self.transactions_by_hour = self.columnar_store.group_by_hour(day)
+            return self.transactions_by_hour
+
         self.transactions_by_hour = {}
         total_files = len(self.config.JSON_FILES)
         processed_files = 0            
 
         logger.info(f"Total files to process: {total_files}")
 
+        block_load_seconds = metrics.histogram("block_load_seconds", "Time of loading and parsing one block file")
         for json_file in self.config.JSON_FILES:            
 
-            block_data = self.block_file_processor.load_block_data(json_file)
+            with block_load_seconds.time():
+                block_data = self.block_file_processor.load_block_data(json_file)
 
             if check_interrupt and check_interrupt():
                 logger.warning("Processing interrupted by user.")
@@ -131,6 +150,7 @@ class TransactionsGrouper:
             if progress_callback:
                 progress_callback(total_files, progress_value) 
 
+        metrics.counter("blocks_grouped_total", "Block files grouped by hour").inc(processed_files)
         logger.info(f"Total files processed: {processed_files}/{total_files}")
         return self.transactions_by_hour
 
@@ -138,39 +158,52 @@ class TransactionsGrouper:
 @ErrorHandler.ehdc()
 class TransactionProcessor:    
     """    
-    A class for processing transactions.
+    A class for processing transactions. Totals are accumulated as integer wei
+    and converted to ETH only when read.
     
     Attributes
     ----------
     total_transactions: int
         A number of all transactions for given day/hour.
-    total_fees: float
-        The total value of fees.   
-    total_value_eth: float
-        The total value of transactions in ETH.
+    total_fees_wei: int
+        The total value of fees in wei.
+    total_value_wei: int
+        The total value of transactions in wei.
     """
     def __init__(self):
         self.total_transactions = 0
-        self.total_fees = 0
-        self.total_value_eth = 0
+        self.total_fees_wei = 0
+        self.total_value_wei = 0
 
 
     def reset(self):        
         self.total_transactions = 0
-        self.total_fees = 0.0        
-        self.total_value_eth = 0.0
+        self.total_fees_wei = 0
+        self.total_value_wei = 0
+
+
+    @property
+    def total_fees(self) -> float:
+        return self.total_fees_wei / 10**18
+
+
+    @property
+    def total_value_eth(self) -> float:
+        return self.total_value_wei / 10**18
 
 
     def process_transaction(self, transaction: dict) -> tuple:
         """       
         Retrieves detailed data for provided transaction including sender address
-        and receiver address, value in eth, gas amount and gas price.
+        and receiver address, value in eth, gas amount and gas price. When the transaction
+        was enriched with its receipt, the fee is computed from `gasUsed` and `effectiveGasPrice`,
+        otherwise from the gas limit and `gasPrice`.
 
         Parameters
         ----------
         transaction : dict
             A dictionary representing a single transaction from the blockchain, containing keys such as:
-            'from', 'to', 'value', 'gas', and 'gasPrice'.
+            'from', 'to', 'value', 'gas', and 'gasPrice' (optionally 'gasUsed' and 'effectiveGasPrice').
 
         Returns
         -------
@@ -181,20 +214,47 @@ class TransactionProcessor:
         sender = transaction["from"]
         receiver = transaction["to"]
         value_wei = int(transaction["value"], 16)
-        gas_price_wei = int(transaction["gasPrice"], 16)
-        gas_wei = int(transaction["gas"], 16)
 
         value_eth = value_wei / 10**18
-        transaction_fee_wei = gas_price_wei * gas_wei
-        transaction_fee_eth = transaction_fee_wei / 10**18
 
         self.total_transactions += 1
-        self.total_fees += transaction_fee_eth
-        self.total_value_eth += value_eth
+        self.total_fees_wei += self.get_fee_wei(transaction)
+        self.total_value_wei += value_wei
 
         return sender, receiver, value_eth
 
 
+    def process_columns(self, transaction_columns) -> None:
+        """
+        Adds the totals of a columnar batch of transactions without decoding them one by one.
+
+        Parameters
+        ----------
+        transaction_columns : TransactionColumns
+            A view over stored transactions, as returned by the columnar store.
+
+        Returns
+        -------
+        None
+        """
+        self.total_transactions += len(transaction_columns)
+        self.total_fees_wei += transaction_columns.total_fees_wei()
+        self.total_value_wei += transaction_columns.total_value_wei()
+
+
+    @staticmethod
+    @ErrorHandler.skip_ehd
+    def get_fee_wei(transaction: dict) -> int:
+        if "gasUsed" in transaction:
+            gas_price_wei = int(transaction.get("effectiveGasPrice") or transaction["gasPrice"], 16)
+            gas_wei = int(transaction["gasUsed"], 16)
+        else:
+            gas_price_wei = int(transaction["gasPrice"], 16)
+            gas_wei = int(transaction["gas"], 16)
+
+        return gas_price_wei * gas_wei
+
+
 @ErrorHandler.ehdc()
 class WalletUpdater:
     """    
@@ -213,7 +273,8 @@ class WalletUpdater:
     def reset(self):        
         # used to clear wallets transactions (for hourly data extract usage) #
         self.wallets_transactions = {}
-        logger.debug("WalletUpdater.reset - Reset wallet transactions.")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("WalletUpdater.reset - Reset wallet transactions.")
 
 
     def update_wallets(self, sender: str, receiver: str, value_eth: float) -> None:
@@ -245,12 +306,38 @@ class WalletUpdater:
         self.wallets_transactions[receiver].append({"value": value_eth, "type": "buy"})
 
 
+    def update_wallets_from_flows(self, wallet_flows: list) -> None:
+        """
+        Updates wallets with flows already aggregated per wallet (see `TransactionColumns.wallet_flows`).
+        Every flow is stored as one entry per transaction type, keeping its total under `value`
+        and the extreme single transactions under `min` and `max`.
+
+        Parameters
+        ----------
+        wallet_flows : list of tuple
+            (address, sell count, sold eth, biggest sell, smallest sell,
+             buy count, bought eth, biggest buy, smallest buy) tuples.
+
+        Returns
+        -------
+        None
+        """
+        for (address, sell_count, sold, biggest_sell, smallest_sell,
+             buy_count, bought, biggest_buy, smallest_buy) in wallet_flows:
+            entries = self.wallets_transactions.setdefault(address, [])
+            if sell_count:
+                entries.append({"value": -sold, "type": "sell", "min": -biggest_sell, "max": -smallest_sell})
+            if buy_count:
+                entries.append({"value": bought, "type": "buy", "min": smallest_buy, "max": biggest_buy})
+
+
 @ErrorHandler.ehdc()
 class WalletClassifier:
     """    
     A class for classifying wallets.
     """
     @staticmethod
+    @ErrorHandler.skip_ehd
     def classify_wallet(balance: float) -> str:
         """
         Assigns a classification to a wallet based on its balance.
@@ -341,18 +428,22 @@ class TopWalletsGenerator:
 
         top_wallets = heapq.nlargest(top_n, wallets_transactions.items(), key=key_func)
 
+        # aggregated entries carry their extreme single transactions under "min" and "max" #
+        extreme_key = "min" if is_seller else "max"
+        extreme_func = lambda x: x.get(extreme_key, x["value"])
+
         top_wallets_info = []
         for wallet_info in top_wallets:
             wallet_address, transactions = wallet_info
-            max_transaction_eth = min(transactions, key=lambda x: x["value"]) if is_seller\
-                                  else max(transactions, key=lambda x: x["value"])
+            max_transaction_eth = min(transactions, key=extreme_func) if is_seller\
+                                  else max(transactions, key=extreme_func)
 
             transaction_type = max_transaction_eth["type"]
             wallet_balance_eth = sum(transaction["value"] for transaction in transactions)
             wallet_info_with_balance = {
                 "wallet address": wallet_address,
                 "biggest transaction type (buy/sell)": transaction_type,
-                "biggest transaction amount in ether": max_transaction_eth["value"],
+                "biggest transaction amount in ether": extreme_func(max_transaction_eth),
                 "wallet balance": wallet_balance_eth
             }
             top_wallets_info.append(wallet_info_with_balance)
@@ -404,6 +495,7 @@ class ResultFormatter:
             "time": start_hour_str,
             "transactions number": total_transactions,
             "average transaction fee": average_fee_eth,
+            "total transaction fee": total_fees,
             "wallet classification in eth balance": wallets_balances,
             "top 5 buyers": top_wallets_generator.get_top_wallets(wallets_transactions, top_n=5, is_seller=False),
             "top 5 sellers": top_wallets_generator.get_top_wallets(wallets_transactions, top_n=5, is_seller=True)
@@ -412,6 +504,24 @@ class ResultFormatter:
         return result_data
 
 
+@ErrorHandler.ehd()
+def process_transactions(transactions, transaction_processor, wallet_updater) -> None:
+    """
+    Feeds a batch of transactions into the processor and the wallet updater.
+    Lists of transaction dictionaries are processed one by one, columnar views in a single pass.
+    """
+    if isinstance(transactions, list):
+        # errors of single transactions are handled by this function, the per-transaction calls skip the wrappers #
+        process_transaction = ErrorHandler.unwrap(transaction_processor.process_transaction)
+        update_wallets = ErrorHandler.unwrap(wallet_updater.update_wallets)
+        for transaction in transactions:
+            sender, receiver, value_eth = process_transaction(transaction)
+            update_wallets(sender, receiver, value_eth)
+    else:
+        transaction_processor.process_columns(transactions)
+        wallet_updater.update_wallets_from_flows(transactions.wallet_flows())
+
+
 @ErrorHandler.ehdc()
 class DailyDataExtractor:
     """
@@ -425,6 +535,8 @@ class DailyDataExtractor:
     wallet_classifier : WalletClassifier
     top_wallets_generator : TopWalletsGenerator
     result_formatter : ResultFormatter
+    config : Config, optional
+        Configuration with the output location (default is the global `Config`).
     """    
     def __init__(
         self,
@@ -433,7 +545,8 @@ class DailyDataExtractor:
          wallet_updater: WalletUpdater,
          wallet_classifier: WalletClassifier,
          top_wallets_generator: TopWalletsGenerator,
-         result_formatter: ResultFormatter
+         result_formatter: ResultFormatter,
+         config: Optional[Config] = None
     )    -> None:
 
         self.transactions_grouper = transactions_grouper
@@ -442,7 +555,7 @@ class DailyDataExtractor:
         self.wallet_classifier = wallet_classifier
         self.top_wallets_generator = top_wallets_generator
         self.result_formatter = result_formatter
-        self.config = Config()
+        self.config = config or Config()
 
 
     def extract_data(
@@ -468,6 +581,7 @@ class DailyDataExtractor:
         None
         """    
         logger.info("Starting daily data extraction.")
+        extraction_started = time.perf_counter()
         transactions_for_day = []
 
         start_hour = datetime.strptime(extract_date, "%Y-%m-%d %H:%M:%S")
@@ -477,7 +591,8 @@ class DailyDataExtractor:
 
         transactions_by_hour = self.transactions_grouper.group_transactions_by_hour(
             progress_callback,
-            check_interrupt
+            check_interrupt,
+            start_hour_str
         )
 
         logger.debug("Finished transaction grouping for daily extraction.")   
@@ -485,13 +600,12 @@ class DailyDataExtractor:
         for hour, transactions_in_hour in transactions_by_hour.items():
             hour_datetime = datetime.strptime(hour, "%Y-%m-%d %H:%M:%S")
             if hour_datetime.date() == start_hour.date():
-                transactions_for_day.extend(transactions_in_hour)   
+                transactions_for_day.append(transactions_in_hour)   
 
         logger.debug("Starting update wallets for daily extraction.") 
 
-        for transaction in transactions_for_day:
-            sender, receiver, value_eth = self.transaction_processor.process_transaction(transaction)
-            self.wallet_updater.update_wallets(sender, receiver, value_eth) 
+        for transactions_in_hour in transactions_for_day:
+            process_transactions(transactions_in_hour, self.transaction_processor, self.wallet_updater)
 
         logger.debug("Finished update wallets for daily extraction.")     
 
@@ -518,6 +632,9 @@ class DailyDataExtractor:
         with open(output_file_path, 'w') as output_file:
             json.dump(result_data, output_file, indent=4) # type: ignore
 
+        metrics.histogram("extraction_seconds", "Duration of data extraction runs", extractor="daily").observe(
+            time.perf_counter() - extraction_started
+        )
         logger.info(f"Daily data extraction completed for date {date_part}.")
 
 
@@ -534,6 +651,10 @@ class HourlyDataExtractor:
     wallet_classifier : WalletClassifier
     top_wallets_generator : TopWalletsGenerator
     result_formatter : ResultFormatter
+    config : Config, optional
+        Configuration with the output location (default is the global `Config`).
+    sketch_store : WalletSketchStore, optional
+        Store for the wallet sketches of every hour; sketches are not built without it.
 
     Returns
     ----------
@@ -546,7 +667,9 @@ class HourlyDataExtractor:
             wallet_updater,
             wallet_classifier,
             top_wallets_generator,
-            result_formatter
+            result_formatter,
+            config=None,
+            sketch_store=None
     )       -> None:
 
         self.transactions_grouper = transactions_grouper
@@ -555,7 +678,8 @@ class HourlyDataExtractor:
         self.wallet_classifier = wallet_classifier
         self.top_wallets_generator = top_wallets_generator
         self.result_formatter = result_formatter
-        self.config = Config()
+        self.config = config or Config()
+        self.sketch_store = sketch_store
 
 
     def extract_data(
@@ -581,19 +705,27 @@ class HourlyDataExtractor:
 
         """   
         logger.info("Starting hourly data extraction.")
+        extraction_started = time.perf_counter()
 
         hourly_results_all = []         
+        hour_sketches = {}
 
         start_hour = datetime.strptime(extract_date, "%Y-%m-%d %H:%M:%S")            
         current_hour = start_hour
 
         logger.debug("Starting transaction grouping for hourly extraction.")   
 
-        transactions_by_hour = self.transactions_grouper.group_transactions_by_hour(progress_callback, check_interrupt)      
+        transactions_by_hour = self.transactions_grouper.group_transactions_by_hour(
+            progress_callback,
+            check_interrupt,
+            start_hour.strftime("%Y-%m-%d")
+        )      
 
         logger.debug("Finished transaction grouping for hourly extraction.")   
         
+        hour_seconds = metrics.histogram("extraction_hour_seconds", "Time of extracting the results of one hour")
         while current_hour.hour <= 23:
+            hour_started = time.perf_counter()
             start_hour_str = current_hour.strftime("%Y-%m-%d %H:%M:%S")
 
             self.transaction_processor.reset()
@@ -601,23 +733,21 @@ class HourlyDataExtractor:
 
             transactions_for_hour = transactions_by_hour.get(start_hour_str, [])
             
-            logger.debug(f"Starting update wallets for {current_hour} hour.")   
+            logger.debug("Starting update wallets for %s hour.", current_hour)
 
-            if transactions_for_hour:                               
-                for transaction in transactions_for_hour:                    
-                    sender, receiver, value_eth = self.transaction_processor.process_transaction(transaction)
-                    self.wallet_updater.update_wallets(sender, receiver, value_eth)
-                logger.debug(f"Finished update wallets for {current_hour} hour.")    
+            if len(transactions_for_hour):                               
+                process_transactions(transactions_for_hour, self.transaction_processor, self.wallet_updater)
+                logger.debug("Finished update wallets for %s hour.", current_hour)
             else:
-                logger.debug(f"No transactions for {current_hour} hour, skipping result formatting.")
+                logger.debug("No transactions for %s hour, skipping result formatting.", current_hour)
             
-            logger.debug(f"Starting classify wallets for {current_hour} hour.")  
+            logger.debug("Starting classify wallets for %s hour.", current_hour)
 
             wallets_balances = self.wallet_classifier.classify_wallets(self.wallet_updater.wallets_transactions)
 
-            logger.debug(f"Finished classify wallets for {current_hour} hour.")  
+            logger.debug("Finished classify wallets for %s hour.", current_hour)
             
-            logger.debug(f"Starting format results for {current_hour} hour.")
+            logger.debug("Starting format results for %s hour.", current_hour)
 
             result_data = self.result_formatter.format_result(
                 start_hour_str,
@@ -627,11 +757,17 @@ class HourlyDataExtractor:
                 self.top_wallets_generator,
                 self.wallet_updater.wallets_transactions
             )
-            logger.debug(f"Finished format results for {current_hour} hour.")
+            logger.debug("Finished format results for %s hour.", current_hour)
+
+            if self.sketch_store:
+                hour_sketches[start_hour_str] = build_hour_sketches(
+                    self.wallet_updater.wallets_transactions, self.wallet_classifier.classify_wallet
+                )
 
             hourly_results_all.append(result_data)
+            hour_seconds.observe(time.perf_counter() - hour_started)
 
-            logger.debug(f"Finished processing {current_hour} hour.")    
+            logger.debug("Finished processing %s hour.", current_hour)
 
             current_hour += timedelta(hours=1)
 
@@ -643,14 +779,242 @@ class HourlyDataExtractor:
         with open(output_file_path, 'w') as output_file:
             json.dump(hourly_results_all, output_file, indent=4) # type: ignore
 
+        if self.sketch_store:
+            self.sketch_store.save_sketches(hour_sketches)
+
+        metrics.histogram("extraction_seconds", "Duration of data extraction runs", extractor="hourly").observe(
+            time.perf_counter() - extraction_started
+        )
         logger.info(f"Hourly data extraction completed for date {date_part}.")
 
 
+@ErrorHandler.ehdc()
+class IncrementalHourlyAggregator:
+    """
+    Aggregates hourly statistics block by block, as blocks arrive, without re-reading block files.
+
+    The contribution of every block is kept separately until its hour is closed, so a single block
+    can be retracted later without recomputing the whole hour.
+
+    Parameters
+    ----------
+    transaction_processor : TransactionProcessor
+    wallet_updater : WalletUpdater
+    wallet_classifier : WalletClassifier
+    top_wallets_generator : TopWalletsGenerator
+    result_formatter : ResultFormatter
+    config : Config
+    sketch_store : WalletSketchStore, optional
+        Store for the wallet sketches of every flushed hour; sketches are not built without it.
+
+    Attributes
+    ----------
+    hours : dict
+        Open hours keyed by hour string ("%Y-%m-%d %H:00:00"), each mapping block numbers
+        to the block contribution (transactions number, total fees and wallet transfers).
+    block_hours : dict
+        Hour string of every block currently held in `hours`, keyed by block number.
+    dirty_hours : set
+        Hours changed by added or retracted blocks since the last flush.
+    """
+    def __init__(
+            self,
+            transaction_processor: TransactionProcessor,
+            wallet_updater: WalletUpdater,
+            wallet_classifier: WalletClassifier,
+            top_wallets_generator: TopWalletsGenerator,
+            result_formatter: ResultFormatter,
+            config: Config,
+            sketch_store: Optional[WalletSketchStore] = None
+    )       -> None:
+
+        self.transaction_processor = transaction_processor
+        self.wallet_updater = wallet_updater
+        self.wallet_classifier = wallet_classifier
+        self.top_wallets_generator = top_wallets_generator
+        self.result_formatter = result_formatter
+        self.config = config
+        self.sketch_store = sketch_store
+        self.hours = {}
+        self.block_hours = {}
+        self.dirty_hours = set()
+
+
+    def add_block(self, block_data: dict) -> str:
+        """
+        Adds the transactions of a single block to the hour the block belongs to.
+
+        Parameters
+        ----------
+        block_data : dict
+            Block data with `block_number`, `timestamp` and `transactions` keys.
+
+        Returns
+        -------
+        str
+            The hour string the block was added to.
+        """
+        block_number = block_data["block_number"]
+        if block_number in self.block_hours:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Block {block_number} already aggregated. Skipping...")
+            return self.block_hours[block_number]
+
+        hour = datetime.fromtimestamp(int(block_data["timestamp"]), tz=timezone.utc).strftime("%Y-%m-%d %H:00:00")
+
+        self.transaction_processor.reset()
+        process_transaction = ErrorHandler.unwrap(self.transaction_processor.process_transaction)
+        transfers = [process_transaction(transaction) for transaction in block_data["transactions"]]
+
+        self.hours.setdefault(hour, {})[block_number] = {
+            "transactions number": self.transaction_processor.total_transactions,
+            "total fees wei": self.transaction_processor.total_fees_wei,
+            "transfers": transfers,
+        }
+        self.block_hours[block_number] = hour
+        self.dirty_hours.add(hour)
+
+        return hour
+
+
+    def retract_block(self, block_number: int) -> Optional[str]:
+        """
+        Removes the contribution of a single block (e.g. a reorged one) from its hour.
+        The hour stays in memory, so the next flush rewrites its saved result.
+
+        Parameters
+        ----------
+        block_number : int
+            The number of the block to retract.
+
+        Returns
+        -------
+        str or None
+            The hour string the block was removed from, or None if the block was not aggregated.
+        """
+        hour = self.block_hours.pop(block_number, None)
+        if hour is None:
+            return None
+
+        del self.hours[hour][block_number]
+        self.dirty_hours.add(hour)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Block {block_number} retracted from hour {hour}.")
+        return hour
+
+
+    def get_hour_result(self, hour: str) -> dict:
+        """
+        Formats the current statistics of a single hour.
+
+        Parameters
+        ----------
+        hour : str
+            Hour string in the format "%Y-%m-%d %H:00:00".
+
+        Returns
+        -------
+        dict
+            Hour result in the same format as produced by HourlyDataExtractor.
+        """
+        total_transactions = 0
+        total_fees_wei = 0
+        self.wallet_updater.reset()
+
+        update_wallets = ErrorHandler.unwrap(self.wallet_updater.update_wallets)
+        for contribution in self.hours.get(hour, {}).values():
+            total_transactions += contribution["transactions number"]
+            total_fees_wei += contribution["total fees wei"]
+            for sender, receiver, value_eth in contribution["transfers"]:
+                update_wallets(sender, receiver, value_eth)
+
+        wallets_balances = self.wallet_classifier.classify_wallets(self.wallet_updater.wallets_transactions)
+
+        return self.result_formatter.format_result(
+            hour,
+            total_transactions,
+            total_fees_wei / 10**18,
+            wallets_balances,
+            self.top_wallets_generator,
+            self.wallet_updater.wallets_transactions
+        )
+
+
+    def flush(self, current_hour: str) -> list:
+        """
+        Formats results of the hours changed since the last flush, saves them (with their wallet sketches)
+        and evicts hours older than `current_hour`.
+
+        Parameters
+        ----------
+        current_hour : str
+            The hour of the newest aggregated block. Hours before it are complete and are closed.
+
+        Returns
+        -------
+        list of dict
+            Results of the flushed hours, sorted by time.
+        """
+        results = []
+        hour_sketches = {}
+        for hour in sorted(self.dirty_hours):
+            results.append(self.get_hour_result(hour))
+            # the wallet updater still holds the transfers of this hour #
+            if self.sketch_store:
+                hour_sketches[hour] = build_hour_sketches(
+                    self.wallet_updater.wallets_transactions, self.wallet_classifier.classify_wallet
+                )
+
+        self.save_hourly_results(results)
+        if self.sketch_store:
+            self.sketch_store.save_sketches(hour_sketches)
+        self.dirty_hours.clear()
+
+        for hour in [hour for hour in self.hours if hour < current_hour]:
+            for block_number in self.hours.pop(hour):
+                del self.block_hours[block_number]
+            logger.info(f"Hour {hour} closed.")
+
+        return results
+
+
+    def save_hourly_results(self, results: list) -> None:
+        """
+        Merges hour results into the daily `<date>_hourly_data.json` files, replacing entries of the same hour.
+
+        Parameters
+        ----------
+        results : list of dict
+            Hour results as returned by `get_hour_result`.
+        """
+        results_by_date = {}
+        for result in results:
+            results_by_date.setdefault(result["time"][:10], []).append(result)
+
+        for date_part, date_results in results_by_date.items():
+            output_file_path = os.path.join(self.config.BASE_DIR, self.config.OUTPUT_FOLDER, f"{date_part}_hourly_data.json")
+
+            existing_results = {}
+            if os.path.exists(output_file_path):
+                with open(output_file_path, 'r') as output_file:
+                    existing_results = {entry["time"]: entry for entry in json.load(output_file)}
+
+            existing_results.update({result["time"]: result for result in date_results})
+
+            with open(output_file_path, 'w') as output_file:
+                json.dump([existing_results[time] for time in sorted(existing_results)], output_file, indent=4) # type: ignore
+
+            logger.debug(f"Hourly results saved for date {date_part}.")
+
+
 #todo
 @ErrorHandler.ehdc()
 class ExtractorFactory:
     @staticmethod
-    def create_extractor(extractor_type: str) -> Union['HourlyDataExtractor', 'DailyDataExtractor']:
+    def create_extractor(
+            extractor_type: str,
+            config: Optional[Config] = None
+    )       -> Union['HourlyDataExtractor', 'DailyDataExtractor']:
         """
         Create an extractor of the specified type for the given extraction date.
 
@@ -658,6 +1022,8 @@ class ExtractorFactory:
         ----------
         extractor_type : str
             The type of extractor to create. Must be either 'hourly' or 'daily'.
+        config : Config, optional
+            Configuration used for block files and results (default is the global `Config`).
 
         Returns
         -------
@@ -672,12 +1038,8 @@ class ExtractorFactory:
 
         logger.info(f"Attempting to create extractor of type: {extractor_type}")
 
-        config = Config()
-        api = EtherAPI(config)
-        file_manager = FileManager(config)
-        block_downloader = BlockDownloader(api, file_manager, config)
-        block_file_processor = BlockFileProcessor(block_downloader, file_manager)
-        transactions_grouper = TransactionsGrouper(block_file_processor, config)
+        config = config or Config()
+        transactions_grouper = ExtractorFactory.create_transactions_grouper(config)
         transaction_processor = TransactionProcessor()
         wallet_updater = WalletUpdater()
         wallet_classifier = WalletClassifier()
@@ -691,7 +1053,9 @@ class ExtractorFactory:
                 wallet_updater,
                 wallet_classifier,
                 top_wallets_generator,
-                result_formatter
+                result_formatter,
+                config,
+                ExtractorFactory.create_sketch_store(config)
             )
         elif extractor_type == 'daily':
             extractor = DailyDataExtractor(
@@ -700,7 +1064,8 @@ class ExtractorFactory:
                 wallet_updater,
                 wallet_classifier,
                 top_wallets_generator,
-                result_formatter
+                result_formatter,
+                config
             )
         else:
             raise ValueError(f"Invalid extractor type: {extractor_type}")
@@ -709,6 +1074,29 @@ class ExtractorFactory:
         return extractor
 
 
+    @staticmethod
+    def create_transactions_grouper(config: Config) -> TransactionsGrouper:
+        api = EtherAPI(config)
+        file_manager = FileManager()
+        block_downloader = BlockDownloader(api, file_manager, config, BlockService(api, config.FETCH_RECEIPTS))
+        block_file_processor = BlockFileProcessor(block_downloader, file_manager)
+
+        columnar_store = None
+        if config.COLUMNAR_STORE:
+            # numpy is only needed when the columnar store is enabled #
+            from columnar_store import ColumnarStoreFactory
+            columnar_store = ColumnarStoreFactory.get_store(config)
+
+        return TransactionsGrouper(block_file_processor, config, columnar_store)
+
+
+    @staticmethod
+    def create_sketch_store(config: Config) -> WalletSketchStore:
+        db_manager = DatabaseManager.get_shared(config.DB_FILENAME, config.DB_CACHE_SIZE_KB, config.DB_MMAP_SIZE)
+        SchemaMigrator(db_manager).migrate()
+        return WalletSketchStore(db_manager)
+
+
 if __name__ == "__main__":
     """
     For testing the data extraction functionality.
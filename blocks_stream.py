@@ -0,0 +1,608 @@
+import os
+import time
+import threading
+from config import Config
+from logger import logger
+from error_handler import ErrorHandler
+from blocks_download import EtherAPI, FileManager, BlockService
+from blocks_extractor import (IncrementalHourlyAggregator, TransactionProcessor, WalletUpdater, WalletClassifier,
+                              TopWalletsGenerator, ResultFormatter, ExtractorFactory)
+from typing import Optional, Callable
+
+
+@ErrorHandler.ehdc()
+class HeadWatcher:
+    """
+    Polls `eth_blockNumber` on a background thread and reports every new chain head.
+    Failed polls are retried with exponential backoff, capped at `max_backoff` seconds.
+
+    Parameters
+    ----------
+    ether_api : EtherAPI
+        API used to fetch the latest block number.
+    poll_interval : float, optional
+        Seconds between polls (default is 4.0).
+    max_backoff : float, optional
+        Maximum delay in seconds between polls after errors (default is 60.0).
+    """
+    def __init__(self, ether_api, poll_interval=4.0, max_backoff=60.0):
+        self.ether_api = ether_api
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.latest_block = None
+        self.on_new_head = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+
+    def start(self, on_new_head):
+        self.on_new_head = on_new_head
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.watch, name="HeadWatcher", daemon=True)
+        self.thread.start()
+        logger.info(f"Watching chain head every {self.poll_interval}s")
+
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.poll_interval)
+        self.thread = None
+
+
+    def watch(self):
+        delay = 0.0
+        while not self.stop_event.wait(delay):
+            # any failure, including one in the new head callback, must not end the watcher thread #
+            try:
+                self.check_new_head(self.ether_api.get_latest_block_number())
+            except Exception as e:
+                delay = self.next_backoff(delay)
+                logger.warning(f"Head polling failed, retrying in {delay:.1f}s: {e!r}")
+                continue
+
+            delay = self.poll_interval
+
+
+    def check_new_head(self, block_number):
+        if self.latest_block is not None and block_number <= self.latest_block:
+            return False
+
+        self.latest_block = block_number
+        self.on_new_head(block_number)
+        return True
+
+
+    def next_backoff(self, delay):
+        return min(max(delay, self.poll_interval) * 2, self.max_backoff)
+
+
+@ErrorHandler.ehdc()
+class StreamState:
+    """
+    Persistent cursor of the follow-the-head mode.
+
+    Attributes
+    ----------
+    last_block : int or None
+        The number of the last block ingested in tail mode.
+    open_blocks : list of int
+        Blocks of hours that are not closed yet; they are re-aggregated after a restart.
+    """
+    def __init__(self, file_manager: FileManager, state_file: str) -> None:
+        self.file_manager = file_manager
+        self.state_file = state_file
+        self.last_block = None
+        self.open_blocks = []
+
+
+    def load(self) -> None:
+        if not os.path.exists(self.state_file):
+            logger.info("No stream state found, starting from the current chain head.")
+            return
+
+        state = self.file_manager.load_from_json(self.state_file)
+        self.last_block = state.get("last_block")
+        self.open_blocks = state.get("open_blocks", [])
+        logger.info(f"Stream state loaded, last ingested block: {self.last_block}")
+
+
+    def save(self) -> None:
+        if self.last_block is None:
+            return
+
+        self.file_manager.save_to_json(
+            {"last_block": self.last_block, "open_blocks": self.open_blocks},
+            self.state_file
+        )
+
+
+@ErrorHandler.ehdc()
+class ConfirmationWindow:
+    """
+    Tracks the most recent, not yet final blocks by hash. New blocks must chain onto the tracked ones
+    through their parentHash; tracked blocks are cheaply re-verified by comparing header hashes, and only
+    blocks that were reorged out are re-fetched. Blocks deeper than `depth` below the head are finalized
+    and leave the window.
+
+    Parameters
+    ----------
+    config : Config
+        Configuration object containing settings.
+    ether_api : EtherAPI
+        API used to fetch block headers for re-verification.
+    block_service : BlockService
+        Service used to fetch whole blocks.
+    file_manager : FileManager
+        File manager used for the block store and the window state.
+    depth : int
+        Number of blocks a block must be buried under before it is considered final.
+    state_file : str
+        Path of the JSON file the window is persisted to.
+
+    Attributes
+    ----------
+    blocks : dict
+        Tracked blocks, {block number: {"hash": str, "parent_hash": str}}.
+    """
+    def __init__(
+            self,
+            config: Config,
+            ether_api: EtherAPI,
+            block_service: BlockService,
+            file_manager: FileManager,
+            depth: int,
+            state_file: str
+    )       -> None:
+
+        self.config = config
+        self.ether_api = ether_api
+        self.block_service = block_service
+        self.file_manager = file_manager
+        self.depth = depth
+        self.state_file = state_file
+        self.blocks = {}
+
+
+    def load(self) -> None:
+        if not os.path.exists(self.state_file):
+            return
+
+        state = self.file_manager.load_from_json(self.state_file)
+        self.blocks = {int(block_number): block for block_number, block in state.items()}
+        logger.info(f"Confirmation window loaded, {len(self.blocks)} unconfirmed blocks.")
+
+
+    def save(self) -> None:
+        self.file_manager.save_to_json(
+            {str(block_number): block for block_number, block in sorted(self.blocks.items())},
+            self.state_file
+        )
+
+
+    def fetch_block(
+            self,
+            block_number: int,
+            on_block_replaced: Optional[Callable[[int, dict], None]] = None
+    )       -> dict:
+        """
+        Fetches a new block, saves it to the block store and starts tracking it. If the block does not
+        chain onto the tracked predecessor, the window is revalidated first.
+
+        Parameters
+        ----------
+        block_number : int
+            The number of the block to fetch.
+        on_block_replaced : callable, optional
+            Called with (block number, new block data) for every re-fetched, reorged block.
+
+        Returns
+        -------
+        dict
+            The fetched block data.
+        """
+        block_data = self.fetch_and_store(block_number)
+        previous_block = self.blocks.get(block_number - 1)
+
+        if previous_block and previous_block["hash"] != block_data["parent_hash"]:
+            logger.warning(f"Block {block_number} does not extend tracked block {block_number - 1}, revalidating.")
+            self.revalidate(on_block_replaced)
+
+            if self.blocks[block_number - 1]["hash"] != block_data["parent_hash"]:
+                block_data = self.fetch_and_store(block_number)
+
+        self.track(block_data)
+        return block_data
+
+
+    def revalidate(self, on_block_replaced: Optional[Callable[[int, dict], None]] = None) -> list:
+        """
+        Re-verifies the tracked blocks and re-fetches the ones that were reorged out.
+
+        Parameters
+        ----------
+        on_block_replaced : callable, optional
+            Called with (block number, new block data) for every re-fetched block.
+
+        Returns
+        -------
+        list of int
+            Numbers of the reorged blocks.
+        """
+        reorged_blocks = self.find_reorged_blocks()
+
+        for block_number in reorged_blocks:
+            block_data = self.fetch_and_store(block_number)
+            self.track(block_data)
+
+            if on_block_replaced:
+                on_block_replaced(block_number, block_data)
+
+        if reorged_blocks:
+            logger.warning(f"Reorg detected, re-fetched blocks {reorged_blocks[0]} - {reorged_blocks[-1]}.")
+
+        return reorged_blocks
+
+
+    def find_reorged_blocks(self) -> list:
+        """
+        Walks back from the newest tracked block until a block whose hash is still canonical is found.
+        On an unchanged chain this costs a single header request.
+
+        Returns
+        -------
+        list of int
+            Numbers of the tracked blocks which are no longer canonical, in ascending order.
+        """
+        reorged_blocks = []
+
+        for block_number in sorted(self.blocks, reverse=True):
+            header = self.ether_api.get_block(block_number, full_transactions=False)
+            if header["hash"] == self.blocks[block_number]["hash"]:
+                break
+            reorged_blocks.append(block_number)
+
+        return sorted(reorged_blocks)
+
+
+    def prune(self, head_block: int) -> list:
+        """
+        Stops tracking blocks that are at least `depth` blocks below the head.
+
+        Parameters
+        ----------
+        head_block : int
+            The current chain head.
+
+        Returns
+        -------
+        list of int
+            Numbers of the finalized blocks.
+        """
+        finalized_blocks = sorted(
+            block_number for block_number in self.blocks if block_number <= head_block - self.depth
+        )
+
+        for block_number in finalized_blocks:
+            del self.blocks[block_number]
+
+        return finalized_blocks
+
+
+    def oldest_block(self) -> Optional[int]:
+        return min(self.blocks) if self.blocks else None
+
+
+    def track(self, block_data: dict) -> None:
+        self.blocks[block_data["block_number"]] = {
+            "hash": block_data["hash"],
+            "parent_hash": block_data["parent_hash"]
+        }
+
+
+    def fetch_and_store(self, block_number: int) -> dict:
+        block_data = self.block_service.fetch_full_block(block_number)
+        self.file_manager.save_to_json(
+            block_data,
+            os.path.join(self.config.BLOCKS_DATA_DIR, f"block_{block_number}.json")
+        )
+        return block_data
+
+
+@ErrorHandler.ehdc()
+class HeadFollower:
+    """
+    Continuous "tail" ingestion mode. Tracks the chain head and downloads every new block exactly once,
+    saving it to the block store and feeding it to the incremental hourly aggregator. Without a confirmation
+    window a block is ingested as soon as it is `confirmation_depth` blocks deep; with one, blocks are
+    ingested at the head and reorged blocks are retracted from the aggregates and replaced.
+
+    Parameters
+    ----------
+    config : Config
+        Configuration object containing settings.
+    block_service : BlockService
+        Service used to fetch whole blocks.
+    file_manager : FileManager
+        File manager used for the block store.
+    aggregator : IncrementalHourlyAggregator
+        Aggregator receiving every ingested block.
+    state : StreamState
+        Persistent cursor of the ingestion.
+    head_watcher : HeadWatcher
+        Watcher signalling new chain heads.
+    confirmation_depth : int
+        Number of blocks a block must be buried under before it is ingested.
+    confirmation_window : ConfirmationWindow, optional
+        Window tracking unconfirmed blocks; enables ingestion at the chain head.
+    """
+    def __init__(
+            self,
+            config: Config,
+            block_service: BlockService,
+            file_manager: FileManager,
+            aggregator: IncrementalHourlyAggregator,
+            state: StreamState,
+            head_watcher: HeadWatcher,
+            confirmation_depth: int,
+            confirmation_window: Optional[ConfirmationWindow] = None
+    )       -> None:
+
+        self.config = config
+        self.block_service = block_service
+        self.file_manager = file_manager
+        self.aggregator = aggregator
+        self.state = state
+        self.head_watcher = head_watcher
+        self.confirmation_depth = confirmation_depth
+        self.confirmation_window = confirmation_window
+        self.new_head_event = threading.Event()
+        self.fetched_block_numbers = []
+        self.fetched_block_set = set()
+        self.interrupt_poll_interval = 1.0
+
+
+    def run(
+            self,
+            progress_callback: Optional[Callable[[int, int], None]] = None,
+            check_interrupt: Optional[Callable[[], bool]] = None
+    )       -> None:
+        """
+        Follows the chain head until interrupted.
+
+        Parameters
+        ----------
+        progress_callback : callable, optional
+            Called with (confirmed head, last ingested block) after every ingested block.
+        check_interrupt : callable, optional
+            A function to check if processing should be interrupted.
+        """
+        check_interrupt = check_interrupt or (lambda: False)
+
+        self.load_store()
+        self.head_watcher.start(on_new_head=self.on_new_head)
+        logger.info(f"Following chain head with confirmation depth {self.confirmation_depth}.")
+
+        delay = 0.0
+        try:
+            while not check_interrupt():
+                if not self.new_head_event.wait(self.interrupt_poll_interval):
+                    continue
+                self.new_head_event.clear()
+
+                # a failed block fetch must not end the tail mode, the same head is retried after a backoff #
+                try:
+                    self.process_new_head(self.head_watcher.latest_block, progress_callback, check_interrupt)
+                    delay = 0.0
+                except Exception as e:
+                    delay = self.head_watcher.next_backoff(delay)
+                    logger.warning(f"Ingesting new head failed, retrying in {delay:.1f}s: {e!r}")
+                    self.wait_for_retry(delay, check_interrupt)
+                    self.new_head_event.set()
+
+        finally:
+            self.head_watcher.stop()
+            self.state.save()
+            if self.confirmation_window:
+                self.confirmation_window.save()
+            logger.info("Following chain head stopped.")
+
+
+    def on_new_head(self, block_number: int) -> None:
+        self.new_head_event.set()
+
+
+    def wait_for_retry(self, delay: float, check_interrupt: Callable[[], bool]) -> None:
+        deadline = time.monotonic() + delay
+        while not check_interrupt():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, self.interrupt_poll_interval))
+
+
+    def load_store(self) -> None:
+        """
+        Loads the stream cursor and the list of fetched blocks, and re-aggregates blocks of hours
+        which were still open when the previous run stopped.
+        """
+        self.state.load()
+        if self.confirmation_window:
+            self.confirmation_window.load()
+
+        if os.path.exists(self.config.BLOCKS_DATA_FILE):
+            self.fetched_block_numbers = self.file_manager.load_from_json(self.config.BLOCKS_DATA_FILE)
+        self.fetched_block_set = set(self.fetched_block_numbers)
+
+        for block_number in self.state.open_blocks:
+            block_path = self.get_block_path(block_number)
+            if os.path.exists(block_path):
+                self.aggregator.add_block(self.file_manager.load_from_json(block_path))
+
+
+    def process_new_head(
+            self,
+            head_block: int,
+            progress_callback: Optional[Callable[[int, int], None]] = None,
+            check_interrupt: Optional[Callable[[], bool]] = None
+    )       -> list:
+        """
+        Ingests all blocks that became available since the last ingested block. With a confirmation window
+        the tracked blocks are revalidated first and hours stay open while any of their blocks is unconfirmed.
+
+        Parameters
+        ----------
+        head_block : int
+            The current chain head.
+        progress_callback : callable, optional
+            Called with (confirmed head, last ingested block) after every ingested block.
+        check_interrupt : callable, optional
+            A function to check if processing should be interrupted.
+
+        Returns
+        -------
+        list of int
+            Numbers of the ingested blocks.
+        """
+        confirmed_head = head_block - self.confirmation_depth
+        target_head = head_block if self.confirmation_window else confirmed_head
+        if self.state.last_block is None:
+            self.state.last_block = target_head - 1
+
+        ingested_blocks = []
+        current_hour = None
+        block_number = self.state.last_block + 1
+
+        if self.confirmation_window:
+            self.confirmation_window.revalidate(self.replace_block)
+
+        while block_number <= target_head:
+            if check_interrupt and check_interrupt():
+                logger.info("Following chain head interrupted by user.")
+                break
+
+            current_hour = self.ingest_block(block_number)
+            ingested_blocks.append(block_number)
+            self.state.last_block = block_number
+
+            if progress_callback:
+                progress_callback(target_head, block_number)
+
+            block_number += 1
+
+        if ingested_blocks:
+            self.aggregator.flush(self.get_open_hour(current_hour, head_block))
+            self.state.open_blocks = sorted(self.aggregator.block_hours)
+            self.state.save()
+            self.file_manager.save_to_json(self.fetched_block_numbers, self.config.BLOCKS_DATA_FILE)
+            logger.info(f"Ingested blocks {ingested_blocks[0]} - {ingested_blocks[-1]}.")
+            if self.confirmation_window:
+                self.confirmation_window.save()
+
+        return ingested_blocks
+
+
+    def ingest_block(self, block_number: int) -> str:
+        """
+        Saves a single block to the block store (unless already there) and aggregates it.
+
+        Parameters
+        ----------
+        block_number : int
+            The number of the block to ingest.
+
+        Returns
+        -------
+        str
+            The hour string the block was aggregated into.
+        """
+        block_path = self.get_block_path(block_number)
+
+        if self.confirmation_window:
+            block_data = self.confirmation_window.fetch_block(block_number, self.replace_block)
+        elif block_number in self.fetched_block_set and os.path.exists(block_path):
+            block_data = self.file_manager.load_from_json(block_path)
+        else:
+            block_data = self.block_service.fetch_full_block(block_number)
+            self.file_manager.save_to_json(block_data, block_path)
+
+        if block_number not in self.fetched_block_set:
+            self.fetched_block_set.add(block_number)
+            self.fetched_block_numbers.append(block_number)
+
+        return self.aggregator.add_block(block_data)
+
+
+    def replace_block(self, block_number: int, block_data: dict) -> None:
+        self.aggregator.retract_block(block_number)
+        self.aggregator.add_block(block_data)
+
+
+    def get_open_hour(self, current_hour: str, head_block: int) -> str:
+        """
+        Returns the oldest hour which has to stay open, i.e. the hour of the oldest block
+        which is still unconfirmed (or the current hour without a confirmation window).
+        """
+        if not self.confirmation_window:
+            return current_hour
+
+        self.confirmation_window.prune(head_block)
+        oldest_block = self.confirmation_window.oldest_block()
+        oldest_hour = self.aggregator.block_hours.get(oldest_block)
+
+        return min(oldest_hour, current_hour) if oldest_hour else current_hour
+
+
+    def get_block_path(self, block_number: int) -> str:
+        return os.path.join(self.config.BLOCKS_DATA_DIR, f"block_{block_number}.json")
+
+
+class HeadFollowerFactory:
+    @staticmethod
+    @ErrorHandler.ehd()
+    def create_head_follower(config: Config = None) -> HeadFollower:
+        config = config or Config()
+        ether_api = EtherAPI(config)
+        file_manager = FileManager()
+
+        aggregator = IncrementalHourlyAggregator(
+            TransactionProcessor(),
+            WalletUpdater(),
+            WalletClassifier(),
+            TopWalletsGenerator(),
+            ResultFormatter(),
+            config,
+            ExtractorFactory.create_sketch_store(config)
+        )
+
+        head_watcher = HeadWatcher(
+            ether_api=ether_api,
+            poll_interval=config.HEAD_POLL_INTERVAL,
+            max_backoff=config.HEAD_MAX_BACKOFF,
+        )
+
+        block_service = BlockService(ether_api, config.FETCH_RECEIPTS)
+        confirmation_window = None
+        if config.REORG_WINDOW:
+            confirmation_window = ConfirmationWindow(
+                config, ether_api, block_service, file_manager, config.CONFIRMATION_DEPTH, config.STREAM_WINDOW_FILE
+            )
+
+        return HeadFollower(
+            config=config,
+            block_service=block_service,
+            file_manager=file_manager,
+            aggregator=aggregator,
+            state=StreamState(file_manager, config.STREAM_STATE_FILE),
+            head_watcher=head_watcher,
+            confirmation_depth=config.CONFIRMATION_DEPTH,
+            confirmation_window=confirmation_window,
+        )
+
+
+if __name__ == "__main__":
+    """
+    Running the follow-the-head mode from the command line.
+    """
+    head_follower = HeadFollowerFactory.create_head_follower()
+    head_follower.run(progress_callback=lambda head, current: print(f"Ingested: {current}/{head}"))
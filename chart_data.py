@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+from database_tool import DatabaseManager
+from error_handler import ErrorHandler
+from logger import logger
+
+
+@ErrorHandler.ehdc()
+class ChartDataProvider:
+    def __init__(self, db_manager, max_entries=64):
+        self.db_manager = db_manager
+        self.max_entries = max_entries
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_chart_data(self, sql_query, selected_date=None):
+        query, parameters = self.build_query(sql_query, selected_date)
+
+        with self.db_manager as db:
+            cache_key = (query, parameters, self.get_db_version(db))
+
+            with self.lock:
+                if cache_key in self.cache:
+                    self.cache.move_to_end(cache_key)
+                    logger.debug(f"Chart data served from cache: {query}, {parameters}")
+                    return self.cache[cache_key]
+
+            rows = db.execute_query(query, parameters).fetchall()
+
+        chart_data = ([row[0] for row in rows], [row[1] for row in rows])
+
+        with self.lock:
+            self.cache[cache_key] = chart_data
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+        return chart_data
+
+    def has_data(self, sql_query, selected_date=None):
+        data_x, _ = self.get_chart_data(sql_query, selected_date)
+        return bool(data_x)
+
+    # date filter and ordering are appended to the base query, values are always bound #
+    @staticmethod
+    def build_query(sql_query, selected_date=None):
+        query = sql_query.strip()
+        parameters = ()
+
+        if selected_date is not None:
+            query += " AND DATE(date) = DATE(?)"
+            parameters = (selected_date.strftime("%Y-%m-%d"),)
+
+        if "ORDER BY" not in query.upper():
+            query += " ORDER BY date"
+
+        return query, parameters
+
+    # data_version changes on commits of other connections, total_changes on our own #
+    @staticmethod
+    def get_db_version(db):
+        data_version = db.execute_query("PRAGMA data_version").fetchone()[0]
+        return id(db.connection), data_version, db.connection.total_changes
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+
+# Largest-Triangle-Three-Buckets over index positions; returns indices of the representative points #
+@ErrorHandler.ehd()
+def lttb_indices(data_y, threshold, start=0, stop=None):
+    stop = len(data_y) if stop is None else stop
+    count = stop - start
+    if threshold >= count or threshold < 3:
+        return list(range(start, stop))
+
+    bucket_size = (count - 2) / (threshold - 2)
+    selected = [start]
+    previous = start
+
+    for bucket in range(threshold - 2):
+        bucket_start = start + int(bucket * bucket_size) + 1
+        bucket_end = start + int((bucket + 1) * bucket_size) + 1
+
+        if bucket == threshold - 3:
+            average_x, average_y = stop - 1, data_y[stop - 1] or 0
+        else:
+            next_end = min(start + int((bucket + 2) * bucket_size) + 1, stop)
+            average_x = (bucket_end + next_end - 1) / 2
+            average_y = sum(value or 0 for value in data_y[bucket_end:next_end]) / (next_end - bucket_end)
+
+        previous_y = data_y[previous] or 0
+        max_area = -1
+        for index in range(bucket_start, bucket_end):
+            area = abs((previous - average_x) * ((data_y[index] or 0) - previous_y)
+                       - (previous - index) * (average_y - previous_y))
+            if area > max_area:
+                max_area = area
+                chosen = index
+
+        selected.append(chosen)
+        previous = chosen
+
+    selected.append(stop - 1)
+    return selected
+
+
+class ChartDataProviderFactory:
+    _providers = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_provider(db_filename):
+        with ChartDataProviderFactory._lock:
+            if db_filename not in ChartDataProviderFactory._providers:
+                ChartDataProviderFactory._providers[db_filename] = ChartDataProvider(
+                    DatabaseManager.get_shared(db_filename)
+                )
+            return ChartDataProviderFactory._providers[db_filename]
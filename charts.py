@@ -1,10 +1,15 @@
-import sqlite3
+import math
 import mplcursors
 from config import Config
+from chart_data import ChartDataProviderFactory, lttb_indices
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter, MaxNLocator
 from error_handler import ErrorHandler
 
+MIN_VISIBLE_POINTS = 100
+
 chart_config = {
     "WYKRESY GODZINOWE": {
         "ILOŚĆ TRANSAKCJI": {
@@ -117,8 +122,54 @@ chart_config = {
             "label": "Portfele 10000+ ETH", 
             "title": "Salda w poszczególnych dniach",
             "ylabel": "Ilość portfeli",
+        },
+        "AKTYWNE PORTFELE": {
+            "sql_query": 'SELECT period_start AS date, active_wallets FROM rollups WHERE period="daily"',
+            "label": "Aktywne portfele (szacunek)",
+            "title": "Liczba aktywnych portfeli w poszczególnych dniach",
+            "ylabel": "Ilość portfeli",
         }
         
+    },
+    "WYKRESY TYGODNIOWE":{
+        "ILOŚĆ TRANSAKCJI": {
+            "sql_query": 'SELECT period_start AS date, transactions_number FROM rollups WHERE period="weekly"',
+            "label": "Liczba transakcji",
+            "title": "Liczba transakcji w poszczególnych tygodniach",
+            "ylabel": "Liczba transakcji",
+        },
+        "ŚREDNIE OPŁATY TRANSAKCYJNE": {
+            "sql_query": 'SELECT period_start AS date, average_transaction_fee FROM rollups WHERE period="weekly"',
+            "label": "Średnia opłata transakcyjna",
+            "title": "Średnia opłata transakcyjna w poszczególnych tygodniach",
+            "ylabel": "Opłata",
+        },
+        "AKTYWNE PORTFELE": {
+            "sql_query": 'SELECT period_start AS date, active_wallets FROM rollups WHERE period="weekly"',
+            "label": "Aktywne portfele (szacunek)",
+            "title": "Liczba aktywnych portfeli w poszczególnych tygodniach",
+            "ylabel": "Ilość portfeli",
+        },
+    },
+    "WYKRESY MIESIĘCZNE":{
+        "ILOŚĆ TRANSAKCJI": {
+            "sql_query": 'SELECT period_start AS date, transactions_number FROM rollups WHERE period="monthly"',
+            "label": "Liczba transakcji",
+            "title": "Liczba transakcji w poszczególnych miesiącach",
+            "ylabel": "Liczba transakcji",
+        },
+        "ŚREDNIE OPŁATY TRANSAKCYJNE": {
+            "sql_query": 'SELECT period_start AS date, average_transaction_fee FROM rollups WHERE period="monthly"',
+            "label": "Średnia opłata transakcyjna",
+            "title": "Średnia opłata transakcyjna w poszczególnych miesiącach",
+            "ylabel": "Opłata",
+        },
+        "AKTYWNE PORTFELE": {
+            "sql_query": 'SELECT period_start AS date, active_wallets FROM rollups WHERE period="monthly"',
+            "label": "Aktywne portfele (szacunek)",
+            "title": "Liczba aktywnych portfeli w poszczególnych miesiącach",
+            "ylabel": "Ilość portfeli",
+        },
     },
       "WYKRESY NAJWIĘKSZYCH PORTFELI":{
         "TOP 1 PORTFEL": {
@@ -126,10 +177,9 @@ chart_config = {
                             SELECT wb.date, wb.balance
                             FROM wallet_balance AS wb
                             WHERE wb.wallet_address = (
-                                SELECT wallet_address 
-                                FROM wallet_balance 
-                                GROUP BY wallet_address
-                                ORDER BY SUM(balance) DESC
+                                SELECT wallet_address
+                                FROM wallet_totals
+                                ORDER BY total_balance DESC, wallet_address
                                 LIMIT 1
                             )
                             ORDER BY wb.date
@@ -142,14 +192,10 @@ chart_config = {
             "sql_query": '''SELECT wb.date, wb.balance
                             FROM wallet_balance AS wb
                             WHERE wb.wallet_address = (
-                                SELECT wallet_address 
-                                FROM (
-                                    SELECT wallet_address 
-                                    FROM wallet_balance 
-                                    GROUP BY wallet_address
-                                    ORDER BY SUM(balance) DESC 
-                                    LIMIT 1 OFFSET 1
-                                ) AS top_wallet
+                                SELECT wallet_address
+                                FROM wallet_totals
+                                ORDER BY total_balance DESC, wallet_address
+                                LIMIT 1 OFFSET 1
                             )
                             ORDER BY wb.date''',
             "label": "Saldo ETH",
@@ -160,14 +206,10 @@ chart_config = {
             "sql_query": '''SELECT wb.date, wb.balance
                             FROM wallet_balance AS wb
                             WHERE wb.wallet_address = (
-                                SELECT wallet_address 
-                                FROM (
-                                    SELECT wallet_address 
-                                    FROM wallet_balance 
-                                    GROUP BY wallet_address
-                                    ORDER BY SUM(balance) DESC 
-                                    LIMIT 1 OFFSET 2
-                                ) AS top_wallet
+                                SELECT wallet_address
+                                FROM wallet_totals
+                                ORDER BY total_balance DESC, wallet_address
+                                LIMIT 1 OFFSET 2
                             )
                             ORDER BY wb.date''',
             "label": "Saldo ETH",
@@ -178,14 +220,10 @@ chart_config = {
             "sql_query": '''SELECT wb.date, wb.balance
                             FROM wallet_balance AS wb
                             WHERE wb.wallet_address = (
-                                SELECT wallet_address 
-                                FROM (
-                                    SELECT wallet_address 
-                                    FROM wallet_balance 
-                                    GROUP BY wallet_address
-                                    ORDER BY SUM(balance) DESC 
-                                    LIMIT 1 OFFSET 3
-                                ) AS top_wallet
+                                SELECT wallet_address
+                                FROM wallet_totals
+                                ORDER BY total_balance DESC, wallet_address
+                                LIMIT 1 OFFSET 3
                             )
                             ORDER BY wb.date''',
             "label": "Saldo ETH",
@@ -196,14 +234,10 @@ chart_config = {
             "sql_query": '''SELECT wb.date, wb.balance
                         FROM wallet_balance AS wb
                         WHERE wb.wallet_address = (
-                            SELECT wallet_address 
-                            FROM (
-                                SELECT wallet_address 
-                                FROM wallet_balance 
-                                GROUP BY wallet_address
-                                ORDER BY SUM(balance) DESC 
-                                LIMIT 1 OFFSET 4
-                            ) AS top_wallet
+                            SELECT wallet_address
+                            FROM wallet_totals
+                            ORDER BY total_balance DESC, wallet_address
+                            LIMIT 1 OFFSET 4
                         )
                         ORDER BY wb.date''',
             "label": "Saldo ETH",
@@ -216,48 +250,71 @@ chart_config = {
 
 @ErrorHandler.ehdc()
 class ChartHandler:
-    def __init__(self, canvas, db_filename):
+    def __init__(self, canvas, db_filename, data_provider=None):
         self.canvas = canvas
         self.db_filename = db_filename
+        self.data_provider = data_provider or ChartDataProviderFactory.get_provider(db_filename)
         self.current_annotation = None
         self.selected_index = None
+        self.data_x = []
+        self.data_y = []
+        self.visible_indices = []
 
     def close_chart(self):        
         self.canvas.figure.clf()
         self.canvas.draw()
            
 
-    def chart_builder(self, sql_query, label, title, ylabel):      
-        conn = sqlite3.connect(self.db_filename)
-        cursor = conn.cursor()
-        cursor.execute(sql_query)
-        data = cursor.fetchall()      
+    def chart_builder(self, sql_query, label, title, ylabel, selected_date=None):      
+        self.build_figure(sql_query, label, title, ylabel, selected_date, self.canvas.figure)
+        self.attach_canvas(self.canvas)
 
-        data_x = [row[0] for row in data]                
-        data_y = [row[1] for row in data]
-        
-         
-        sorted_indices = sorted(range(len(data_x)), key=lambda i: data_x[i])
-        data_x = [data_x[i] for i in sorted_indices]
-        data_y = [data_y[i] for i in sorted_indices]
 
-        fig = self.canvas.figure
+    # loads data and plots it into a figure without touching the canvas, so it can run on a worker thread #
+    def build_figure(self, sql_query, label, title, ylabel, selected_date=None, figure=None):
+        self.data_x, self.data_y = self.data_provider.get_chart_data(sql_query, selected_date)
+        data_x = self.data_x
+        self.label = label
+
+        fig = figure if figure is not None else Figure(figsize=(10, 6))
+        self.figure = fig
         ax = fig.add_subplot(111)
-        line, = ax.plot(data_x, data_y, marker='o', color='b', label=label)
-        ax.fill_between(data_x, data_y, color='lightblue', alpha=0.3)
+        self.ax = ax
+        self.line, = ax.plot([], [], marker='o', color='b', label=label)
+        self.scatter = ax.scatter([], [], color='b')
+        self.fill = None
         ax.set_title(title)
         ax.set_xlabel('Data')
         ax.set_ylabel(ylabel)
         ax.grid(True, linestyle='--', alpha=0.3)
 
-        scatter = ax.scatter(data_x, data_y, color='b')
+        # x positions are indices into the full series, the formatter maps them back to dates #
+        ax.xaxis.set_major_locator(MaxNLocator(nbins=4, integer=True))
+        ax.xaxis.set_major_formatter(FuncFormatter(self.format_date_tick))
+
+        self.plot_visible_points(0, len(data_x))
+        if data_x:
+            ax.set_xlim(0, max(len(data_x) - 1, 1))
+        ax.relim()
+        ax.autoscale_view(scalex=False)
+        ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+        fig.autofmt_xdate()
+        return fig
+
+
+    # hover cursor and event handlers need the canvas, so they are attached on the GUI thread #
+    def attach_canvas(self, canvas):
+        self.canvas = canvas
+        fig, ax, label = self.figure, self.ax, self.label
+        data_x, data_y = self.data_x, self.data_y
+        line, scatter = self.line, self.scatter
         data_cursor = mplcursors.cursor(scatter, hover=True)
         
 
         def on_add(sel):            
 
-            ind = int(sel.index)
-            self.selected_index = ind
+            ind = self.visible_indices[int(sel.index)]
+            self.selected_index = int(sel.index)
             x = data_x[ind]
             y = data_y[ind]
             
@@ -267,9 +324,10 @@ class ChartHandler:
             
             annotation.set_text(f'Data: {x}\n\n{label}: {y}')                    
 
-            if len(data_x) >= 2:
-                x_shift = 0.125 * len(data_x)
-                if ind >= len(data_x) // 2:
+            x_min, x_max = ax.get_xlim()
+            if len(self.visible_indices) >= 2:
+                x_shift = 0.125 * (x_max - x_min)
+                if ind >= (x_min + x_max) / 2:
                     ha = 'right'
                     x_shift = -x_shift
                 else:
@@ -277,7 +335,7 @@ class ChartHandler:
    
             else:
                 ha = 'left'
-                x_shift = 0.01 * len(data_x)                
+                x_shift = 0.01 * (x_max - x_min)                
 
             bbox_props = dict(
                 boxstyle='square,pad=1',
@@ -316,26 +374,53 @@ class ChartHandler:
                         line.set_alpha(1.0)
                         scatter.set_alpha(1.0)
                         fig.canvas.draw_idle()
-                else:
+                elif self.current_annotation is not None:
                     self.current_annotation.set_visible(True)
                     fig.canvas.draw_idle()
                     line.set_alpha(0.3)
                     if self.selected_index is not None:
-                        alphas = [0.1 if i != self.selected_index else 1.0 for i in range(len(data_y))]
+                        alphas = [0.1 if i != self.selected_index else 1.0 for i in range(len(self.visible_indices))]
                         scatter.set_alpha(alphas)
 
         fig.canvas.mpl_connect('motion_notify_event', on_move)
         data_cursor.connect("add", on_add)
 
-        visible_xticks_indices = [0, len(data_x) // 3, 2 * len(data_x) // 3, len(data_x) - 1]
-        visible_xticks = [data_x[i] for i in visible_xticks_indices]
-        ax.set_xticks(visible_xticks)
-        ax.set_xticklabels([data_x[i] for i in visible_xticks_indices])
-
-        fig.autofmt_xdate()
         self.canvas.draw()    
-    
-        conn.close() 
+
+
+    # only representative points of the visible range are drawn, at most one per pixel column #
+    def plot_visible_points(self, start, stop):
+        threshold = max(int(self.ax.bbox.width), MIN_VISIBLE_POINTS)
+        self.visible_indices = lttb_indices(self.data_y, threshold, start, stop)
+        visible_y = [self.data_y[i] for i in self.visible_indices]
+
+        self.line.set_data(self.visible_indices, visible_y)
+        if self.visible_indices:
+            self.scatter.set_offsets([[i, self.data_y[i] or 0] for i in self.visible_indices])
+        self.selected_index = None
+
+        if self.fill is not None:
+            self.fill.remove()
+        self.fill = self.ax.fill_between(self.visible_indices, visible_y, color='lightblue', alpha=0.3)
+
+
+    def on_xlim_changed(self, ax):
+        x_min, x_max = ax.get_xlim()
+        start = max(int(math.floor(x_min)) - 1, 0)
+        stop = min(int(math.ceil(x_max)) + 2, len(self.data_x))
+        if start >= stop:
+            return
+
+        self.plot_visible_points(start, stop)
+        if self.canvas is not None:
+            self.canvas.draw_idle()
+
+
+    def format_date_tick(self, value, position=None):
+        index = int(round(value))
+        if 0 <= index < len(self.data_x):
+            return str(self.data_x[index])
+        return ""
 
 
 if __name__ == "__main__":
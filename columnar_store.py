@@ -0,0 +1,375 @@
+import os
+import shutil
+import threading
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from config import Config
+from logger import logger
+from error_handler import ErrorHandler
+from blocks_extractor import TransactionProcessor
+
+
+COLUMNS = {
+    "block": np.uint64,
+    "timestamp": np.uint64,
+    "sender_id": np.uint32,
+    "receiver_id": np.uint32,
+    "value_hi": np.uint64,
+    "value_lo": np.uint64,
+    "fee_hi": np.uint64,
+    "fee_lo": np.uint64,
+}
+
+WORD = 1 << 64
+WORD_MASK = WORD - 1
+
+
+@ErrorHandler.ehdc()
+class AddressRegistry:
+    """
+    Append-only mapping between wallet addresses and the integer ids stored in the columns.
+    Id 0 is reserved for a missing address (contract creation has no receiver).
+
+    Parameters
+    ----------
+    registry_file : str
+        Text file with one address per line; the line number is the address id.
+    """
+    def __init__(self, registry_file):
+        self.registry_file = registry_file
+        self.addresses = [None]
+        self.ids = {None: 0}
+        self.persisted_count = 1
+        self.lock = threading.Lock()
+
+
+    def load(self):
+        if not os.path.exists(self.registry_file):
+            return
+
+        with open(self.registry_file, "r") as file:
+            for line in file:
+                address = line.rstrip("\n")
+                self.ids[address] = len(self.addresses)
+                self.addresses.append(address)
+
+        self.persisted_count = len(self.addresses)
+        logger.debug(f"Loaded {self.persisted_count - 1} registered addresses")
+
+
+    def get_id(self, address):
+        with self.lock:
+            address_id = self.ids.get(address)
+            if address_id is None:
+                address_id = len(self.addresses)
+                self.ids[address] = address_id
+                self.addresses.append(address)
+            return address_id
+
+
+    def get_address(self, address_id):
+        return self.addresses[address_id]
+
+
+    def save(self):
+        with self.lock:
+            new_addresses = self.addresses[self.persisted_count:]
+            if not new_addresses:
+                return
+
+            with open(self.registry_file, "a") as file:
+                file.writelines(f"{address}\n" for address in new_addresses)
+                file.flush()
+                os.fsync(file.fileno())
+
+            self.persisted_count = len(self.addresses)
+
+
+@ErrorHandler.ehdc()
+class TransactionColumns:
+    """
+    A zero-copy view over a contiguous range of stored transactions.
+
+    Parameters
+    ----------
+    columns : dict
+        Column name to array (usually slices of `np.memmap` arrays).
+    registry : AddressRegistry
+        Registry used to translate address ids back to addresses.
+    """
+    def __init__(self, columns, registry):
+        self.columns = columns
+        self.registry = registry
+
+
+    def __len__(self):
+        return len(self.columns["block"])
+
+
+    def total_fees_wei(self):
+        return self.wide_sum(self.columns["fee_hi"], self.columns["fee_lo"])
+
+
+    def total_value_wei(self):
+        return self.wide_sum(self.columns["value_hi"], self.columns["value_lo"])
+
+
+    def values_eth(self):
+        return (self.columns["value_hi"].astype(np.float64) * float(WORD)
+                + self.columns["value_lo"].astype(np.float64)) / 10**18
+
+
+    def wallet_flows(self):
+        """
+        Aggregates sold and bought ETH per wallet with vectorized group-by operations.
+
+        Returns
+        -------
+        list of tuple
+            (address, sell count, sold eth, biggest sell, smallest sell,
+             buy count, bought eth, biggest buy, smallest buy) for every wallet in the view.
+        """
+        if len(self) == 0:
+            return []
+
+        values = self.values_eth()
+        senders = np.asarray(self.columns["sender_id"])
+        receivers = np.asarray(self.columns["receiver_id"])
+
+        wallet_ids, inverse = np.unique(np.concatenate((senders, receivers)), return_inverse=True)
+        sender_index, receiver_index = inverse[:len(senders)], inverse[len(senders):]
+        wallet_count = len(wallet_ids)
+
+        sells = self.group_values(sender_index, values, wallet_count)
+        buys = self.group_values(receiver_index, values, wallet_count)
+
+        return [
+            (self.registry.get_address(int(wallet_ids[i])),
+             int(sells[0][i]), float(sells[1][i]), float(sells[2][i]), float(sells[3][i]),
+             int(buys[0][i]), float(buys[1][i]), float(buys[2][i]), float(buys[3][i]))
+            for i in range(wallet_count)
+        ]
+
+
+    def net_flows_wei(self, include_fees=True):
+        """
+        Computes the exact net flow of every address: received value minus sent value and paid fees.
+
+        Parameters
+        ----------
+        include_fees : bool, optional
+            When False, paid fees are not subtracted (default is True).
+
+        Returns
+        -------
+        dict
+            Address mapped to its net flow in wei; the missing receiver of contract creations is skipped.
+        """
+        if len(self) == 0:
+            return {}
+
+        senders = np.asarray(self.columns["sender_id"])
+        receivers = np.asarray(self.columns["receiver_id"])
+
+        wallet_ids, inverse = np.unique(np.concatenate((senders, receivers)), return_inverse=True)
+        sender_index, receiver_index = inverse[:len(senders)], inverse[len(senders):]
+        wallet_count = len(wallet_ids)
+
+        received = self.group_wide_sums(receiver_index, self.columns["value_hi"], self.columns["value_lo"], wallet_count)
+        sent = self.group_wide_sums(sender_index, self.columns["value_hi"], self.columns["value_lo"], wallet_count)
+        fees = (self.group_wide_sums(sender_index, self.columns["fee_hi"], self.columns["fee_lo"], wallet_count)
+                if include_fees else [0] * wallet_count)
+
+        return {
+            self.registry.get_address(int(wallet_ids[i])): received[i] - sent[i] - fees[i]
+            for i in range(wallet_count) if wallet_ids[i] != 0
+        }
+
+
+    @staticmethod
+    def group_wide_sums(index, high, low, size):
+        sums = []
+        for words, shift in ((high, 64), (low >> np.uint64(32), 32), (low & np.uint64(0xFFFFFFFF), 0)):
+            accumulator = np.zeros(size, dtype=np.uint64)
+            np.add.at(accumulator, index, words)
+            sums.append((accumulator, shift))
+
+        return [sum(int(accumulator[i]) << shift for accumulator, shift in sums) for i in range(size)]
+
+
+    @staticmethod
+    def group_values(index, values, size):
+        counts = np.bincount(index, minlength=size)
+        totals = np.bincount(index, weights=values, minlength=size)
+        biggest = np.full(size, -np.inf)
+        smallest = np.full(size, np.inf)
+        np.maximum.at(biggest, index, values)
+        np.minimum.at(smallest, index, values)
+        return counts, totals, biggest, smallest
+
+
+    # low words are summed as two 32-bit halves so the uint64 accumulators cannot overflow #
+    @staticmethod
+    def wide_sum(high, low):
+        if len(low) == 0:
+            return 0
+        high_sum = int(np.sum(high, dtype=np.uint64))
+        upper_sum = int(np.sum(low >> np.uint64(32), dtype=np.uint64))
+        lower_sum = int(np.sum(low & np.uint64(0xFFFFFFFF), dtype=np.uint64))
+        return (high_sum << 64) + (upper_sum << 32) + lower_sum
+
+
+@ErrorHandler.ehdc()
+class ColumnarTransactionStore:
+    """
+    Stores decoded transactions of a day as fixed-width column files read back through `np.memmap`.
+    Each day lives in its own directory with one `.npy` file per column, ordered by block number,
+    so hour ranges are contiguous slices that can be analysed without copying.
+
+    Parameters
+    ----------
+    base_dir : str
+        Directory holding the day directories and the address registry.
+    registry : AddressRegistry
+        Registry translating addresses to the stored ids.
+    """
+    def __init__(self, base_dir, registry):
+        self.base_dir = base_dir
+        self.registry = registry
+        os.makedirs(self.base_dir, exist_ok=True)
+
+
+    def get_day_dir(self, day):
+        return os.path.join(self.base_dir, day)
+
+
+    def has_day(self, day):
+        return os.path.exists(os.path.join(self.get_day_dir(day), "timestamp.npy"))
+
+
+    def ingest_day(self, day, block_file_processor, json_files, check_interrupt=None):
+        """
+        Decodes the blocks of a day from their JSON files and writes them as columns.
+
+        Parameters
+        ----------
+        day : str
+            Day in the format "%Y-%m-%d".
+        block_file_processor : BlockFileProcessor
+            Processor used to load block files.
+        json_files : list of str
+            Block files to decode; blocks from other days are skipped.
+        check_interrupt : callable, optional
+            A function to check if ingestion should be interrupted.
+
+        Returns
+        -------
+        int
+            Number of stored transactions, or None if ingestion was interrupted.
+        """
+        blocks = []
+        for json_file in json_files:
+            if check_interrupt and check_interrupt():
+                logger.warning(f"Columnar ingestion of {day} interrupted by user.")
+                return None
+
+            block_data = block_file_processor.load_block_data(json_file)
+            block_timestamp = int(block_data["timestamp"])
+            if datetime.fromtimestamp(block_timestamp, tz=timezone.utc).strftime("%Y-%m-%d") == day:
+                blocks.append(block_data)
+
+        return self.write_day(day, blocks)
+
+
+    def write_day(self, day, blocks):
+        blocks = sorted(blocks, key=lambda block: int(block["block_number"]))
+        rows = {name: [] for name in COLUMNS}
+
+        for block_data in blocks:
+            block_number = int(block_data["block_number"])
+            block_timestamp = int(block_data["timestamp"])
+            for transaction in block_data["transactions"]:
+                value_wei = int(transaction["value"], 16)
+                fee_wei = TransactionProcessor.get_fee_wei(transaction)
+                rows["block"].append(block_number)
+                rows["timestamp"].append(block_timestamp)
+                rows["sender_id"].append(self.registry.get_id(transaction["from"]))
+                rows["receiver_id"].append(self.registry.get_id(transaction["to"]))
+                rows["value_hi"].append(value_wei >> 64)
+                rows["value_lo"].append(value_wei & WORD_MASK)
+                rows["fee_hi"].append(fee_wei >> 64)
+                rows["fee_lo"].append(fee_wei & WORD_MASK)
+
+        # ids referenced by the columns must be durable before the day becomes visible #
+        self.registry.save()
+
+        day_dir = self.get_day_dir(day)
+        temp_dir = f"{day_dir}.tmp"
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        os.makedirs(temp_dir)
+
+        for name, dtype in COLUMNS.items():
+            np.save(os.path.join(temp_dir, f"{name}.npy"), np.array(rows[name], dtype=dtype))
+
+        shutil.rmtree(day_dir, ignore_errors=True)
+        os.replace(temp_dir, day_dir)
+
+        logger.info(f"Stored {len(rows['block'])} transactions of {day} in columnar format")
+        return len(rows["block"])
+
+
+    def load_day(self, day):
+        day_dir = self.get_day_dir(day)
+        columns = {
+            name: np.load(os.path.join(day_dir, f"{name}.npy"), mmap_mode="r")
+            for name in COLUMNS
+        }
+        return TransactionColumns(columns, self.registry)
+
+
+    def group_by_hour(self, day):
+        """
+        Splits a stored day into hourly views.
+
+        Parameters
+        ----------
+        day : str
+            Day in the format "%Y-%m-%d".
+
+        Returns
+        -------
+        dict
+            Hour strings mapped to `TransactionColumns` views; hours without transactions are omitted.
+        """
+        day_columns = self.load_day(day).columns
+        start = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        hour_starts = [int((start + timedelta(hours=hour)).timestamp()) for hour in range(25)]
+        bounds = np.searchsorted(day_columns["timestamp"], np.array(hour_starts, dtype=np.uint64), side="left")
+
+        transactions_by_hour = {}
+        for hour in range(24):
+            first, last = int(bounds[hour]), int(bounds[hour + 1])
+            if first == last:
+                continue
+            hour_str = (start + timedelta(hours=hour)).strftime("%Y-%m-%d %H:00:00")
+            transactions_by_hour[hour_str] = TransactionColumns(
+                {name: column[first:last] for name, column in day_columns.items()}, self.registry
+            )
+
+        return transactions_by_hour
+
+
+class ColumnarStoreFactory:
+    _stores = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_store(config=None):
+        config = config or Config()
+        with ColumnarStoreFactory._lock:
+            if config.COLUMNAR_DIR not in ColumnarStoreFactory._stores:
+                registry = AddressRegistry(os.path.join(config.COLUMNAR_DIR, "addresses.txt"))
+                store = ColumnarTransactionStore(config.COLUMNAR_DIR, registry)
+                registry.load()
+                ColumnarStoreFactory._stores[config.COLUMNAR_DIR] = store
+            return ColumnarStoreFactory._stores[config.COLUMNAR_DIR]
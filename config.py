@@ -28,4 +28,28 @@ class Config:
         self.OUTPUT_FILE_PATH = os.path.join(self.BASE_DIR, "interesting_info", "Biggest_wallets_activity.json")
         self.JSON_FILES = [file for file in os.listdir(self.BLOCKS_DATA_DIR) if file.endswith(".json")]
         self.OUTPUT_FOLDER = "interesting_info"
-        self.PROGRESS_DATA_FILE = os.path.join(self.BASE_DIR, "progress.json")
\ No newline at end of file
+        self.PROGRESS_DATA_FILE = os.path.join(self.BASE_DIR, "progress.json")
+        self.TASK_WORKERS = int(os.getenv("TASK_WORKERS", 4))
+        self.FOLLOW_HEAD = os.getenv("FOLLOW_HEAD", "False") == "True"
+        self.HEAD_POLL_INTERVAL = float(os.getenv("HEAD_POLL_INTERVAL", 4))
+        self.HEAD_MAX_BACKOFF = float(os.getenv("HEAD_MAX_BACKOFF", 60))
+        self.CONFIRMATION_DEPTH = int(os.getenv("CONFIRMATION_DEPTH", 12))
+        self.STREAM_STATE_FILE = os.path.join(self.BASE_DIR, "stream_state.json")
+        self.REORG_WINDOW = os.getenv("REORG_WINDOW", "False") == "True"
+        self.CONFIRMATION_WINDOW_FILE = os.path.join(self.BASE_DIR, "confirmation_window.json")
+        self.STREAM_WINDOW_FILE = os.path.join(self.BASE_DIR, "stream_window.json")
+        self.DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", 65536))
+        self.DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", 268435456))
+        self.FETCH_RECEIPTS = os.getenv("FETCH_RECEIPTS", "False") == "True"
+        self.COLUMNAR_STORE = os.getenv("COLUMNAR_STORE", "False") == "True"
+        self.COLUMNAR_DIR = os.path.join(self.BASE_DIR, "columnar_data")
+        self.BALANCE_LEDGER = os.getenv("BALANCE_LEDGER", "False") == "True"
+        self.METRICS_FILE = os.path.join(self.BASE_DIR, "metrics.prom")
+        self.METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+        self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.LOG_QUEUE = os.getenv("LOG_QUEUE", "True") == "True"
+        self.PROFILE = os.getenv("PROFILE", "False") == "True"
+        self.PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")
+        self.PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.005))
+        self.PROFILE_DIR = os.path.join(self.BASE_DIR, "profiles")
+        self.RPC_URL = os.getenv("RPC_URL", "")
\ No newline at end of file
@@ -6,12 +6,17 @@ import database_tool
 import blocks_remover
 import config
 import automation
+import blocks_stream
+import profiler
+import argparse
 from datetime import datetime, timezone
 
 
 class ConsoleApp:
     def __init__(self):
         self.config = config.Config()
+        self.profiler = profiler.create_profiler(self.config)
+        self.run_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
         self.menu_actions = {
             "1": self.download_block_data,
             "2": self.create_hourly_report,
@@ -26,6 +31,9 @@ class ConsoleApp:
             "11": self.run_automation,
             "12": self.find_first_block,
             "13": self.find_last_block,
+            "14": self.follow_chain_head,
+            "15": self.export_wallets_activity_json,
+            "16": self.display_top_wallets_in_range,
             "q": self.quit_program
         }
 
@@ -46,6 +54,9 @@ class ConsoleApp:
         print("11. Run program automation")
         print("12. Find first block of date")
         print("13. Find last block of date")
+        print("14. Follow chain head (tail mode)")
+        print("15. Export wallets activity to JSON")
+        print("16. Display top wallets in date range (approximate)")
         print("h. Help")
         print("q. Quit")
         print("========================================\n")
@@ -185,9 +196,8 @@ class ConsoleApp:
 
 
     def export_top_wallets(self):
-        input_file_name = "Biggest_wallets_activity.json"
         db_components = database_tool.DatabaseFactory.create_database_components(self.config)
-        db_components["save_biggest_wallets"].save_biggest_wallets_activity_database(input_file_name)
+        db_components["save_biggest_wallets"].save_wallet_activity_database()
 
 
     def display_wallets_balances(self):
@@ -244,6 +254,51 @@ class ConsoleApp:
             print(f"An error occurred: {e}")
 
 
+    def follow_chain_head(self):
+        head_follower = blocks_stream.HeadFollowerFactory.create_head_follower(self.config)
+
+        try:
+            print("Following chain head, press Ctrl+C to stop.")
+            head_follower.run(progress_callback=lambda head, current: print(f"Ingested block: {current}/{head}"))
+
+        except KeyboardInterrupt:
+            print("Following chain head stopped.")
+
+
+    def export_wallets_activity_json(self):
+        try:
+            start_date = input("Enter start date (YYYY-MM-DD, empty for all): ") or None
+            end_date = input("Enter end date (YYYY-MM-DD, empty for all): ") or None
+            for date_input in (start_date, end_date):
+                if date_input:
+                    datetime.strptime(date_input, "%Y-%m-%d")
+
+            manager = wallets_update.WalletUpdaterFactory.create_wallets_updater(self.config)
+            exported = manager.export_wallets_activity(start_date=start_date, end_date=end_date)
+            print(f"Exported activity of {exported} wallets to {self.config.OUTPUT_FILE_PATH}")
+
+        except ValueError:
+            print("Invalid date format! Please enter in YYYY-MM-DD format.")
+
+
+    def display_top_wallets_in_range(self):
+        try:
+            start_date = input("Enter start date (YYYY-MM-DD): ")
+            end_date = input("Enter end date (YYYY-MM-DD): ")
+            datetime.strptime(start_date, "%Y-%m-%d")
+            datetime.strptime(end_date, "%Y-%m-%d")
+
+            db_components = database_tool.DatabaseFactory.create_database_components(self.config)
+            for direction in ("inflow", "outflow"):
+                print(f"Top wallets by {direction}:")
+                for wallet in db_components["sketch_store"].get_top_wallets(direction, start_date, end_date):
+                    print(f"  {wallet['wallet address']}: ~{wallet[f'{direction} estimate']:.4f} ETH "
+                          f"(at least {wallet[f'{direction} lower bound']:.4f} ETH)")
+
+        except ValueError:
+            print("Invalid date format! Please enter in YYYY-MM-DD format.")
+
+
     @staticmethod
     def quit_program():
         print("Exiting program...")
@@ -258,7 +313,8 @@ class ConsoleApp:
             choice = self.get_user_choice()
             action = self.menu_actions.get(choice)
             if action:
-                action()
+                with self.profiler.profile(action.__name__, self.run_date):
+                    action()
             else:
                 print("Invalid choice. Please try again.")
 
@@ -266,5 +322,9 @@ class ConsoleApp:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Blockchain data processing console.")
+    profiler.add_profile_arguments(parser)
+    profiler.apply_profile_arguments(parser.parse_args())
+
     app = ConsoleApp()
     app.run()
\ No newline at end of file
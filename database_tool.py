@@ -1,98 +1,593 @@
 import sqlite3
+import logging
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import threading
+from contextlib import contextmanager
 from config import Config
 from error_handler import ErrorHandler
 from logger import logger
+from metrics import metrics
+from sketches import load_sketch
 
 
 @ErrorHandler.ehdc()
 class DatabaseManager:
-    def __init__(self, db_filename):
+    # one long-lived connection per thread, shared by all managers of the same database file #
+    _shared_managers = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_filename, cache_size_kb=65536, mmap_size=268435456):
         self.db_filename = db_filename
-        self.connection = None
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.local = threading.local()
+        self.connections = {}
+        self.connections_lock = threading.Lock()
+
+    @staticmethod
+    def get_shared(db_filename, cache_size_kb=65536, mmap_size=268435456):
+        with DatabaseManager._shared_lock:
+            if db_filename not in DatabaseManager._shared_managers:
+                DatabaseManager._shared_managers[db_filename] = DatabaseManager(db_filename, cache_size_kb, mmap_size)
+            return DatabaseManager._shared_managers[db_filename]
+
+    @staticmethod
+    def close_shared():
+        with DatabaseManager._shared_lock:
+            managers = list(DatabaseManager._shared_managers.values())
+        for manager in managers:
+            manager.close_all()
+
+    @property
+    def connection(self):
+        return getattr(self.local, "connection", None)
+
+    @connection.setter
+    def connection(self, connection):
+        self.local.connection = connection
+
+    @property
+    def in_transaction(self):
+        return getattr(self.local, "transaction_depth", 0) > 0
 
     def __enter__(self):
         self.connect()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.disconnect()
+        self.close_finished_threads()
 
     def connect(self):         
-        self.connection = sqlite3.connect(self.db_filename)
+        if self.connection is not None:
+            return
+
+        connection = sqlite3.connect(self.db_filename, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        connection.execute("PRAGMA temp_store=MEMORY")
+
+        self.connection = connection
+        self.close_finished_threads()
+        with self.connections_lock:
+            self.connections[threading.current_thread()] = connection
         logger.info(f"Connected to database '{self.db_filename}' successfully.")
+
+    # connections of ended threads (e.g. a shut down worker pool) would otherwise keep their cache and mmap #
+    def close_finished_threads(self):
+        with self.connections_lock:
+            finished = [thread for thread in self.connections if not thread.is_alive()]
+            connections = [self.connections.pop(thread) for thread in finished]
+        for connection in connections:
+            connection.close()
+        if connections:
+            logger.info(f"Closed {len(connections)} connections of finished threads to database '{self.db_filename}'.")
     
     def disconnect(self):        
-        if self.connection:
-            self.connection.close()
+        connection = self.connection
+        if connection:
+            with self.connections_lock:
+                self.connections.pop(threading.current_thread(), None)
+            connection.close()
             self.connection = None
             logger.info(f"Disconnected from database '{self.db_filename}'.")
 
+    def close_all(self):
+        with self.connections_lock:
+            connections, self.connections = list(self.connections.values()), {}
+        for connection in connections:
+            connection.close()
+        self.local = threading.local()
+        logger.info(f"Closed {len(connections)} connections to database '{self.db_filename}'.")
+
     def execute_query(self, query, parameters=None):        
         cursor = self.connection.cursor()
-        if parameters:
-            cursor.execute(query, parameters)
-            logger.debug(f"Executed query with parameters: {query}, {parameters}")
-
-        else:
-            cursor.execute(query)
-            logger.debug(f"Executed query: {query}")
+        with metrics.timer("db_query_seconds", "Time of executing database statements",
+                           statement=self.get_statement_type(query)):
+            if parameters:
+                cursor.execute(query, parameters)
+            else:
+                cursor.execute(query)
+
+        # the parameters of bulk statements are large, they are only formatted when debug is enabled #
+        if logger.isEnabledFor(logging.DEBUG):
+            if parameters:
+                logger.debug(f"Executed query with parameters: {query}, {parameters}")
+            else:
+                logger.debug(f"Executed query: {query}")
         
-        self.connection.commit()
-        logger.debug(f"Query committed successfully.")
+        if not self.in_transaction:
+            self.connection.commit()
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Query committed successfully.")
+        return cursor
+
+    def execute_many(self, query, rows):
+        cursor = self.connection.cursor()
+        statement = self.get_statement_type(query)
+        with metrics.timer("db_query_seconds", "Time of executing database statements", statement=statement):
+            cursor.executemany(query, rows)
+        metrics.counter("db_rows_total", "Rows passed to batched database statements", statement=statement).inc(len(rows))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Executed query for {len(rows)} rows: {query}")
+
+        if not self.in_transaction:
+            self.connection.commit()
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Query committed successfully.")
         return cursor
 
+    @staticmethod
+    def get_statement_type(query):
+        words = query.split(None, 1)
+        return words[0].upper() if words else ""
+
+    # one commit for every statement executed inside, rollback on error; nested scopes join the outer one #
+    @contextmanager
+    def transaction(self):
+        self.connect()
+        depth = getattr(self.local, "transaction_depth", 0)
+        self.local.transaction_depth = depth + 1
+        try:
+            yield self
+            if depth == 0:
+                self.connection.commit()
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Transaction committed successfully.")
+        except Exception:
+            if depth == 0:
+                self.connection.rollback()
+                logger.warning(f"Transaction rolled back.")
+            raise
+        finally:
+            self.local.transaction_depth = depth
+
 
 @ErrorHandler.ehdc()
-class DataCalculator:
+class SchemaMigrator:
+    # (version, description, statements); the applied version is kept in PRAGMA user_version #
+    MIGRATIONS = [
+        (1, "create base tables", [
+            '''
+                CREATE TABLE IF NOT EXISTS combined_data (
+                    id INTEGER PRIMARY KEY,
+                    data_type TEXT,
+                    date DATE,
+                    hour INTEGER,
+                    transactions_number INTEGER,
+                    average_transaction_fee REAL,
+                    wallet_0_1_eth INTEGER,
+                    wallet_1_10_eth INTEGER,
+                    wallet_10_100_eth INTEGER,
+                    wallet_100_1000_eth INTEGER,
+                    wallet_0_1_to_1_eth INTEGER,
+                    wallet_above_10000_eth INTEGER,
+                    wallet_1000_10000_eth INTEGER
+                )
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS wallet_balance (
+                    id INTEGER PRIMARY KEY,
+                    wallet_address TEXT,
+                    date DATE,
+                    balance REAL,
+                    last_update_date DATE,
+                    top_buy_amount REAL,
+                    top_buy_date DATE,
+                    top_sell_amount REAL,
+                    top_sell_date DATE,
+                    UNIQUE(wallet_address, date)
+                )
+            ''',
+        ]),
+        (2, "store combined_data dates as ISO text", [
+            '''
+                UPDATE combined_data SET date = DATETIME(date)
+                WHERE data_type = 'hourly' AND DATETIME(date) IS NOT NULL AND date IS NOT DATETIME(date)
+            ''',
+            '''
+                UPDATE combined_data SET date = DATE(date)
+                WHERE data_type = 'daily' AND DATE(date) IS NOT NULL AND date IS NOT DATE(date)
+            ''',
+        ]),
+        (3, "unique key on combined_data (data_type, date, hour)", [
+            '''
+                DELETE FROM combined_data WHERE id NOT IN (
+                    SELECT MIN(id) FROM combined_data GROUP BY data_type, date, IFNULL(hour, -1)
+                )
+            ''',
+            '''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_combined_data_key
+                ON combined_data (data_type, date, IFNULL(hour, -1))
+            ''',
+        ]),
+        (4, "indexes for chart and date lookups", [
+            '''
+                CREATE INDEX IF NOT EXISTS idx_combined_data_day
+                ON combined_data (data_type, DATE(date), hour)
+            ''',
+            '''
+                CREATE INDEX IF NOT EXISTS idx_wallet_balance_address_balance
+                ON wallet_balance (wallet_address, balance)
+            ''',
+        ]),
+        (5, "wallet_totals ranking table", [
+            '''
+                CREATE TABLE IF NOT EXISTS wallet_totals (
+                    wallet_address TEXT PRIMARY KEY,
+                    total_balance REAL
+                )
+            ''',
+            '''
+                CREATE INDEX IF NOT EXISTS idx_wallet_totals_rank
+                ON wallet_totals (total_balance DESC, wallet_address)
+            ''',
+            '''
+                INSERT OR REPLACE INTO wallet_totals (wallet_address, total_balance)
+                SELECT wallet_address, SUM(balance) FROM wallet_balance GROUP BY wallet_address
+            ''',
+        ]),
+        (6, "fee sums and daily/weekly/monthly rollups of hourly data", [
+            "ALTER TABLE combined_data ADD COLUMN fee_sum REAL",
+            "UPDATE combined_data SET fee_sum = average_transaction_fee * transactions_number",
+            '''
+                CREATE TABLE IF NOT EXISTS rollups (
+                    period TEXT,
+                    period_start DATE,
+                    transactions_number INTEGER,
+                    fee_sum REAL,
+                    average_transaction_fee REAL,
+                    hours_count INTEGER,
+                    PRIMARY KEY (period, period_start)
+                )
+            ''',
+            *[
+                f'''
+                    INSERT OR REPLACE INTO rollups (
+                        period, period_start, transactions_number, fee_sum, average_transaction_fee, hours_count
+                    )
+                    SELECT '{period}', {period_start} AS period_start, SUM(transactions_number), SUM(fee_sum),
+                           IFNULL(SUM(fee_sum) / NULLIF(SUM(transactions_number), 0), 0), COUNT(*)
+                    FROM combined_data WHERE data_type = 'hourly' GROUP BY period_start
+                '''
+                for period, period_start in (
+                    ("daily", "DATE(date)"),
+                    ("weekly", "DATE(date, '-' || ((CAST(strftime('%w', date) AS INTEGER) + 6) % 7) || ' days')"),
+                    ("monthly", "DATE(date, 'start of month')"),
+                )
+            ],
+        ]),
+        (7, "wallet activity tracker tables", [
+            '''
+                CREATE TABLE IF NOT EXISTS wallet_activity (
+                    wallet_address TEXT PRIMARY KEY,
+                    top_buy_amount REAL,
+                    top_buy_date DATE,
+                    top_sell_amount REAL,
+                    top_sell_date DATE
+                )
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS wallet_activity_balance (
+                    wallet_address TEXT,
+                    date DATE,
+                    balance REAL,
+                    PRIMARY KEY (wallet_address, date)
+                ) WITHOUT ROWID
+            ''',
+            '''
+                CREATE INDEX IF NOT EXISTS idx_wallet_activity_balance_date
+                ON wallet_activity_balance (date, wallet_address)
+            ''',
+        ]),
+        (8, "running balance ledger", [
+            '''
+                CREATE TABLE IF NOT EXISTS ledger_addresses (
+                    id INTEGER PRIMARY KEY,
+                    address TEXT UNIQUE NOT NULL
+                )
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS ledger_balances (
+                    address_id INTEGER PRIMARY KEY,
+                    balance_gwei INTEGER NOT NULL,
+                    balance_wei INTEGER NOT NULL
+                )
+            ''',
+            '''
+                CREATE INDEX IF NOT EXISTS idx_ledger_balances_rank
+                ON ledger_balances (balance_gwei DESC, balance_wei DESC)
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS ledger_snapshots (
+                    address_id INTEGER,
+                    date DATE,
+                    balance_gwei INTEGER NOT NULL,
+                    balance_wei INTEGER NOT NULL,
+                    PRIMARY KEY (address_id, date)
+                ) WITHOUT ROWID
+            ''',
+            '''
+                CREATE INDEX IF NOT EXISTS idx_ledger_snapshots_date
+                ON ledger_snapshots (date)
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS ledger_days (
+                    date DATE PRIMARY KEY,
+                    addresses_count INTEGER
+                )
+            ''',
+        ]),
+        (9, "hourly wallet sketches", [
+            '''
+                CREATE TABLE IF NOT EXISTS wallet_sketches (
+                    kind TEXT,
+                    date DATETIME,
+                    sketch TEXT,
+                    PRIMARY KEY (kind, date)
+                ) WITHOUT ROWID
+            ''',
+        ]),
+        (10, "distinct active wallets in rollups", [
+            "ALTER TABLE rollups ADD COLUMN active_wallets INTEGER",
+        ]),
+    ]
+
     def __init__(self, db_manager):
         self.db_manager = db_manager
 
+    def get_version(self):
+        with self.db_manager as db:
+            return db.execute_query("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self):
+        version = self.get_version()
+
+        for migration_version, description, statements in self.MIGRATIONS:
+            if migration_version <= version:
+                continue
+
+            with self.db_manager.transaction() as db:
+                if not db.connection.in_transaction:
+                    db.execute_query("BEGIN")
+                for statement in statements:
+                    db.execute_query(statement)
+                db.execute_query(f"PRAGMA user_version = {migration_version}")
+
+            version = migration_version
+            logger.info(f"Database migrated to version {migration_version}: {description}.")
+
+        return version
+
+
+@ErrorHandler.ehdc()
+class DataCalculator:
+    WALLET_KEYS = [
+        'Below 0.1 ETH', '1-10 ETH', '10-100 ETH', '100-1000 ETH',
+        '0.1-1 ETH', 'Above 10000 ETH', '1000-10000 ETH'
+    ]
+
+    # duplicates are skipped by the unique key on (data_type, date, hour) #
+    INSERT_QUERY = '''
+        INSERT INTO combined_data (
+            data_type, date, hour, transactions_number, average_transaction_fee,
+            wallet_0_1_eth, wallet_1_10_eth, wallet_10_100_eth,
+            wallet_100_1000_eth, wallet_0_1_to_1_eth, wallet_above_10000_eth,
+            wallet_1000_10000_eth, fee_sum
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(data_type, date, IFNULL(hour, -1)) DO NOTHING
+    '''
+
+    def __init__(self, db_manager, rollup_builder=None):
+        self.db_manager = db_manager
+        self.rollup_builder = rollup_builder
+
     def table_data_calculations(self, entry, data_type):
-        with self.db_manager as db:            
-                date = entry.get('time')
-                transactions_number = entry.get('transactions number')
-                average_transaction_fee = entry.get('average transaction fee')
-                wallet_classification = entry.get('wallet classification in eth balance', {})
-
-                wallet_keys = [
-                    'Below 0.1 ETH', '1-10 ETH', '10-100 ETH', '100-1000 ETH', 
-                    '0.1-1 ETH', 'Above 10000 ETH', '1000-10000 ETH'
-                ]
-                wallet_values = [wallet_classification.get(key, 0) for key in wallet_keys]
-
-                hour = None
-                if data_type == 'hourly':
-                    hour_str = entry.get('time')
-                    hour_dt = datetime.strptime(hour_str, "%Y-%m-%d %H:%M:%S")
-                    hour = hour_dt.hour
-
-                select_query = 'SELECT * FROM combined_data WHERE date = ?'
-                if data_type == 'hourly':
-                    select_query += ' AND hour = ?'
-                    
-                select_params = (date,) if data_type == 'daily' else (date, hour)
-
-                existing_entry = db.execute_query(select_query, select_params).fetchone()
-
-                if existing_entry:
-                    logger.info(f"Entry for date {date} and hour {hour} already exists.")
-                else:
-                    insert_query = '''
-                        INSERT INTO combined_data (
-                            data_type, date, hour, transactions_number, average_transaction_fee,
-                            wallet_0_1_eth, wallet_1_10_eth, wallet_10_100_eth,
-                            wallet_100_1000_eth, wallet_0_1_to_1_eth, wallet_above_10000_eth,
-                            wallet_1000_10000_eth
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    '''
-                    insert_params = (
-                        data_type, date, hour, transactions_number, average_transaction_fee,
-                        *wallet_values
-                    )
-                    db.execute_query(insert_query, insert_params)
+        self.bulk_insert([entry], data_type)
+
+    def bulk_insert(self, entries, data_type):
+        rows = [self.build_row(entry, data_type) for entry in entries]
+
+        with self.db_manager as db:
+            with db.transaction():
+                cursor = db.execute_many(self.INSERT_QUERY, rows)
+                if data_type == 'hourly' and self.rollup_builder:
+                    self.rollup_builder.refresh({row[1][:10] for row in rows})
+
+        logger.info(f"Imported {cursor.rowcount} of {len(rows)} {data_type} entries, duplicates skipped.")
+        return cursor.rowcount
+
+    def build_row(self, entry, data_type):
+        date = self.normalize_date(entry.get('time'), data_type)
+        wallet_classification = entry.get('wallet classification in eth balance', {})
+        wallet_values = [wallet_classification.get(key, 0) for key in self.WALLET_KEYS]
+
+        hour = None
+        if data_type == 'hourly':
+            hour = datetime.strptime(date, "%Y-%m-%d %H:%M:%S").hour
+
+        transactions_number = entry.get('transactions number')
+        average_transaction_fee = entry.get('average transaction fee')
+        fee_sum = entry.get('total transaction fee')
+        if fee_sum is None and transactions_number is not None and average_transaction_fee is not None:
+            fee_sum = average_transaction_fee * transactions_number
+
+        return (
+            data_type, date, hour, transactions_number, average_transaction_fee,
+            *wallet_values, fee_sum
+        )
+
+    # same rule as migration 2 (SQLite DATE for days, DATETIME for hours), so a day imported before and after it #
+    # has one key and daily chart labels stay date-only #
+    @staticmethod
+    def normalize_date(value, data_type):
+        date_format = "%Y-%m-%d" if data_type == 'daily' else "%Y-%m-%d %H:%M:%S"
+        return datetime.fromisoformat(value).strftime(date_format)
+
+
+@ErrorHandler.ehdc()
+class WalletSketchStore:
+    # hourly sketches from the start date up to, but excluding, the end date #
+    RANGE_QUERY = '''
+        SELECT sketch FROM wallet_sketches
+        WHERE kind = ? AND date >= ? AND date < ?
+        ORDER BY date
+    '''
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    # sketches are keyed by the hour string of the hourly results ("%Y-%m-%d %H:00:00") #
+    def save_sketches(self, sketches_by_hour):
+        rows = [
+            (kind, hour, json.dumps(sketch))
+            for hour, sketches in sketches_by_hour.items()
+            for kind, sketch in sketches.items()
+        ]
+
+        with self.db_manager.transaction() as db:
+            db.execute_many('INSERT OR REPLACE INTO wallet_sketches (kind, date, sketch) VALUES (?, ?, ?)', rows)
+
+        return len(rows)
+
+    # the end date is inclusive #
+    def merge_range(self, kind, start_date, end_date):
+        next_day = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        return self.merge_between(kind, start_date, next_day)
+
+    def merge_between(self, kind, start, end):
+        with self.db_manager as db:
+            rows = db.execute_query(self.RANGE_QUERY, (kind, start, end)).fetchall()
+
+        merged = None
+        for (sketch,) in rows:
+            sketch = load_sketch(kind, json.loads(sketch))
+            merged = sketch if merged is None else merged.merge(sketch)
+
+        return merged
+
+    # approximate "top N wallets by inflow/outflow" over the range, tightened by the Count-Min estimate #
+    def get_top_wallets(self, direction, start_date, end_date, top_n=5):
+        heavy_hitters = self.merge_range(f"{direction}_topk", start_date, end_date)
+        if heavy_hitters is None:
+            return []
+
+        count_min = self.merge_range(f"{direction}_cm", start_date, end_date)
+
+        top_wallets = []
+        for wallet, count, error in heavy_hitters.top(top_n):
+            estimate = min(count, count_min.estimate(wallet)) if count_min else count
+            top_wallets.append({
+                "wallet address": wallet,
+                f"{direction} estimate": estimate,
+                f"{direction} lower bound": count - error,
+            })
+
+        return top_wallets
+
+    def estimate_flow(self, direction, wallet, start_date, end_date):
+        count_min = self.merge_range(f"{direction}_cm", start_date, end_date)
+        return count_min.estimate(wallet) if count_min else 0.0
+
+    # distinct wallets active in the range, optionally only those in one balance bucket of their hour #
+    def count_distinct_wallets(self, start_date, end_date, bucket=None):
+        kind = f"active_hll:{bucket}" if bucket else "active_hll"
+        hyperloglog = self.merge_range(kind, start_date, end_date)
+        return hyperloglog.count() if hyperloglog else 0
+
+
+@ErrorHandler.ehdc()
+class RollupBuilder:
+    PERIODS = ("daily", "weekly", "monthly")
+
+    # each affected period is re-aggregated from its hourly rows, using the (data_type, date) key range #
+    REFRESH_QUERY = '''
+        INSERT INTO rollups (
+            period, period_start, transactions_number, fee_sum, average_transaction_fee, hours_count
+        )
+        SELECT ?, ?, SUM(transactions_number), SUM(fee_sum),
+               IFNULL(SUM(fee_sum) / NULLIF(SUM(transactions_number), 0), 0), COUNT(*)
+        FROM combined_data WHERE data_type = 'hourly' AND date >= ? AND date < ?
+        HAVING COUNT(*) > 0
+        ON CONFLICT(period, period_start) DO UPDATE SET
+            transactions_number = excluded.transactions_number,
+            fee_sum = excluded.fee_sum,
+            average_transaction_fee = excluded.average_transaction_fee,
+            hours_count = excluded.hours_count
+    '''
+
+    def __init__(self, db_manager, sketch_store=None):
+        self.db_manager = db_manager
+        self.sketch_store = sketch_store
+
+    def refresh(self, dates):
+        ranges = {self.get_period_range(period, date) for date in dates for period in self.PERIODS}
+
+        with self.db_manager.transaction() as db:
+            db.execute_many(self.REFRESH_QUERY, sorted(ranges))
+
+            # distinct wallets of a period are the union of its hourly HyperLogLog sketches #
+            if self.sketch_store:
+                active_wallets = []
+                for period, period_start, start, end in sorted(ranges):
+                    hyperloglog = self.sketch_store.merge_between("active_hll", start, end)
+                    if hyperloglog:
+                        active_wallets.append((hyperloglog.count(), period, period_start))
+                db.execute_many(
+                    'UPDATE rollups SET active_wallets = ? WHERE period = ? AND period_start = ?', active_wallets
+                )
+
+        logger.info(f"Refreshed {len(ranges)} rollup periods.")
+        return sorted((period, period_start) for period, period_start, _, _ in ranges)
+
+    @staticmethod
+    def get_period_range(period, date):
+        day = datetime.strptime(date, "%Y-%m-%d").date()
+
+        if period == "daily":
+            start, end = day, day + timedelta(days=1)
+        elif period == "weekly":
+            start = day - timedelta(days=day.weekday())
+            end = start + timedelta(days=7)
+        elif period == "monthly":
+            start = day.replace(day=1)
+            end = (start + timedelta(days=32)).replace(day=1)
+        else:
+            raise ValueError(f"Unknown rollup period: {period}")
+
+        return period, start.isoformat(), start.isoformat(), end.isoformat()
+
+    def get_rollups(self, period, start_date=None, end_date=None):
+        query = '''
+            SELECT period_start, transactions_number, fee_sum, average_transaction_fee, hours_count
+            FROM rollups WHERE period = ? AND period_start >= ? AND period_start < ?
+            ORDER BY period_start
+        '''
+        with self.db_manager as db:
+            return db.execute_query(query, (period, start_date or "0000-00-00", end_date or "9999-99-99")).fetchall()
 
 
 @ErrorHandler.ehdc()
@@ -109,82 +604,67 @@ class DataImporter:
                 data = json.load(file)
 
             if data_type == "hourly":
-                for entry in data:
-                    self.data_calculator.table_data_calculations(entry, data_type)
+                self.data_calculator.bulk_insert(data, data_type)
 
             if data_type == "daily":        
-                self.data_calculator.table_data_calculations(data, data_type)
+                self.data_calculator.bulk_insert([data], data_type)
 
 
 @ErrorHandler.ehdc()
 class BiggestWalletsData:
+    # totals are recomputed only for the wallets touched by an export #
+    REFRESH_TOTALS_QUERY = '''
+        INSERT INTO wallet_totals (wallet_address, total_balance)
+        SELECT ?, SUM(balance) FROM wallet_balance WHERE wallet_address = ?
+        ON CONFLICT(wallet_address) DO UPDATE SET total_balance = excluded.total_balance
+    '''
+
+    # rows come straight from the wallet activity tracker, only for the requested dates #
+    ACTIVITY_UPSERT_QUERY = '''
+        INSERT INTO wallet_balance (
+            wallet_address, date, balance,
+            last_update_date, top_buy_amount, top_buy_date,
+            top_sell_amount, top_sell_date
+        )
+        SELECT b.wallet_address, b.date, b.balance, ?,
+               a.top_buy_amount, a.top_buy_date, a.top_sell_amount, a.top_sell_date
+        FROM wallet_activity_balance AS b
+        JOIN wallet_activity AS a ON a.wallet_address = b.wallet_address
+        WHERE b.date BETWEEN ? AND ?
+        ON CONFLICT(wallet_address, date) DO UPDATE SET
+            balance = excluded.balance,
+            last_update_date = excluded.last_update_date,
+            top_buy_amount = excluded.top_buy_amount,
+            top_buy_date = excluded.top_buy_date,
+            top_sell_amount = excluded.top_sell_amount,
+            top_sell_date = excluded.top_sell_date
+    '''
+
     def __init__(self, config, db_manager):
         self.config = config
         self.db_manager = db_manager        
 
-    def save_biggest_wallets_activity_database(self, input_file_name):
-        input_file_path = os.path.join(self.config.BASE_DIR, "interesting_info", input_file_name)
-
-        with self.db_manager as db:                     
-                with open(input_file_path, "r") as file:
-                    wallet_data = json.load(file)
-
-                for wallet_address, wallet_info in wallet_data.items():
-                    if isinstance(wallet_info, dict):
-                        balance_history = wallet_info.get('balance_history', [])
-
-                        top_buy_transaction = wallet_info.get('top_buy_transaction') or {}
-                        top_sell_transaction = wallet_info.get('top_sell_transaction') or {}
-
-                        top_buy_amount = top_buy_transaction.get('amount')
-                        top_buy_date_str = top_buy_transaction.get('date')
-                        if top_buy_date_str:
-                            top_buy_date = datetime.strptime(top_buy_date_str, "%Y-%m-%d").date()
-                        else:
-                            top_buy_date = None
-
-                        top_sell_amount = top_sell_transaction.get('amount')
-                        top_sell_date_str = top_sell_transaction.get('date')
-                        if top_sell_date_str:
-                            top_sell_date = datetime.strptime(top_sell_date_str, "%Y-%m-%d").date()
-                        else:
-                            top_sell_date = None
-                        
-                        for entry in balance_history:
-                            date_str = entry['date']
-                            balance = entry['balance']
-                            datetime_obj = datetime.strptime(date_str, "%Y-%m-%d")
-                            date = datetime_obj.date()
-
-                            last_update_date_str = datetime.now().strftime("%Y-%m-%d")
-                            last_update_date = datetime.strptime(last_update_date_str, "%Y-%m-%d").date()
-
-                            select_query = ('SELECT * FROM wallet_balance WHERE wallet_address = ? AND date = ?'
-                                            ' AND balance = ?')
-                                
-                            select_params = (wallet_address, date, balance)
-
-                            existing_entry = db.execute_query(select_query, select_params).fetchone()                            
-
-
-                            if existing_entry:
-                                print(f"Entry for wallet {wallet_address}, date {date}, "
-                                      f"and balance {balance} already exists.")
-                            else:
-                                print(f"New Entry for wallet {wallet_address}, date {date}, "
-                                      f"and balance {balance}.")
-                                db.execute_query('''
-                                    INSERT OR REPLACE INTO wallet_balance (
-                                        wallet_address, date, balance,
-                                        last_update_date, top_buy_amount, top_buy_date,
-                                        top_sell_amount, top_sell_date
-                                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                                ''', (
-                                    wallet_address, date, balance,
-                                    last_update_date, top_buy_amount, top_buy_date,
-                                    top_sell_amount, top_sell_date
-                                ))
-                
+    def save_wallet_activity_database(self, start_date=None, end_date=None):
+        start_date = start_date or "0000-00-00"
+        end_date = end_date or "9999-99-99"
+        last_update_date = datetime.now().strftime("%Y-%m-%d")
+
+        with self.db_manager as db:
+            with db.transaction():
+                wallet_addresses = [row[0] for row in db.execute_query(
+                    'SELECT DISTINCT wallet_address FROM wallet_activity_balance WHERE date BETWEEN ? AND ?',
+                    (start_date, end_date)
+                ).fetchall()]
+
+                db.execute_query(self.ACTIVITY_UPSERT_QUERY, (last_update_date, start_date, end_date))
+                db.execute_many(
+                    self.REFRESH_TOTALS_QUERY,
+                    [(wallet_address, wallet_address) for wallet_address in wallet_addresses]
+                )
+
+        logger.info(f"Exported wallet activity of {len(wallet_addresses)} wallets from {start_date} to {end_date}.")
+        return len(wallet_addresses)
+
 
 @ErrorHandler.ehdc()
 class DataChecker:
@@ -229,8 +709,9 @@ class DataReader:
 
     def read_and_display_data_from_database(self):
         with self.db_manager as db:                  
-                db.connection.row_factory = sqlite3.Row 
-                rows = db.execute_query('SELECT * FROM wallet_balance').fetchall()
+                cursor = db.connection.cursor()
+                cursor.row_factory = sqlite3.Row
+                rows = cursor.execute('SELECT * FROM wallet_balance').fetchall()
 
                 for row in rows:
                     wallet_address = row['wallet_address']
@@ -283,9 +764,13 @@ class DatabaseFactory:
     @staticmethod
     def create_database_components(config: Config = None):
         config = config or Config()
-        db_filename = config.DB_FILENAME
-        database_manager = DatabaseManager(db_filename)
-        data_calculator = DataCalculator(database_manager)
+        database_manager = DatabaseManager.get_shared(
+            config.DB_FILENAME, config.DB_CACHE_SIZE_KB, config.DB_MMAP_SIZE
+        )
+        SchemaMigrator(database_manager).migrate()
+        sketch_store = WalletSketchStore(database_manager)
+        rollup_builder = RollupBuilder(database_manager, sketch_store)
+        data_calculator = DataCalculator(database_manager, rollup_builder)
 
         return {
             "database_manager": database_manager,
@@ -293,6 +778,8 @@ class DatabaseFactory:
             "data_display": DataDisplay(database_manager),
             "data_checker": DataChecker(database_manager),
             "data_calculator": data_calculator,
+            "rollup_builder": rollup_builder,
+            "sketch_store": sketch_store,
             "data_importer": DataImporter(config, database_manager, data_calculator),
             "data_cleaner": DataCleaner(database_manager),
             "save_biggest_wallets": BiggestWalletsData(config, database_manager),
@@ -78,22 +78,22 @@ class ErrorHandler:
             pass
 
 
+    # the context of the log record is fixed when the function is decorated, a call only pays for the flag check #
     @staticmethod
     def ehd(context="", custom_message=None, mode=None):
         def decorator(func):
+            qualname = func.__qualname__
+            extra_info = {
+                'ex_custom_module': func.__module__,
+                'ex_custom_className': qualname.split('.')[0] if '.' in qualname else 'UnknownClass',
+                'ex_custom_funcName': func.__name__
+            }
+
             @wraps(func)
             def wrapper(*args, **kwargs):
                 if ErrorHandler.DISABLE_DECORATORS:
                     return func(*args, **kwargs)
 
-                if args and hasattr(args[0], '__self__'):
-                    class_name = args[0].__class__.__name__
-                else:
-                    class_name = func.__qualname__.split('.')[0] if '.' in func.__qualname__ else 'UnknownClass'
-
-                module_name = func.__module__
-                func_name = func.__name__
-
                 try:
                     return func(*args, **kwargs)
                 except CustomProcessingError:
@@ -102,30 +102,48 @@ class ErrorHandler:
                     ErrorHandler(mode=mode).handle_custom_error(
                         e,
                         custom_message=custom_message,
-                        extra_info={
-                            'ex_custom_module': module_name,
-                            'ex_custom_className': class_name,
-                            'ex_custom_funcName': func_name
-                        }
+                        extra_info=extra_info
                     )
+
+            wrapper.__ehd_func__ = func
             return wrapper
 
         return decorator
 
 
+    # marks a tiny helper that ehdc leaves undecorated, its errors are handled by the decorated caller #
+    @staticmethod
+    def skip_ehd(func):
+        func.__skip_ehd__ = True
+        return func
+
+
+    # the undecorated callable of an ehd method, for inner loops of an already decorated stage #
+    @staticmethod
+    def unwrap(method):
+        func = getattr(method, '__ehd_func__', None)
+        if func is None:
+            return method
+        if hasattr(method, '__self__'):
+            return func.__get__(method.__self__)
+        return func
+
+
     # exception_handler_decorator_every_class_method#
     @staticmethod
     def ehdc(context=""):
         def decorator(cls):
-            for attr_name, attr_value in cls.__dict__.items():
+            for attr_name, attr_value in list(cls.__dict__.items()):
                 if callable(attr_value) and not attr_name.startswith("__"):
 
                     if isinstance(attr_value, staticmethod):
                         func = attr_value.__func__
+                        if getattr(func, '__skip_ehd__', False):
+                            continue
                         decorated_func = ErrorHandler.ehd(context)(func)
                         setattr(cls, attr_name, staticmethod(decorated_func))
 
-                    else:
+                    elif not getattr(attr_value, '__skip_ehd__', False):
                         decorated_method = ErrorHandler.ehd(context)(attr_value)
                         setattr(cls, attr_name, decorated_method)
             return cls
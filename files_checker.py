@@ -1,7 +1,7 @@
 import os
 import json
 from config import Config 
-from database_tool import DatabaseManager
+from database_tool import DatabaseManager, SchemaMigrator
 from logger import logger
 from error_handler import ErrorHandler
 
@@ -52,39 +52,8 @@ class FilesChecker:
 
     
     def initialize_database(self):
-        with self.database_manager as db:
-            db.execute_query('''
-                CREATE TABLE IF NOT EXISTS combined_data (
-                    id INTEGER PRIMARY KEY,
-                    data_type TEXT,
-                    date DATE,
-                    hour INTEGER,
-                    transactions_number INTEGER,
-                    average_transaction_fee REAL,
-                    wallet_0_1_eth INTEGER,
-                    wallet_1_10_eth INTEGER,
-                    wallet_10_100_eth INTEGER,
-                    wallet_100_1000_eth INTEGER,
-                    wallet_0_1_to_1_eth INTEGER,
-                    wallet_above_10000_eth INTEGER,
-                    wallet_1000_10000_eth INTEGER
-                )
-            ''')
-            db.execute_query('''
-                CREATE TABLE IF NOT EXISTS wallet_balance (
-                    id INTEGER PRIMARY KEY,
-                    wallet_address TEXT,
-                    date DATE,
-                    balance REAL,
-                    last_update_date DATE,
-                    top_buy_amount REAL,
-                    top_buy_date DATE,
-                    top_sell_amount REAL,
-                    top_sell_date DATE,
-                    UNIQUE(wallet_address, date)
-                )
-            ''')
-        logger.info(f'Database "{self.config.DB_FILENAME}" initialized.')
+        version = SchemaMigrator(self.database_manager).migrate()
+        logger.info(f'Database "{self.config.DB_FILENAME}" initialized, schema version {version}.')
 
     
     def check_files(self):
@@ -96,7 +65,7 @@ class FilesChecker:
         
         self.ensure_file(self.config.WALLETS_ACTIVITY_FILENAME, initializer=self.initialize_wallets_activity)
         self.ensure_file(self.config.LOG_FILE)
-        self.ensure_file(self.config.DB_FILENAME, initializer=self.initialize_database)
+        self.initialize_database()
 
         self.ensure_file('.env', initializer=self.initialize_env_file)
 
@@ -106,7 +75,7 @@ class FilesChecker:
 class FilesCheckerFactory:
     @staticmethod
     def create_files_checker(config):
-        database_manager = DatabaseManager(config.DB_FILENAME)
+        database_manager = DatabaseManager.get_shared(config.DB_FILENAME, config.DB_CACHE_SIZE_KB, config.DB_MMAP_SIZE)
         files_checker_instance = FilesChecker(config, database_manager)
         return files_checker_instance
 
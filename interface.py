@@ -3,12 +3,13 @@ from PyQt5.QtWidgets import QRadioButton, QApplication, QMainWindow, QAction, QV
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 from charts import ChartHandler, chart_config
+from chart_data import ChartDataProviderFactory
 from functools import partial
 from PyQt5.QtGui import QCursor, QPixmap
 from PyQt5.Qt import Qt
 from PyQt5.QtCore import QTimer, QObject, QPropertyAnimation, QEasingCurve, QRect, pyqtProperty, pyqtSlot, QMutex
 from PyQt5.QtWidgets import QDateEdit, QCalendarWidget, QDialog, QMessageBox
-from PyQt5.QtCore import QDate, pyqtSignal, QThread,
+from PyQt5.QtCore import QDate, pyqtSignal, QThread
 import blocks_download
 import database_tool
 from datetime import datetime
@@ -87,6 +88,52 @@ class WorkerThread(QThread):
                 self.progress_updated.emit(value)
     
 
+class ChartRenderWorker(QObject):
+    render_requested = pyqtSignal(int, object)
+    chart_ready = pyqtSignal(int, object)
+    chart_empty = pyqtSignal(int)
+    chart_failed = pyqtSignal(int, str)
+
+    def __init__(self, data_provider):
+        super().__init__()
+        self.data_provider = data_provider
+        self.latest_request_id = 0
+        self.render_requested.connect(self.render)
+
+    def request(self, chart_request):
+        self.latest_request_id += 1
+        self.render_requested.emit(self.latest_request_id, chart_request)
+        return self.latest_request_id
+
+    def is_stale(self, request_id):
+        return request_id != self.latest_request_id
+
+    # runs on the worker thread; requests superseded by a newer click are dropped #
+    @pyqtSlot(int, object)
+    def render(self, request_id, chart_request):
+        if self.is_stale(request_id):
+            return
+
+        try:
+            sql_query, label, title, ylabel, selected_date, figure_size, dpi = chart_request
+            if selected_date and not self.data_provider.has_data(sql_query, selected_date):
+                self.chart_empty.emit(request_id)
+                return
+
+            if self.is_stale(request_id):
+                return
+
+            chart_handler = ChartHandler(None, DATABASE_PATH, self.data_provider)
+            chart_handler.build_figure(sql_query, label, title, ylabel, selected_date,
+                                       Figure(figsize=figure_size, dpi=dpi))
+
+            if not self.is_stale(request_id):
+                self.chart_ready.emit(request_id, chart_handler)
+
+        except Exception as e:
+            self.chart_failed.emit(request_id, str(e))
+
+
 class NoHandleSplitter(QSplitter):
     def createHandle(self):
         return NoHandleSplitterHandle(self.orientation(), self)
@@ -135,6 +182,9 @@ class EthereumDataApp(QMainWindow):
         self.main_layout = QHBoxLayout()
         self.setup_ui()
         self.current_chart = None
+        self.chart_data_provider = ChartDataProviderFactory.get_provider(DATABASE_PATH)
+        self.pending_chart_request = None
+        self.setup_chart_worker()
 
         self.selected_date_hourly = None
         self.is_hourly_chart = False
@@ -150,6 +200,7 @@ class EthereumDataApp(QMainWindow):
     
         self.create_buttons()
         self.create_logo_label()
+        self.create_chart_placeholder()
         self.create_chart_widget()
         self.create_splitter()
         self.setup_layout()        
@@ -186,7 +237,7 @@ class EthereumDataApp(QMainWindow):
 
 
     def create_chart_handler(self):
-        self.chart_handler = ChartHandler(self.canvas, DATABASE_PATH)
+        self.chart_handler = ChartHandler(self.canvas, DATABASE_PATH, self.chart_data_provider)
 
 
     def create_buttons(self):
@@ -216,6 +267,13 @@ class EthereumDataApp(QMainWindow):
         self.chart_layout.addWidget(self.canvas)
 
 
+    def create_chart_placeholder(self):
+        self.chart_placeholder = QLabel("Ładowanie wykresu...", self)
+        self.chart_placeholder.setAlignment(Qt.AlignCenter)
+        self.chart_placeholder.setVisible(False)
+        self.chart_layout.addWidget(self.chart_placeholder)
+
+
     def create_logo_label(self):
         self.logo_label = QLabel(self)
         pixmap = QPixmap("E:\projekty\ethereum_blockchain_analysis\ethereum_logo.png")
@@ -270,10 +328,23 @@ class EthereumDataApp(QMainWindow):
         return selected_date.toPyDate() if result == QDialog.Accepted else None
 
 
+    def setup_chart_worker(self):
+        self.chart_thread = QThread(self)
+        self.chart_worker = ChartRenderWorker(self.chart_data_provider)
+        self.chart_worker.moveToThread(self.chart_thread)
+        self.chart_worker.chart_ready.connect(self.on_chart_ready)
+        self.chart_worker.chart_empty.connect(self.on_chart_empty)
+        self.chart_worker.chart_failed.connect(self.on_chart_failed)
+        self.chart_thread.start()
+
+
+    def closeEvent(self, event):
+        self.chart_thread.quit()
+        self.chart_thread.wait()
+        super().closeEvent(event)
+
+
     def show_chart(self, chart_name, category_name):
-        self.logo_label.setVisible(False)
-        self.canvas.setVisible(True)
-      
         chart_data = self.chart_config.get(category_name).get(chart_name)
 
         if chart_data:
@@ -286,13 +357,6 @@ class EthereumDataApp(QMainWindow):
                     self.show_error_message("Data nie istnieje w bazie danych dla wykresu {}.".format(chart_name))
                     return
                 self.selected_date_hourly = selected_date
-                                
-                sql_query = chart_data.get("sql_query")                               
-                sql_query_check = sql_query + ' AND DATE(date) = DATE(?)'
-                          
-                if not check_date_in_database(selected_date, chart_name, sql_query_check, DATABASE_PATH):
-                    self.show_error_message("Data nie istnieje w bazie danych dla wykresu {}.".format(chart_name))
-                    return
             else:
                 self.is_hourly_chart = False 
 
@@ -301,19 +365,60 @@ class EthereumDataApp(QMainWindow):
             title = chart_data.get("title")
             ylabel = chart_data.get("ylabel")
 
-            if self.current_chart:
-                self.current_chart.close_chart()
+            selected_date = self.selected_date_hourly if self.is_hourly_chart else None
+            figure = self.canvas.figure
+            self.show_chart_placeholder()
+            self.pending_chart_request = self.chart_worker.request(
+                (sql_query_base, label, title, ylabel, selected_date, tuple(figure.get_size_inches()), figure.dpi)
+            )
 
-            self.current_chart = ChartHandler(self.canvas, DATABASE_PATH)
 
-            if self.is_hourly_chart:
-                data_type = chart_data.get("data_type")                  
-                formatted_selected_date = self.selected_date_hourly.strftime("%Y-%m-%d")
-                sql_query = f'{sql_query} AND DATE(date) = DATE("{formatted_selected_date}")' 
-               
-            else:              
-                sql_query = chart_data.get("sql_query")                
-            self.current_chart.chart_builder(sql_query, label, title, ylabel)
+    def show_chart_placeholder(self):
+        self.logo_label.setVisible(False)
+        self.canvas.setVisible(False)
+        self.chart_placeholder.setVisible(True)
+
+
+    @pyqtSlot(int, object)
+    def on_chart_ready(self, request_id, chart_handler):
+        if request_id != self.pending_chart_request:
+            return
+
+        if self.current_chart:
+            self.current_chart.close_chart()
+
+        new_canvas = FigureCanvas(chart_handler.figure)
+        self.chart_layout.replaceWidget(self.canvas, new_canvas)
+        self.canvas.deleteLater()
+        self.canvas = new_canvas
+
+        self.current_chart = chart_handler
+        chart_handler.attach_canvas(self.canvas)
+        self.chart_placeholder.setVisible(False)
+        self.canvas.setVisible(True)
+
+
+    # brings back the previous chart, or the logo when no chart was drawn yet #
+    def restore_chart_view(self):
+        self.chart_placeholder.setVisible(False)
+        if self.current_chart:
+            self.canvas.setVisible(True)
+        else:
+            self.logo_label.setVisible(True)
+
+
+    @pyqtSlot(int)
+    def on_chart_empty(self, request_id):
+        if request_id == self.pending_chart_request:
+            self.restore_chart_view()
+            self.show_error_message("Data nie istnieje w bazie danych dla wykresu {}.".format(self.current_chart_name))
+
+
+    @pyqtSlot(int, str)
+    def on_chart_failed(self, request_id, message):
+        if request_id == self.pending_chart_request:
+            self.restore_chart_view()
+            self.show_error_message(message)
 
 
     def show_error_message(self, message):
@@ -696,8 +801,8 @@ class EthereumDataApp(QMainWindow):
 
     def update_top_wallets_database(self):
 
-        input_file_name = "Biggest_wallets_activity.json"
-        database_tool.save_biggest_wallets_activity_database(input_file_name, DATABASE_PATH)   
+        db_components = database_tool.DatabaseFactory.create_database_components()
+        db_components["save_biggest_wallets"].save_wallet_activity_database()
 
 
     def update_database(self):
@@ -1,44 +1,88 @@
 import logging
+import logging.handlers
 from config import Config
 import os
-import inspect
+import sys
+import queue
+import atexit
+import numbers
+import datetime
+import threading
 from typing import Optional
 from dotenv import load_dotenv
 load_dotenv()
 
 
-class CustomFormatter(logging.Formatter):
-    def format(self, record):
+class CallSiteFilter(logging.Filter):
+    # the class of a call site is resolved from its code object once and cached by file and line, #
+    # so records no longer walk the stack with inspect on every call #
+    def __init__(self):
+        super().__init__()
+        self.class_names = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
         record.custom_module = getattr(record, 'ex_custom_module', None) or record.module
         record.custom_className = getattr(record, 'ex_custom_className', None)
         record.custom_funcName = getattr(record, 'ex_custom_funcName', None)
 
         if not record.custom_className or not record.custom_funcName:
-            frame = inspect.currentframe().f_back
-            try:
-                class_name = None
-                while frame:
-                    module = inspect.getmodule(frame)
-                    if module and not module.__name__.startswith("logging"):
-                        if 'self' in frame.f_locals:
-                            caller_class = frame.f_locals['self'].__class__.__name__
-                            class_name = caller_class if caller_class != 'CustomFormatter' else None
-                            break
-                        qualname = frame.f_code.co_qualname
-                        if '.' in qualname:
-                            class_name = qualname.split('.')[0]
-                        break
-                    frame = frame.f_back
-
-                record.custom_className = class_name if class_name else 'UnknownClass'
-                record.custom_funcName = getattr(record, 'funcName', 'UnknownFunc')
-
-            finally:
-                del frame
+            call_site = (record.pathname, record.lineno)
+            class_name = self.class_names.get(call_site)
+            if class_name is None:
+                class_name = self.resolve_class_name(record)
+                with self.lock:
+                    self.class_names[call_site] = class_name
+
+            record.custom_className = class_name
+            record.custom_funcName = record.funcName or 'UnknownFunc'
+
+        return True
+
+    @staticmethod
+    def resolve_class_name(record):
+        frame = sys._getframe(1)
+        try:
+            while frame:
+                code = frame.f_code
+                if code.co_filename == record.pathname and code.co_name == record.funcName:
+                    qualname = code.co_qualname
+                    return qualname.split('.')[0] if '.' in qualname else 'UnknownClass'
+                frame = frame.f_back
+            return 'UnknownClass'
+        finally:
+            del frame
+
+
+class CustomFormatter(logging.Formatter):
+    def format(self, record):
+        if not hasattr(record, 'custom_className'):
+            record.custom_module = getattr(record, 'ex_custom_module', None) or record.module
+            record.custom_className = getattr(record, 'ex_custom_className', None) or 'UnknownClass'
+            record.custom_funcName = getattr(record, 'ex_custom_funcName', None) or record.funcName
 
         return super().format(record)
 
 
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    # the default prepare formats the message on the calling thread; records keep msg and args here, #
+    # so formatting happens on the listener thread, only a traceback is rendered while it is still alive #
+    # args that may still change (dicts, lists of block data) are formatted before the record is queued #
+    exception_formatter = logging.Formatter()
+    immutable_types = (str, bytes, numbers.Number, type(None), datetime.date, datetime.time, datetime.timedelta)
+
+    def prepare(self, record):
+        if record.args and not (isinstance(record.args, tuple)
+                                and all(isinstance(arg, self.immutable_types) for arg in record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
 class SingletonLogger:
     _instance: Optional['SingletonLogger'] = None
     _initialized: bool = False
@@ -62,7 +106,8 @@ class SingletonLogger:
         if self.logger.handlers:
             return
 
-        self.logger.setLevel(logging.DEBUG)
+        self.logger.setLevel(config.LOG_LEVEL)
+        self.logger.addFilter(CallSiteFilter())
 
         formatter = CustomFormatter(
             '%(asctime)s - %(custom_module)s.%(custom_className)s.%(custom_funcName)s - %(levelname)s - %(message)s',
@@ -72,15 +117,40 @@ class SingletonLogger:
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
         console_handler.setLevel(logging.INFO)
-        self.logger.addHandler(console_handler)
 
         file_handler = logging.FileHandler(log_path, mode="a", encoding="utf-8")
         file_handler.setFormatter(formatter)
         file_handler.setLevel(logging.DEBUG)
-        self.logger.addHandler(file_handler)
+
+        self.handlers = [console_handler, file_handler]
+
+        # formatting and file writes happen on the listener thread, callers only enqueue records #
+        self.listener = None
+        if config.LOG_QUEUE:
+            log_queue = queue.SimpleQueue()
+            self.listener = logging.handlers.QueueListener(log_queue, *self.handlers, respect_handler_level=True)
+            self.logger.addHandler(DeferredQueueHandler(log_queue))
+            self.listener.start()
+            atexit.register(self.stop_listener)
+            os.register_at_fork(after_in_child=self._use_direct_handlers)
+        else:
+            for handler in self.handlers:
+                self.logger.addHandler(handler)
+
+    def stop_listener(self):
+        if self.listener and self.listener._thread:
+            self.listener.stop()
+
+    # forked workers do not inherit the listener thread, they write directly #
+    def _use_direct_handlers(self):
+        self.listener = None
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+        for handler in self.handlers:
+            self.logger.addHandler(handler)
 
     def get_logger(self):
         return self.logger
 
 
-logger = SingletonLogger().get_logger()
\ No newline at end of file
+logger = SingletonLogger().get_logger()
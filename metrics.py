@@ -0,0 +1,442 @@
+import os
+import math
+import time
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logger import logger
+from error_handler import ErrorHandler
+
+
+# upper bounds in seconds, from fast database statements to slow API calls #
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# metrics are updated on hot paths (every query and request), so neither the primitives nor the registry are wrapped by ErrorHandler #
+class Counter:
+    """
+    Monotonically increasing value, e.g. the number of requests or downloaded bytes.
+    """
+    metric_type = "counter"
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+
+    def inc(self, amount=1.0):
+        with self.lock:
+            self.value += amount
+
+
+    def get_state(self):
+        return self.value
+
+
+    def merge(self, state):
+        self.inc(state)
+
+
+    def since(self, state):
+        counter = Counter(self.labels)
+        counter.value = self.value - (state or 0.0)
+        return counter
+
+
+    def get_samples(self, name):
+        return [(name, self.labels, self.value)]
+
+
+class Gauge:
+    """
+    Value that can go up and down, e.g. the throughput of the last download.
+    """
+    metric_type = "gauge"
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+
+    def set(self, value):
+        with self.lock:
+            self.value = value
+
+
+    def inc(self, amount=1.0):
+        with self.lock:
+            self.value += amount
+
+
+    def get_state(self):
+        return self.value
+
+
+    # the last reported value wins #
+    def merge(self, state):
+        self.set(state)
+
+
+    # a gauge is a point value, its change since a snapshot is the current value #
+    def since(self, state):
+        return self
+
+
+    def get_samples(self, name):
+        return [(name, self.labels, self.value)]
+
+
+class Histogram:
+    """
+    Distribution of observed values in fixed buckets, exported in the Prometheus histogram format.
+
+    Parameters
+    ----------
+    labels : tuple
+        Sorted (label, value) pairs of this series.
+    buckets : tuple of float, optional
+        Increasing upper bounds of the buckets (default is `DEFAULT_BUCKETS`).
+    """
+    metric_type = "histogram"
+
+    def __init__(self, labels, buckets=DEFAULT_BUCKETS):
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+
+    def time(self):
+        return Timer(self)
+
+
+    def get_state(self):
+        with self.lock:
+            return {"buckets": self.buckets, "counts": list(self.counts), "count": self.count,
+                    "sum": self.sum, "min": self.min, "max": self.max}
+
+
+    def merge(self, state):
+        if tuple(state["buckets"]) != self.buckets:
+            raise ValueError("Histograms with different buckets cannot be merged")
+
+        with self.lock:
+            self.counts = [own + other for own, other in zip(self.counts, state["counts"])]
+            self.count += state["count"]
+            self.sum += state["sum"]
+            self.min = min(self.min, state["min"])
+            self.max = max(self.max, state["max"])
+
+
+    def since(self, state):
+        """
+        Returns a histogram of the values observed after `state` was taken with `get_state`. The smallest
+        and largest of them are not recorded, so they are narrowed to the bounds of the non-empty buckets.
+        """
+        current = self.get_state()
+        delta = Histogram(self.labels, self.buckets)
+        if not state:
+            state = {"counts": [0] * len(current["counts"]), "count": 0, "sum": 0.0}
+
+        delta.counts = [own - earlier for own, earlier in zip(current["counts"], state["counts"])]
+        delta.count = current["count"] - state["count"]
+        delta.sum = current["sum"] - state["sum"]
+
+        filled = [index for index, bucket_count in enumerate(delta.counts) if bucket_count]
+        if filled:
+            first, last = filled[0], filled[-1]
+            delta.min = max(current["min"], self.buckets[first - 1] if first > 0 else 0.0)
+            delta.max = min(current["max"], self.buckets[last]) if last < len(self.buckets) else current["max"]
+        return delta
+
+
+    def quantile(self, q):
+        """
+        Estimates a quantile by linear interpolation inside the bucket containing it,
+        with the bucket bounds narrowed to the smallest and largest observed values.
+        """
+        with self.lock:
+            counts, count, minimum, maximum = list(self.counts), self.count, self.min, self.max
+
+        if not count:
+            return None
+
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = max(self.buckets[index - 1] if index > 0 else 0.0, minimum)
+                upper = min(self.buckets[index] if index < len(self.buckets) else maximum, maximum)
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return maximum
+
+
+    def get_samples(self, name):
+        with self.lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+
+        samples = []
+        cumulative = 0
+        for upper, bucket_count in zip((*self.buckets, math.inf), counts):
+            cumulative += bucket_count
+            samples.append((f"{name}_bucket", self.labels + (("le", format_value(upper)),), cumulative))
+        samples.append((f"{name}_sum", self.labels, total))
+        samples.append((f"{name}_count", self.labels, count))
+        return samples
+
+
+class Timer:
+    """
+    Context manager observing the elapsed wall time in a histogram.
+    """
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.started = None
+
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class MetricsRegistry:
+    """
+    Process-wide registry of counters, gauges and histograms identified by name and labels.
+
+    Metrics are created on first use, e.g. `metrics.counter("api_requests_total", "API requests", action=action).inc()`.
+    Worker processes of a `multiprocessing.Pool` have their own copy; they send it back with `export_state`
+    and the parent adds it to its registry with `merge_state`.
+    """
+    METRIC_CLASSES = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+
+    def __init__(self):
+        self.metrics = {}
+        self.descriptions = {}
+        self.lock = threading.Lock()
+
+
+    def counter(self, name, description="", **labels):
+        return self.get_metric("counter", name, description, labels)
+
+
+    def gauge(self, name, description="", **labels):
+        return self.get_metric("gauge", name, description, labels)
+
+
+    def histogram(self, name, description="", **labels):
+        return self.get_metric("histogram", name, description, labels)
+
+
+    def timer(self, name, description="", **labels):
+        return Timer(self.histogram(name, description, **labels))
+
+
+    def get_metric(self, metric_type, name, description, labels):
+        key = (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+        metric = self.metrics.get(key)
+        if metric is not None:
+            return metric
+
+        with self.lock:
+            registered_type, _ = self.descriptions.get(name, (metric_type, description))
+            if registered_type != metric_type:
+                raise ValueError(f"Metric {name} is already registered as a {registered_type}")
+
+            self.descriptions.setdefault(name, (metric_type, description))
+            if key not in self.metrics:
+                self.metrics[key] = self.METRIC_CLASSES[metric_type](key[1])
+            return self.metrics[key]
+
+
+    def reset(self):
+        with self.lock:
+            self.metrics = {}
+            self.descriptions = {}
+
+
+    def export_state(self):
+        """
+        Returns a picklable copy of every metric, to be merged into the registry of another process.
+        """
+        with self.lock:
+            metrics = list(self.metrics.items())
+            descriptions = dict(self.descriptions)
+
+        return [
+            (metric.metric_type, name, descriptions[name][1], labels, metric.get_state())
+            for (name, labels), metric in metrics
+        ]
+
+
+    def merge_state(self, state):
+        """
+        Adds metrics exported by `export_state`: counters and histograms are summed, gauges take the exported value.
+        """
+        for metric_type, name, description, labels, metric_state in state:
+            self.get_metric(metric_type, name, description, dict(labels)).merge(metric_state)
+
+
+    def render_prometheus(self):
+        """
+        Renders all metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+        with self.lock:
+            metrics = sorted(self.metrics.items())
+            descriptions = dict(self.descriptions)
+
+        lines = []
+        current_name = None
+        for (name, _), metric in metrics:
+            if name != current_name:
+                metric_type, description = descriptions[name]
+                lines.append(f"# HELP {name} {description or name}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                current_name = name
+
+            for sample_name, labels, value in metric.get_samples(name):
+                label_text = ",".join(f'{label}="{escape_label(label_value)}"' for label, label_value in labels)
+                lines.append(f"{sample_name}{{{label_text}}} {format_value(value)}" if label_text
+                             else f"{sample_name} {format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+    def dump(self, file_path):
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(self.render_prometheus())
+        os.replace(temp_path, file_path)
+        logger.debug(f"Metrics written to {file_path}")
+
+
+    def summary(self, since=None):
+        """
+        Returns readable lines with the value of every counter and gauge and the count,
+        mean and p50/p95/p99 of every histogram.
+
+        Parameters
+        ----------
+        since : list, optional
+            A snapshot from `export_state`; when given, only the changes after it are summarized
+            and unchanged counters are left out.
+        """
+        with self.lock:
+            metrics = sorted(self.metrics.items())
+
+        earlier_states = {(name, labels): state for _, name, _, labels, state in since or []}
+
+        lines = []
+        for (name, labels), metric in metrics:
+            if since is not None:
+                metric = metric.since(earlier_states.get((name, labels)))
+                if isinstance(metric, Counter) and not metric.value:
+                    continue
+
+            series = name + (f"{{{', '.join(f'{label}={value}' for label, value in labels)}}}" if labels else "")
+            if isinstance(metric, Histogram):
+                if not metric.count:
+                    continue
+                lines.append(
+                    f"{series}: count={metric.count} mean={metric.sum / metric.count:.4f} "
+                    f"p50={metric.quantile(0.5):.4f} p95={metric.quantile(0.95):.4f} "
+                    f"p99={metric.quantile(0.99):.4f} max={metric.max:.4f}"
+                )
+            else:
+                lines.append(f"{series}: {format_value(metric.value)}")
+        return lines
+
+
+@ErrorHandler.ehdc()
+class MetricsServer:
+    """
+    Serves the registry in the Prometheus text format at `/metrics` on a background thread.
+
+    Parameters
+    ----------
+    registry : MetricsRegistry
+        The registry to expose.
+    port : int
+        Port to listen on, 0 picks a free one.
+    host : str, optional
+        Interface to listen on (default is "127.0.0.1").
+    """
+    def __init__(self, registry, port, host="127.0.0.1"):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.http_server = None
+        self.thread = None
+
+
+    def start(self):
+        self.http_server = ThreadingHTTPServer((self.host, self.port), MetricsRequestHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.registry = self.registry
+        self.port = self.http_server.server_address[1]
+
+        self.thread = threading.Thread(target=self.http_server.serve_forever, name="MetricsServer", daemon=True)
+        self.thread.start()
+        logger.info(f"Metrics served at http://{self.host}:{self.port}/metrics")
+
+
+    def stop(self):
+        if self.http_server:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.thread.join()
+        self.http_server = None
+        self.thread = None
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = self.server.registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, format, *args):
+        pass
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+metrics = MetricsRegistry()
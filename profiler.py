@@ -0,0 +1,197 @@
+import os
+import io
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from logger import logger
+from error_handler import ErrorHandler
+
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+
+@ErrorHandler.ehdc()
+class StageProfiler:
+    """
+    Profiles pipeline stages and saves one set of artifacts per stage under `<output_dir>/<date_tag>/`.
+
+    In "cprofile" mode every stage is traced deterministically with cProfile and saved as
+    `<stage>.prof` (readable with `pstats`, snakeviz or gprof2dot) with a `<stage>.txt` summary.
+    In "sampling" mode the stack of the profiled thread is sampled every `interval` seconds,
+    which has a lower overhead, and saved as `<stage>.folded`, the input format of flamegraph.pl
+    and speedscope, with a `<stage>.txt` summary of the hottest functions.
+
+    Only the thread running the stage is profiled, work done in `multiprocessing` pool workers
+    is not included.
+
+    Parameters
+    ----------
+    output_dir : str
+        Directory for the profiles.
+    mode : str, optional
+        "cprofile" or "sampling" (default is "cprofile").
+    interval : float, optional
+        Sampling interval in seconds, used in "sampling" mode (default is 0.005).
+    enabled : bool, optional
+        When False, `profile` only runs the stage (default is True).
+    """
+    def __init__(self, output_dir, mode="cprofile", interval=0.005, enabled=True):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}, expected one of {', '.join(PROFILE_MODES)}")
+
+        self.output_dir = output_dir
+        self.mode = mode
+        self.interval = interval
+        self.enabled = enabled
+
+
+    @contextmanager
+    def profile(self, stage, date_tag):
+        if not self.enabled:
+            yield
+            return
+
+        if self.mode == "sampling":
+            sampler = StackSampler(threading.get_ident(), self.interval)
+            sampler.start()
+            try:
+                yield
+            finally:
+                sampler.stop()
+                self.save_samples(stage, date_tag, sampler)
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # newer interpreters allow a single active cProfile, parallel stages run unprofiled #
+            logger.warning(f"Stage {stage} not profiled: {e}")
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.save_profile(stage, date_tag, profile)
+
+
+    def get_stage_path(self, stage, date_tag, extension):
+        directory = os.path.join(self.output_dir, date_tag)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{stage}.{extension}")
+
+
+    def save_profile(self, stage, date_tag, profile):
+        profile_path = self.get_stage_path(stage, date_tag, "prof")
+        profile.dump_stats(profile_path)
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(40)
+        with open(self.get_stage_path(stage, date_tag, "txt"), "w", encoding="utf-8") as file:
+            file.write(stream.getvalue())
+
+        logger.info(f"[{date_tag}] Profile of {stage} saved to {profile_path} ({stats.total_tt:.2f}s traced)")
+
+
+    def save_samples(self, stage, date_tag, sampler):
+        folded_path = self.get_stage_path(stage, date_tag, "folded")
+        with open(folded_path, "w", encoding="utf-8") as file:
+            for stack, count in sorted(sampler.stacks.items()):
+                file.write(f"{stack} {count}\n")
+
+        with open(self.get_stage_path(stage, date_tag, "txt"), "w", encoding="utf-8") as file:
+            file.write(f"{sampler.sample_count} samples every {self.interval}s, {sampler.elapsed:.2f}s\n\n")
+            file.write("samples   share  function (own time)\n")
+            for function, count in sorted(sampler.get_self_counts().items(), key=lambda item: item[1], reverse=True)[:40]:
+                file.write(f"{count:>7} {count / sampler.sample_count:>7.1%}  {function}\n")
+
+        logger.info(f"[{date_tag}] Profile of {stage} saved to {folded_path} ({sampler.sample_count} samples)")
+
+
+class StackSampler:
+    """
+    Background thread recording the call stack of another thread in the folded format
+    ("root;caller;callee" mapped to the number of samples).
+    """
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.sample_count = 0
+        self.started = None
+        self.elapsed = 0.0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="StackSampler", daemon=True)
+
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            names = []
+            while frame is not None:
+                names.append(self.get_frame_name(frame))
+                frame = frame.f_back
+
+            stack = ";".join(reversed(names))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.sample_count += 1
+
+
+    @staticmethod
+    def get_frame_name(frame):
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        return f"{module}:{code.co_qualname}".replace(" ", "_").replace(";", "_")
+
+
+    def get_self_counts(self):
+        counts = {}
+        for stack, count in self.stacks.items():
+            function = stack.rsplit(";", 1)[-1]
+            counts[function] = counts.get(function, 0) + count
+        return counts
+
+
+# Python 3.12+ allows a single active cProfile per interpreter, so stages running in parallel are sampled #
+def create_profiler(config, workers=1):
+    mode = config.PROFILE_MODE
+    if mode == "cprofile" and workers > 1:
+        if config.PROFILE:
+            logger.warning(f"cProfile cannot trace {workers} parallel stages, using sampling mode instead.")
+        mode = "sampling"
+
+    return StageProfiler(config.PROFILE_DIR, mode, config.PROFILE_INTERVAL, config.PROFILE)
+
+
+def add_profile_arguments(parser):
+    parser.add_argument("--profile", action="store_true", help="Save a profile of every stage (see PROFILE_DIR)")
+    parser.add_argument("--profile-mode", choices=PROFILE_MODES, default=None,
+                        help="cprofile (deterministic, .prof) or sampling (low overhead, flamegraph .folded)")
+
+
+# `--profile` is passed through the environment, so every later Config() keeps it #
+def apply_profile_arguments(args):
+    if args.profile:
+        os.environ["PROFILE"] = "True"
+    if args.profile_mode:
+        os.environ["PROFILE_MODE"] = args.profile_mode
@@ -0,0 +1,267 @@
+import base64
+import hashlib
+import heapq
+import math
+import zlib
+from array import array
+from error_handler import ErrorHandler
+
+
+@ErrorHandler.ehdc()
+class SpaceSaving:
+    """
+    Weighted Space-Saving summary keeping at most `capacity` heavy hitters.
+
+    Every counter holds an over-estimate of the item weight and the maximum over-estimation,
+    so `count - error` is a guaranteed lower bound. Summaries of disjoint streams can be merged.
+
+    Parameters
+    ----------
+    capacity : int, optional
+        Maximum number of monitored items (default is 100).
+    """
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counters = {}
+
+
+    def update(self, item, weight=1.0):
+        if item in self.counters:
+            self.counters[item][0] += weight
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0.0]
+        else:
+            # the smallest counter is handed over to the new item, its count becomes the error #
+            evicted = min(self.counters, key=lambda key: self.counters[key][0])
+            minimum = self.counters.pop(evicted)[0]
+            self.counters[item] = [minimum + weight, minimum]
+
+
+    def get_minimum(self):
+        if len(self.counters) < self.capacity:
+            return 0.0
+        return min(count for count, _ in self.counters.values())
+
+
+    def merge(self, other):
+        """
+        Merges another summary into this one (Agarwal et al., mergeable summaries).
+
+        Items missing from one of the summaries are charged with that summary's minimum counter,
+        then only the `capacity` largest counters are kept.
+        """
+        own_minimum, other_minimum = self.get_minimum(), other.get_minimum()
+        merged = {}
+
+        for item in set(self.counters) | set(other.counters):
+            own_count, own_error = self.counters.get(item, (own_minimum, own_minimum))
+            other_count, other_error = other.counters.get(item, (other_minimum, other_minimum))
+            merged[item] = [own_count + other_count, own_error + other_error]
+
+        self.counters = dict(heapq.nlargest(self.capacity, merged.items(), key=lambda entry: entry[1][0]))
+        return self
+
+
+    def top(self, top_n):
+        return [
+            (item, count, error)
+            for item, (count, error) in heapq.nlargest(top_n, self.counters.items(), key=lambda entry: entry[1][0])
+        ]
+
+
+    # exact weights of a window: the largest ones are kept without error and bound every dropped item #
+    @classmethod
+    def from_weights(cls, weights, capacity=100):
+        summary = cls(capacity)
+        summary.counters = {
+            item: [weight, 0.0] for item, weight in heapq.nlargest(capacity, weights.items(), key=lambda entry: entry[1])
+        }
+        return summary
+
+
+    def to_dict(self):
+        return {"capacity": self.capacity, "counters": [[item, c, e] for item, (c, e) in self.counters.items()]}
+
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data["capacity"])
+        summary.counters = {item: [count, error] for item, count, error in data["counters"]}
+        return summary
+
+
+@ErrorHandler.ehdc()
+class CountMinSketch:
+    """
+    Count-Min sketch of item weights; estimates never undercount and sketches with
+    the same dimensions are merged by adding their tables.
+
+    Parameters
+    ----------
+    width : int, optional
+        Counters per row (default is 256).
+    depth : int, optional
+        Number of rows, each with an independent hash (default is 4).
+    """
+    def __init__(self, width=256, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = array("d", bytes(8 * width * depth))
+
+
+    def get_positions(self, item):
+        digest = hashlib.blake2b(str(item).encode(), digest_size=4 * self.depth).digest()
+        return [
+            row * self.width + int.from_bytes(digest[4 * row:4 * row + 4], "little") % self.width
+            for row in range(self.depth)
+        ]
+
+
+    def update(self, item, weight=1.0):
+        for position in self.get_positions(item):
+            self.table[position] += weight
+
+
+    def estimate(self, item):
+        return min(self.table[position] for position in self.get_positions(item))
+
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Count-Min sketches with different dimensions cannot be merged")
+
+        for position, value in enumerate(other.table):
+            self.table[position] += value
+        return self
+
+
+    def to_dict(self):
+        return {"width": self.width, "depth": self.depth, "table": base64.b64encode(self.table.tobytes()).decode()}
+
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["width"], data["depth"])
+        sketch.table = array("d", base64.b64decode(data["table"]))
+        return sketch
+
+
+@ErrorHandler.ehdc()
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter; the union of sketches is the register-wise maximum,
+    so hourly sketches combine into days, weeks and months without the underlying items.
+
+    Parameters
+    ----------
+    precision : int, optional
+        Number of index bits, the sketch keeps 2**precision registers (default is 10,
+        about 3% standard error).
+    """
+    def __init__(self, precision=10):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+
+    def add(self, item):
+        hashed = int.from_bytes(hashlib.blake2b(str(item).encode(), digest_size=8).digest(), "big")
+        index = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+
+    def count(self):
+        register_count = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / register_count)
+        estimate = alpha * register_count ** 2 / sum(2.0 ** -register for register in self.registers)
+
+        # small cardinalities are estimated with linear counting #
+        empty_registers = self.registers.count(0)
+        if estimate <= 2.5 * register_count and empty_registers:
+            estimate = register_count * math.log(register_count / empty_registers)
+
+        return round(estimate)
+
+
+    def merge(self, other):
+        if self.precision != other.precision:
+            raise ValueError("HyperLogLog sketches with different precision cannot be merged")
+
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+
+    def to_dict(self):
+        return {"precision": self.precision, "registers": base64.b64encode(zlib.compress(bytes(self.registers))).decode()}
+
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["precision"])
+        sketch.registers = bytearray(zlib.decompress(base64.b64decode(data["registers"])))
+        return sketch
+
+
+# hourly inflow/outflow summaries of the wallets, stored with the hourly aggregates #
+@ErrorHandler.ehd()
+def build_wallet_sketches(wallets_transactions, capacity=100, width=256, depth=4):
+    flows = {"inflow": {}, "outflow": {}}
+
+    for wallet, transactions in wallets_transactions.items():
+        inflow = sum(transaction["value"] for transaction in transactions if transaction["value"] > 0)
+        outflow = -sum(transaction["value"] for transaction in transactions if transaction["value"] < 0)
+        if inflow > 0:
+            flows["inflow"][wallet] = inflow
+        if outflow > 0:
+            flows["outflow"][wallet] = outflow
+
+    sketches = {}
+    for direction, weights in flows.items():
+        count_min = CountMinSketch(width, depth)
+        for wallet, weight in weights.items():
+            count_min.update(wallet, weight)
+
+        sketches[f"{direction}_topk"] = SpaceSaving.from_weights(weights, capacity).to_dict()
+        sketches[f"{direction}_cm"] = count_min.to_dict()
+
+    return sketches
+
+
+# distinct active wallets of a window, overall and per balance bucket ("active_hll:<bucket>") #
+@ErrorHandler.ehd()
+def build_activity_sketches(wallets_transactions, classify_wallet, precision=10):
+    sketches = {"active_hll": HyperLogLog(precision)}
+
+    for wallet, transactions in wallets_transactions.items():
+        classification = classify_wallet(sum(transaction["value"] for transaction in transactions))
+        bucket_kind = f"active_hll:{classification}"
+        if bucket_kind not in sketches:
+            sketches[bucket_kind] = HyperLogLog(precision)
+
+        sketches["active_hll"].add(wallet)
+        sketches[bucket_kind].add(wallet)
+
+    return {kind: sketch.to_dict() for kind, sketch in sketches.items()}
+
+
+# every sketch of one hour, as saved by WalletSketchStore #
+@ErrorHandler.ehd()
+def build_hour_sketches(wallets_transactions, classify_wallet):
+    return {
+        **build_wallet_sketches(wallets_transactions),
+        **build_activity_sketches(wallets_transactions, classify_wallet),
+    }
+
+
+@ErrorHandler.ehd()
+def load_sketch(kind, data):
+    sketch_type = kind.split(":")[0].rsplit("_", 1)[-1]
+    if sketch_type == "topk":
+        return SpaceSaving.from_dict(data)
+    if sketch_type == "cm":
+        return CountMinSketch.from_dict(data)
+    if sketch_type == "hll":
+        return HyperLogLog.from_dict(data)
+    raise ValueError(f"Unknown sketch kind: {kind}")
@@ -0,0 +1,552 @@
+import json
+import random
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import accumulate
+from urllib.parse import urlparse, parse_qs
+from logger import logger
+from error_handler import ErrorHandler, CustomProcessingError
+
+
+GWEI = 10**9
+
+
+@ErrorHandler.ehdc()
+class SyntheticChain:
+    """
+    Deterministic generator of Ethereum-like blocks for offline benchmarks and load tests.
+
+    Every block is derived only from the seed, its number and its fork generation, so any block
+    can be generated again on demand and two chains built with the same parameters are identical.
+
+    Parameters
+    ----------
+    seed : int, optional
+        Seed of every random choice (default is 0).
+    first_block : int, optional
+        Number of the first (genesis) block (default is 20_000_000).
+    head_block : int, optional
+        Number of the current chain head (default is `first_block` + 10_000).
+    start_timestamp : int, optional
+        Timestamp of the first block (default is 1704067200, 2024-01-01 00:00:00 UTC).
+    block_time : int, optional
+        Seconds between consecutive blocks (default is 12).
+    block_time_jitter : int, optional
+        Random delay in seconds added to every block timestamp, smaller than `block_time`
+        so timestamps stay increasing (default is 0).
+    transactions_per_block : int, optional
+        Average number of transactions in a block (default is 150).
+    transactions_spread : float, optional
+        Relative spread of the transaction count around the average (default is 0.2).
+    address_count : int, optional
+        Number of distinct addresses taking part in transactions (default is 10_000).
+    address_skew : float, optional
+        Zipf exponent of the address popularity, 0 gives uniformly used addresses (default is 1.1).
+    contract_creation_rate : float, optional
+        Fraction of transactions without a receiver (default is 0.01).
+    """
+    def __init__(self, seed=0, first_block=20_000_000, head_block=None, start_timestamp=1704067200, block_time=12,
+                 block_time_jitter=0, transactions_per_block=150, transactions_spread=0.2, address_count=10_000,
+                 address_skew=1.1, contract_creation_rate=0.01):
+        if not 0 <= block_time_jitter < block_time:
+            raise ValueError("block_time_jitter must be non-negative and smaller than block_time")
+
+        self.seed = seed
+        self.first_block = first_block
+        self.head_block = head_block if head_block is not None else first_block + 10_000
+        self.start_timestamp = start_timestamp
+        self.block_time = block_time
+        self.block_time_jitter = block_time_jitter
+        self.transactions_per_block = transactions_per_block
+        self.transactions_spread = transactions_spread
+        self.contract_creation_rate = contract_creation_rate
+
+        self.addresses = [
+            "0x" + hashlib.blake2b(f"{seed}:address:{index}".encode(), digest_size=20).hexdigest()
+            for index in range(address_count)
+        ]
+        self.cum_weights = list(accumulate(1.0 / (rank + 1) ** address_skew for rank in range(address_count)))
+
+        # blocks at or above each entry were replaced by a reorganization #
+        self.reorg_starts = []
+        self.cache = OrderedDict()
+        self.cache_size = 256
+        self.lock = threading.Lock()
+
+
+    def advance(self, count=1):
+        with self.lock:
+            self.head_block += count
+        return self.head_block
+
+
+    def reorg(self, depth):
+        """
+        Replaces the last `depth` blocks with a competing branch; their hashes and transactions change.
+
+        Returns
+        -------
+        int
+            Number of the first replaced block.
+        """
+        with self.lock:
+            first_replaced = self.head_block - depth + 1
+            self.reorg_starts.append(first_replaced)
+            self.cache.clear()
+        logger.debug(f"Synthetic chain reorganized from block {first_replaced}")
+        return first_replaced
+
+
+    def get_generation(self, block_number):
+        return sum(1 for start in self.reorg_starts if start <= block_number)
+
+
+    def get_block_hash(self, block_number):
+        generation = self.get_generation(block_number)
+        return "0x" + hashlib.blake2b(f"{self.seed}:{generation}:block:{block_number}".encode(),
+                                      digest_size=32).hexdigest()
+
+
+    def get_timestamp(self, block_number):
+        jitter = 0
+        if self.block_time_jitter:
+            jitter = random.Random(f"{self.seed}:time:{block_number}").randrange(self.block_time_jitter + 1)
+        return self.start_timestamp + (block_number - self.first_block) * self.block_time + jitter
+
+
+    def has_block(self, block_number):
+        return self.first_block <= block_number <= self.head_block
+
+
+    def get_block(self, block_number, full_transactions=True):
+        """
+        Returns a block in the `eth_getBlockByNumber` format, or None if it does not exist yet.
+
+        Parameters
+        ----------
+        block_number : int
+            The number of the block.
+        full_transactions : bool, optional
+            If True, transactions are returned as objects, otherwise only their hashes (default is True).
+        """
+        if not self.has_block(block_number):
+            return None
+
+        block, _ = self.get_block_with_receipts(block_number)
+        if full_transactions:
+            return block
+        return {**block, "transactions": [transaction["hash"] for transaction in block["transactions"]]}
+
+
+    def get_block_receipts(self, block_number):
+        if not self.has_block(block_number):
+            return None
+        return self.get_block_with_receipts(block_number)[1]
+
+
+    def get_block_data(self, block_number):
+        """
+        Returns a block in the format stored in the block files by `BlockService.fetch_full_block`,
+        with `gasUsed` and `effectiveGasPrice` copied from the receipts.
+        """
+        block, receipts = self.get_block_with_receipts(block_number)
+        transactions = [
+            {**transaction, "gasUsed": receipt["gasUsed"], "effectiveGasPrice": receipt["effectiveGasPrice"]}
+            for transaction, receipt in zip(block["transactions"], receipts)
+        ]
+        return {
+            "block_number": block_number,
+            "hash": block["hash"],
+            "parent_hash": block["parentHash"],
+            "timestamp": int(block["timestamp"], 16),
+            "transactions": transactions,
+            "receipts": True
+        }
+
+
+    def get_block_with_receipts(self, block_number):
+        with self.lock:
+            if block_number in self.cache:
+                self.cache.move_to_end(block_number)
+                return self.cache[block_number]
+
+        generated = self.generate_block(block_number)
+
+        with self.lock:
+            self.cache[block_number] = generated
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return generated
+
+
+    def generate_block(self, block_number):
+        generation = self.get_generation(block_number)
+        rng = random.Random(f"{self.seed}:{generation}:transactions:{block_number}")
+        block_hash = self.get_block_hash(block_number)
+        block_number_hex = hex(block_number)
+
+        spread = int(self.transactions_per_block * self.transactions_spread)
+        transaction_count = rng.randint(max(0, self.transactions_per_block - spread), self.transactions_per_block + spread)
+        senders = rng.choices(self.addresses, cum_weights=self.cum_weights, k=transaction_count)
+        receivers = rng.choices(self.addresses, cum_weights=self.cum_weights, k=transaction_count)
+        base_fee = rng.randint(5 * GWEI, 40 * GWEI)
+
+        transactions = []
+        receipts = []
+        for index, (sender, receiver) in enumerate(zip(senders, receivers)):
+            transaction_hash = "0x" + hashlib.blake2b(f"{block_hash}:{index}".encode(), digest_size=32).hexdigest()
+            if rng.random() < self.contract_creation_rate:
+                receiver = None
+
+            # a third of the transactions are contract calls without value, the rest is heavy-tailed #
+            value = 0 if rng.random() < 0.33 else int(rng.paretovariate(1.16) * 10**16)
+            gas_limit = 21000 if value and receiver else rng.randint(50_000, 500_000)
+            gas_used = gas_limit if gas_limit == 21000 else rng.randint(21000, gas_limit)
+            gas_price = base_fee + rng.randint(0, 3 * GWEI)
+
+            transactions.append({
+                "blockHash": block_hash,
+                "blockNumber": block_number_hex,
+                "from": sender,
+                "gas": hex(gas_limit),
+                "gasPrice": hex(gas_price),
+                "hash": transaction_hash,
+                "input": "0x",
+                "nonce": hex(rng.randrange(10_000)),
+                "to": receiver,
+                "transactionIndex": hex(index),
+                "value": hex(value),
+            })
+            receipts.append({
+                "blockHash": block_hash,
+                "blockNumber": block_number_hex,
+                "transactionHash": transaction_hash,
+                "transactionIndex": hex(index),
+                "gasUsed": hex(gas_used),
+                "effectiveGasPrice": hex(gas_price),
+                "status": "0x1",
+            })
+
+        block = {
+            "number": block_number_hex,
+            "hash": block_hash,
+            "parentHash": self.get_block_hash(block_number - 1),
+            "timestamp": hex(self.get_timestamp(block_number)),
+            "baseFeePerGas": hex(base_fee),
+            "gasUsed": hex(sum(int(receipt["gasUsed"], 16) for receipt in receipts)),
+            "transactions": transactions,
+        }
+        return block, receipts
+
+
+@ErrorHandler.ehdc()
+class SyntheticChainServer:
+    """
+    Local HTTP stand-in for the Etherscan `proxy` module serving a `SyntheticChain`.
+
+    GET requests follow the Etherscan format used by `EtherAPI`
+    (`/api?module=proxy&action=eth_getBlockByNumber&tag=0x...&boolean=true`), POST requests accept
+    plain JSON-RPC calls, single or batched. Latency, server errors and rate limits can be injected.
+
+    Parameters
+    ----------
+    chain : SyntheticChain
+        The chain to serve.
+    host : str, optional
+        Interface to listen on (default is "127.0.0.1").
+    port : int, optional
+        Port to listen on, 0 picks a free one (default is 0).
+    latency : float, optional
+        Seconds added to every request (default is 0.0).
+    latency_jitter : float, optional
+        Upper bound of a random delay in seconds added on top of `latency` (default is 0.0).
+    error_rate : float, optional
+        Fraction of requests answered with `error_status` (default is 0.0).
+    error_status : int, optional
+        HTTP status of the injected errors (default is 503).
+    rate_limit : float, optional
+        Requests per second allowed before Etherscan's "Max rate limit reached" is returned,
+        None disables the limit (default is None).
+    max_batch_size : int, optional
+        Maximum number of calls in a JSON-RPC batch (default is 100).
+    block_interval : float, optional
+        If set, the chain head advances by one block every `block_interval` seconds while serving
+        (default is None).
+    seed : int, optional
+        Seed of the injected latency and errors (default is 0).
+    """
+    METHODS = ("eth_blockNumber", "eth_getBlockByNumber", "eth_getBlockReceipts")
+    # like Etherscan, the GET proxy module has no eth_getBlockReceipts, it is served only over JSON-RPC #
+    QUERY_METHODS = ("eth_blockNumber", "eth_getBlockByNumber")
+    RATE_LIMIT_RESPONSE = {"status": "0", "message": "NOTOK", "result": "Max rate limit reached"}
+
+    def __init__(self, chain, host="127.0.0.1", port=0, latency=0.0, latency_jitter=0.0, error_rate=0.0,
+                 error_status=503, rate_limit=None, max_batch_size=100, block_interval=None, seed=0):
+        self.chain = chain
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.max_batch_size = max_batch_size
+        self.block_interval = block_interval
+
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = float(rate_limit or 0)
+        self.tokens_updated = time.monotonic()
+        self.last_block_time = time.monotonic()
+        self.stats = {"requests": 0, "calls": 0, "errors": 0, "rate_limited": 0}
+
+        self.http_server = None
+        self.thread = None
+
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/api"
+
+
+    def start(self):
+        self.http_server = ThreadingHTTPServer((self.host, self.port), ProxyRequestHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.stand_in = self
+        self.port = self.http_server.server_address[1]
+        self.last_block_time = time.monotonic()
+
+        self.thread = threading.Thread(target=self.http_server.serve_forever, name="SyntheticChainServer", daemon=True)
+        self.thread.start()
+        logger.info(f"Synthetic chain served at {self.url}")
+        return self.url
+
+
+    def stop(self):
+        if self.http_server:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.thread.join()
+        self.http_server = None
+        self.thread = None
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+    def admit_request(self):
+        """
+        Counts a request, sleeps the injected latency and decides how it is answered.
+
+        Returns
+        -------
+        str
+            "ok", "error" for an injected server error or "rate_limited".
+        """
+        with self.lock:
+            self.stats["requests"] += 1
+            delay = self.latency + (self.rng.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0)
+            failed = self.error_rate and self.rng.random() < self.error_rate
+            limited = self.rate_limit is not None and not self.take_token()
+            self.advance_head()
+
+            if failed:
+                self.stats["errors"] += 1
+            elif limited:
+                self.stats["rate_limited"] += 1
+
+        if delay:
+            time.sleep(delay)
+        return "error" if failed else "rate_limited" if limited else "ok"
+
+
+    # token bucket holding at most one second worth of requests #
+    def take_token(self):
+        now = time.monotonic()
+        self.tokens = min(float(self.rate_limit), self.tokens + (now - self.tokens_updated) * self.rate_limit)
+        self.tokens_updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+    def advance_head(self):
+        if not self.block_interval:
+            return
+        elapsed_blocks = int((time.monotonic() - self.last_block_time) / self.block_interval)
+        if elapsed_blocks:
+            self.chain.advance(elapsed_blocks)
+            self.last_block_time += elapsed_blocks * self.block_interval
+
+
+    def call(self, method, params):
+        """
+        Executes a single proxy call.
+
+        Parameters
+        ----------
+        method : str
+            JSON-RPC method (Etherscan action) name.
+        params : list
+            Positional JSON-RPC parameters.
+
+        Returns
+        -------
+        Any
+            The JSON-RPC result.
+        """
+        with self.lock:
+            self.stats["calls"] += 1
+
+        if method == "eth_blockNumber":
+            return hex(self.chain.head_block)
+        if method == "eth_getBlockByNumber":
+            full_transactions = self.parse_bool(params[1]) if len(params) > 1 else False
+            return self.chain.get_block(self.parse_tag(params[0]), full_transactions)
+        return self.chain.get_block_receipts(self.parse_tag(params[0]))
+
+
+    def parse_tag(self, tag):
+        if tag == "latest":
+            return self.chain.head_block
+        if tag == "earliest":
+            return self.chain.first_block
+        return int(tag, 16)
+
+
+    @staticmethod
+    def parse_bool(value):
+        return value is True or str(value).lower() == "true"
+
+
+    def handle_rpc(self, request):
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        method = request.get("method")
+        if method not in self.METHODS:
+            response["error"] = {"code": -32601, "message": f"the method {method} does not exist/is not available"}
+            return response
+
+        try:
+            response["result"] = self.call(method, request.get("params", []))
+        except (CustomProcessingError, ValueError, TypeError, IndexError) as e:
+            response["error"] = {"code": -32602, "message": f"invalid argument: {e}"}
+        return response
+
+
+    def handle_query(self, query):
+        if query.get("module") != "proxy":
+            return {"status": "0", "message": "NOTOK", "result": "Error! Missing Or invalid Module name"}
+
+        action = query.get("action")
+        if action not in self.QUERY_METHODS:
+            return {"status": "0", "message": "NOTOK", "result": "Error! Missing Or invalid Action name"}
+
+        params = [query[key] for key in ("tag", "boolean") if key in query]
+        response = self.handle_rpc({"id": 1, "method": action, "params": params})
+        if "error" in response and response["error"]["code"] == -32601:
+            return {"status": "0", "message": "NOTOK", "result": "Error! Missing Or invalid Action name"}
+        return response
+
+
+    def handle_batch(self, requests_batch):
+        if len(requests_batch) > self.max_batch_size:
+            return {"jsonrpc": "2.0", "id": None,
+                    "error": {"code": -32600, "message": f"batch larger than {self.max_batch_size} calls"}}
+        return [self.handle_rpc(request) for request in requests_batch]
+
+
+class ProxyRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/api":
+            self.send_json(404, {"status": "0", "message": "NOTOK", "result": "Not found"})
+            return
+
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if self.admit():
+            self.send_json(200, self.server.stand_in.handle_query(query))
+
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"null")
+        except json.JSONDecodeError:
+            self.send_json(200, {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "parse error"}})
+            return
+
+        if not self.admit():
+            return
+
+        stand_in = self.server.stand_in
+        if isinstance(body, list):
+            self.send_json(200, stand_in.handle_batch(body))
+        elif isinstance(body, dict):
+            self.send_json(200, stand_in.handle_rpc(body))
+        else:
+            self.send_json(200, {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "invalid request"}})
+
+
+    def admit(self):
+        stand_in = self.server.stand_in
+        outcome = stand_in.admit_request()
+        if outcome == "error":
+            self.send_json(stand_in.error_status, {"status": "0", "message": "NOTOK", "result": "Injected error"})
+            return False
+        if outcome == "rate_limited":
+            self.send_json(200, stand_in.RATE_LIMIT_RESPONSE)
+            return False
+        return True
+
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, format, *args):
+        logger.debug(f"Synthetic chain request: {format % args}")
+
+
+if __name__ == "__main__":
+    """
+    Serving a synthetic chain locally; point API_URL at the printed address to download from it.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local Etherscan proxy stand-in serving a synthetic chain")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--transactions-per-block", type=int, default=150)
+    parser.add_argument("--address-skew", type=float, default=1.1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None)
+    parser.add_argument("--block-interval", type=float, default=None)
+    arguments = parser.parse_args()
+
+    synthetic_chain = SyntheticChain(seed=arguments.seed, transactions_per_block=arguments.transactions_per_block,
+                                     address_skew=arguments.address_skew)
+    server = SyntheticChainServer(synthetic_chain, port=arguments.port, latency=arguments.latency,
+                                  error_rate=arguments.error_rate, rate_limit=arguments.rate_limit,
+                                  block_interval=arguments.block_interval, seed=arguments.seed)
+    server.start()
+    print(f"Serving blocks {synthetic_chain.first_block}-{synthetic_chain.head_block} at {server.url}")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
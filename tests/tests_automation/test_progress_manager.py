@@ -0,0 +1,47 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from automation import ProgressManager, DataProcessor
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = MagicMock()
+    config.PROGRESS_DATA_FILE = str(tmp_path / "progress.json")
+    config.COLUMNAR_STORE = True
+    config.BALANCE_LEDGER = True
+    return config
+
+
+@pytest.fixture
+def progress_manager(config):
+    return ProgressManager(config, MagicMock())
+
+
+class TestProgressManager:
+
+    # tests create_date_progress #
+    def test_date_progress_covers_every_task_of_the_graph(self, config, progress_manager):
+        task_names = [task["name"] for task in DataProcessor(config, progress_manager, MagicMock()).build_task_graph()]
+        progress_manager.create_date_progress("2024-01-01", 1, 2, task_names)
+
+        for task_name in ["blocks_fetched"] + task_names[:-1]:
+            progress_manager.update_task_progress("2024-01-01", task_name)
+
+        assert {"columns_ingested", "ledger_updated"} <= set(progress_manager.progress["2024-01-01"])
+        assert not progress_manager.are_all_tasks_complete("2024-01-01")
+
+        progress_manager.update_task_progress("2024-01-01", task_names[-1])
+        assert progress_manager.are_all_tasks_complete("2024-01-01")
+
+
+    # tests record_task_timing #
+    def test_timings_are_kept_apart_from_task_flags(self, config, progress_manager):
+        progress_manager.create_date_progress("2024-01-01", 1, 2, ["reports_generated"])
+        progress_manager.record_task_timing("2024-01-01", "reports_generated", 1.23456)
+
+        assert progress_manager.get_task_timings("2024-01-01") == {"reports_generated": 1.235}
+        assert "task_timings" not in progress_manager.progress["2024-01-01"]
+
+        with open(config.PROGRESS_DATA_FILE) as file:
+            assert json.load(file)["task_timings"] == {"2024-01-01": {"reports_generated": 1.235}}
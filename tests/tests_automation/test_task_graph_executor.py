@@ -0,0 +1,122 @@
+import threading
+import pytest
+from unittest.mock import MagicMock
+from automation import TaskGraphExecutor
+from error_handler import CustomProcessingError
+
+
+@pytest.fixture
+def progress_manager():
+    manager = MagicMock()
+    manager.is_task_complete.return_value = False
+    return manager
+
+
+class TestTaskGraphExecutor:
+
+    # tests run #
+    def test_run_respects_dependencies(self, progress_manager):
+        executor = TaskGraphExecutor(progress_manager, max_workers=4)
+        order = []
+        lock = threading.Lock()
+
+        def task(name):
+            def function(target_date):
+                with lock:
+                    order.append(name)
+            return function
+
+        tasks = [
+            {"name": "reports", "function": task("reports"), "depends_on": []},
+            {"name": "balances", "function": task("balances"), "depends_on": ["reports"]},
+            {"name": "export", "function": task("export"), "depends_on": ["reports"]},
+            {"name": "wallets", "function": task("wallets"), "depends_on": ["balances"]},
+        ]
+
+        timings = executor.run("2024-01-01", tasks)
+
+        assert set(timings) == {"reports", "balances", "export", "wallets"}
+        assert order[0] == "reports"
+        assert order.index("wallets") > order.index("balances")
+        progress_manager.update_task_progress.assert_any_call("2024-01-01", "wallets")
+        assert progress_manager.record_task_timing.call_count == 4
+
+
+    def test_run_independent_tasks_concurrently(self, progress_manager):
+        executor = TaskGraphExecutor(progress_manager, max_workers=2)
+        barrier = threading.Barrier(2, timeout=5)
+
+        tasks = [
+            {"name": "first", "function": lambda target_date: barrier.wait(), "depends_on": []},
+            {"name": "second", "function": lambda target_date: barrier.wait(), "depends_on": []},
+        ]
+
+        timings = executor.run("2024-01-01", tasks)
+
+        assert set(timings) == {"first", "second"}
+
+
+    def test_run_skips_completed_tasks(self, progress_manager):
+        progress_manager.is_task_complete.side_effect = lambda date, name: name == "reports"
+        executor = TaskGraphExecutor(progress_manager)
+        reports = MagicMock()
+        balances = MagicMock()
+
+        tasks = [
+            {"name": "reports", "function": reports, "depends_on": []},
+            {"name": "balances", "function": balances, "depends_on": ["reports"]},
+        ]
+
+        executor.run("2024-01-01", tasks)
+
+        reports.assert_not_called()
+        balances.assert_called_once_with("2024-01-01")
+
+
+    def test_run_failed_task_blocks_dependents(self, progress_manager):
+        executor = TaskGraphExecutor(progress_manager)
+        dependent = MagicMock()
+
+        tasks = [
+            {"name": "reports", "function": MagicMock(side_effect=ValueError("boom")), "depends_on": []},
+            {"name": "balances", "function": dependent, "depends_on": ["reports"]},
+        ]
+
+        with pytest.raises(CustomProcessingError):
+            executor.run("2024-01-01", tasks)
+
+        dependent.assert_not_called()
+        progress_manager.update_task_progress.assert_not_called()
+
+
+    def test_run_reuses_worker_threads_across_dates(self, progress_manager):
+        executor = TaskGraphExecutor(progress_manager, max_workers=1)
+        threads = []
+        tasks = [{"name": "reports", "function": lambda target_date: threads.append(threading.current_thread()),
+                  "depends_on": []}]
+
+        executor.run("2024-01-01", tasks)
+        executor.run("2024-01-02", tasks)
+        executor.shutdown()
+
+        assert threads[0] is threads[1]
+        assert not threads[0].is_alive()
+        assert executor.executor is None
+
+
+    # tests validate_graph #
+    def test_validate_graph_cycle(self):
+        tasks = [
+            {"name": "a", "function": MagicMock(), "depends_on": ["b"]},
+            {"name": "b", "function": MagicMock(), "depends_on": ["a"]},
+        ]
+
+        with pytest.raises(CustomProcessingError, match="cycle"):
+            TaskGraphExecutor.validate_graph(tasks)
+
+
+    def test_validate_graph_unknown_dependency(self):
+        tasks = [{"name": "a", "function": MagicMock(), "depends_on": ["missing"]}]
+
+        with pytest.raises(CustomProcessingError, match="unknown task"):
+            TaskGraphExecutor.validate_graph(tasks)
@@ -0,0 +1,99 @@
+from unittest.mock import MagicMock
+from automation import TaskScheduler
+from blocks_stream import HeadWatcher
+from error_handler import CustomProcessingError
+
+
+class TestTaskScheduler:
+
+    # tests run #
+    def test_run_stops_on_interrupt_without_running_task(self):
+        block_processor = MagicMock()
+        scheduler = TaskScheduler(block_processor, update_interval=10, check_interrupt=lambda: True)
+
+        scheduler.run()
+
+        block_processor.run_sequential_processing.assert_not_called()
+
+
+    def test_run_wakes_up_on_trigger(self):
+        block_processor = MagicMock()
+        scheduler = TaskScheduler(block_processor, update_interval=10, interrupt_poll_interval=5)
+        block_processor.run_sequential_processing.side_effect = scheduler.stop
+
+        scheduler.trigger(block_number=100)
+        scheduler.run()
+
+        block_processor.run_sequential_processing.assert_called_once()
+
+
+    def test_run_starts_and_stops_head_watcher(self):
+        head_watcher = MagicMock()
+        scheduler = TaskScheduler(MagicMock(), update_interval=10, check_interrupt=lambda: True,
+                                  head_watcher=head_watcher)
+
+        scheduler.run()
+
+        head_watcher.start.assert_called_once_with(on_new_head=scheduler.trigger)
+        head_watcher.stop.assert_called_once()
+
+
+class TestHeadWatcher:
+
+    # tests check_new_head #
+    def test_check_new_head_only_for_higher_blocks(self):
+        on_new_head = MagicMock()
+        watcher = HeadWatcher(MagicMock())
+        watcher.on_new_head = on_new_head
+
+        assert watcher.check_new_head(100) is True
+        assert watcher.check_new_head(100) is False
+        assert watcher.check_new_head(99) is False
+        assert watcher.check_new_head(101) is True
+
+        assert [call.args[0] for call in on_new_head.call_args_list] == [100, 101]
+
+
+    # tests next_backoff #
+    def test_next_backoff_is_capped(self):
+        watcher = HeadWatcher(MagicMock(), poll_interval=4, max_backoff=20)
+
+        assert watcher.next_backoff(0) == 8
+        assert watcher.next_backoff(8) == 16
+        assert watcher.next_backoff(16) == 20
+
+
+    # tests watch #
+    def test_watch_backs_off_on_api_error(self):
+        ether_api = MagicMock()
+        watcher = HeadWatcher(ether_api, poll_interval=0.01, max_backoff=0.02)
+
+        def failing_call():
+            if ether_api.get_latest_block_number.call_count >= 3:
+                watcher.stop_event.set()
+            raise CustomProcessingError(ValueError("rate limited"))
+
+        ether_api.get_latest_block_number.side_effect = failing_call
+        watcher.on_new_head = MagicMock()
+
+        watcher.watch()
+
+        assert ether_api.get_latest_block_number.call_count == 3
+        watcher.on_new_head.assert_not_called()
+
+
+    def test_watch_survives_unexpected_errors(self):
+        ether_api = MagicMock()
+        watcher = HeadWatcher(ether_api, poll_interval=0.01, max_backoff=0.02)
+        ether_api.get_latest_block_number.side_effect = [ConnectionError("connection reset"), 100, 101]
+
+        def on_new_head(block_number):
+            if block_number == 101:
+                watcher.stop_event.set()
+            raise KeyError("result")
+
+        watcher.on_new_head = MagicMock(side_effect=on_new_head)
+
+        watcher.watch()
+
+        assert [call.args[0] for call in watcher.on_new_head.call_args_list] == [100, 101]
@@ -0,0 +1,92 @@
+import pytest
+from error_handler import CustomProcessingError
+from database_tool import DatabaseManager, SchemaMigrator
+from balance_ledger import BalanceLedger
+
+
+ETH = 10**18
+
+
+def make_transaction(sender, receiver, value_wei, gas=21000, gas_price=10**9, gas_used=None):
+    transaction = {"from": sender, "to": receiver, "value": hex(value_wei), "gas": hex(gas), "gasPrice": hex(gas_price)}
+    if gas_used is not None:
+        transaction["gasUsed"] = hex(gas_used)
+    return transaction
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    database_manager = DatabaseManager(str(tmp_path / "test.db"))
+    SchemaMigrator(database_manager).migrate()
+    return BalanceLedger(database_manager, include_fees=True)
+
+
+class TestBalanceLedger:
+
+    # tests fold_day #
+    def test_fold_day_accumulates_exact_balances(self, ledger):
+        ledger.fold_day("2024-01-01", {"2024-01-01 00:00:00": [
+            make_transaction("0xA", "0xB", 50_000 * ETH + 7, gas=50000, gas_used=21000)
+        ]})
+        ledger.fold_day("2024-01-02", {"2024-01-02 05:00:00": [
+            make_transaction("0xB", "0xC", 10 * ETH, gas_price=0, gas_used=21000)
+        ]})
+
+        fee = 21000 * 10**9
+        assert ledger.get_balance_wei("0xA") == -50_000 * ETH - 7 - fee
+        assert ledger.get_balance_wei("0xB") == 49_990 * ETH + 7
+        assert ledger.get_balance_wei("0xC") == 10 * ETH
+
+
+    def test_fold_day_skips_folded_day(self, ledger):
+        transactions_by_hour = {"2024-01-01 00:00:00": [make_transaction("0xA", "0xB", ETH)]}
+
+        assert ledger.fold_day("2024-01-01", transactions_by_hour) == 2
+        assert ledger.fold_day("2024-01-01", transactions_by_hour) == 0
+        assert ledger.get_balance_wei("0xB") == ETH
+
+
+    def test_fold_day_skips_fees_without_receipts(self, ledger):
+        ledger.fold_day("2024-01-01", {"2024-01-01 00:00:00": [make_transaction("0xA", "0xB", ETH, gas=10**6)]})
+
+        assert ledger.get_balance_wei("0xA") == -ETH
+
+
+    def test_fold_day_rejects_day_before_last_folded(self, ledger):
+        ledger.fold_day("2024-01-02", {"2024-01-02 00:00:00": [make_transaction("0xA", "0xB", ETH)]})
+
+        with pytest.raises(CustomProcessingError):
+            ledger.fold_day("2024-01-01", {"2024-01-01 00:00:00": [make_transaction("0xA", "0xB", 2 * ETH)]})
+
+        assert ledger.get_balance_wei("0xB") == ETH
+        assert not ledger.is_day_folded("2024-01-01")
+
+
+    def test_fold_day_ignores_missing_receiver(self, ledger):
+        assert ledger.fold_day("2024-01-01", {"2024-01-01 00:00:00": [make_transaction("0xA", None, ETH)]}) == 1
+
+
+    # tests get_balance_wei #
+    def test_snapshots_keep_balance_of_each_date(self, ledger):
+        ledger.fold_day("2024-01-01", {"2024-01-01 00:00:00": [make_transaction("0xA", "0xB", 2 * ETH)]})
+        ledger.fold_day("2024-01-03", {"2024-01-03 00:00:00": [make_transaction("0xA", "0xB", 3 * ETH)]})
+
+        assert ledger.get_balance_wei("0xB", "2023-12-31") == 0
+        assert ledger.get_balance_wei("0xB", "2024-01-02") == 2 * ETH
+        assert ledger.get_balance_wei("0xB", "2024-01-03") == 5 * ETH
+
+
+    # tests get_top_holders and classify_holdings #
+    def test_holdings_queries(self, ledger):
+        ledger.fold_day("2024-01-01", {"2024-01-01 00:00:00": [
+            make_transaction("0xA", "0xB", 2000 * ETH), make_transaction("0xA", "0xC", 5 * ETH),
+        ]})
+        ledger.fold_day("2024-01-02", {"2024-01-02 00:00:00": [make_transaction("0xB", "0xC", 1000 * ETH, gas_used=21000)]})
+
+        top_holders = ledger.get_top_holders(2)
+        assert [holder["wallet address"] for holder in top_holders] == ["0xC", "0xB"]
+        assert top_holders[0]["balance wei"] == 1005 * ETH
+
+        assert ledger.get_top_holders(1, "2024-01-01")[0]["wallet address"] == "0xB"
+        assert ledger.classify_holdings() == {"1000-10000 ETH": 1, "100-1000 ETH": 1, "Below 0.1 ETH": 1}
+        assert ledger.classify_holdings("2024-01-01") == {"1000-10000 ETH": 1, "1-10 ETH": 1, "Below 0.1 ETH": 1}
@@ -0,0 +1,40 @@
+import os
+import pytest
+from benchmarks import PipelineBenchmark, STAGES, compare_reports
+
+
+def create_report(medians):
+    return {"results": [{"name": name, "size": 10, "median": median} for name, median in medians.items()]}
+
+
+class TestPipelineBenchmark:
+
+    # tests run #
+    def test_every_stage_is_measured_at_every_size(self, tmp_path):
+        benchmark = PipelineBenchmark([4, 8], repeats=1, transactions_per_block=5, work_dir=str(tmp_path))
+        report = benchmark.run()
+
+        assert [(result["name"], result["size"]) for result in report["results"]] == \
+               [(stage, size) for size in (4, 8) for stage in STAGES]
+        assert all(result["median"] > 0 and result["items"] > 0 for result in report["results"])
+        assert os.path.exists(tmp_path / "size_8" / "interesting_info" / "2024-01-01_hourly_data.json")
+        assert report["parameters"]["sizes"] == [4, 8]
+
+
+    # tests __init__ #
+    def test_unknown_stage_is_rejected(self):
+        with pytest.raises(Exception, match="Unknown benchmark stages"):
+            PipelineBenchmark([10], stages=["group_by_hour", "compile"])
+
+
+class TestCompareReports:
+
+    # tests compare_reports #
+    def test_changes_beyond_tolerance_are_flagged(self):
+        baseline = create_report({"load_blocks": 1.0, "group_by_hour": 1.0, "db_import": 1.0})
+        report = create_report({"load_blocks": 1.25, "group_by_hour": 0.95, "db_import": 0.5, "chart_queries": 0.1})
+
+        statuses = {entry["name"]: entry["status"] for entry in compare_reports(report, baseline, tolerance=0.1)}
+
+        assert statuses == {"load_blocks": "regression", "group_by_hour": "unchanged",
+                            "db_import": "improvement", "chart_queries": "new"}
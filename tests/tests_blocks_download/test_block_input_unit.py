@@ -23,7 +23,7 @@ def block_input_invalid():
 @pytest.mark.unit
 @patch.object(BlockInput, 'console_input', return_value=5)
 def test_get_num_blocks_to_fetch_console(mock_console_input, block_input_console, caplog):
-    with caplog.at_level(logging.DEBUG):
+    with caplog.at_level(logging.DEBUG, logger="SingletonLogger"):
         result = block_input_console.get_num_blocks_to_fetch()
 
     assert result == 5
@@ -35,7 +35,7 @@ def test_get_num_blocks_to_fetch_console(mock_console_input, block_input_console
 @patch.object(BlockInput, 'console_input')
 def test_get_num_blocks_to_fetch_interface(
     mock_console_input, mock_interface_input, block_input_interface, caplog):
-    with caplog.at_level(logging.DEBUG):
+    with caplog.at_level(logging.DEBUG, logger="SingletonLogger"):
         result = block_input_interface.get_num_blocks_to_fetch()
 
     assert result == (5, True)
@@ -93,7 +93,7 @@ def test_console_input_max_retries_error(mock_get_user_input, mock_validate_inpu
 @patch.object(BlockInput, 'validate_input', return_value=5)
 @patch('PyQt5.QtWidgets.QInputDialog.getInt', return_value=(5, True))
 def test_interface_input_success(mock_getint, mock_validate_input, block_input_console, caplog):
-    with caplog.at_level(logging.DEBUG):
+    with caplog.at_level(logging.DEBUG, logger="SingletonLogger"):
         result = block_input_console.interface_input()
 
     assert result == 5
@@ -105,7 +105,7 @@ def test_interface_input_success(mock_getint, mock_validate_input, block_input_c
 @patch.object(BlockInput, 'validate_input')
 @patch('PyQt5.QtWidgets.QInputDialog.getInt', return_value=(0, False))
 def test_interface_input_cancelled(mock_getint, mock_validate_input, block_input_console, caplog):
-    with caplog.at_level(logging.DEBUG):
+    with caplog.at_level(logging.DEBUG, logger="SingletonLogger"):
         result = block_input_console.interface_input()
 
     assert result is None
@@ -128,7 +128,7 @@ def test_interface_input_validation_error(mock_get_input, mock_validate_input, b
 @pytest.mark.unit
 @patch("builtins.input", return_value="5")
 def test_get_user_input_success(input_mocker, block_input_console, caplog):
-    with caplog.at_level("DEBUG"):
+    with caplog.at_level("DEBUG", logger="SingletonLogger"):
         result = block_input_console.get_user_input()
 
     assert result == 5
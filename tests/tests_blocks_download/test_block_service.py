@@ -0,0 +1,55 @@
+import pytest
+from unittest.mock import MagicMock
+from blocks_download import BlockService
+from error_handler import CustomProcessingError
+
+
+@pytest.fixture
+def ether_api():
+    ether_api = MagicMock()
+    ether_api.get_block_timestamp.return_value = 1704067200
+    ether_api.get_block_transactions.return_value = [
+        {"hash": "0x1", "gas": "0x7530", "gasPrice": "0x3b9aca00"},
+        {"hash": "0x2", "gas": "0x5208", "gasPrice": "0x3b9aca00"},
+    ]
+    ether_api.get_block_receipts.return_value = [
+        {"transactionHash": "0x1", "gasUsed": "0x5208", "effectiveGasPrice": "0x3b9aca00"},
+        {"transactionHash": "0x2", "gasUsed": "0x5208", "effectiveGasPrice": "0x3b9aca01"},
+    ]
+    return ether_api
+
+
+class TestBlockService:
+
+    # tests fetch_block_data / add_receipts #
+    def test_fetch_block_data_without_receipts(self, ether_api):
+        block_data = BlockService(ether_api).fetch_block_data(1)
+
+        ether_api.get_block_receipts.assert_not_called()
+        assert "gasUsed" not in block_data["transactions"][0]
+
+
+    def test_fetch_block_data_enriches_transactions_with_receipts(self, ether_api):
+        block_data = BlockService(ether_api, fetch_receipts=True).fetch_block_data(1)
+
+        ether_api.get_block_receipts.assert_called_once_with(1)
+        assert block_data["receipts"] is True
+        assert block_data["transactions"][0]["gasUsed"] == "0x5208"
+        assert block_data["transactions"][1]["effectiveGasPrice"] == "0x3b9aca01"
+
+
+    def test_add_receipts_skips_enriched_block(self, ether_api):
+        block_service = BlockService(ether_api, fetch_receipts=True)
+        block_data = block_service.fetch_block_data(1)
+
+        block_service.add_receipts(block_data)
+
+        assert ether_api.get_block_receipts.call_count == 1
+
+
+    def test_receipts_require_rpc_url(self, ether_api):
+        ether_api.config.RPC_URL = ""
+
+        with pytest.raises(CustomProcessingError, match="RPC_URL"):
+            BlockService(ether_api, fetch_receipts=True)
+        assert BlockService(ether_api).fetch_receipts is False
@@ -0,0 +1,159 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from blocks_extractor import (IncrementalHourlyAggregator, HourlyDataExtractor, TransactionProcessor, WalletUpdater,
+                              WalletClassifier, TopWalletsGenerator, ResultFormatter)
+from database_tool import DatabaseManager, SchemaMigrator, WalletSketchStore
+
+
+def make_transaction(sender, receiver, value_wei):
+    return {"from": sender, "to": receiver, "value": hex(value_wei), "gasPrice": "0x3b9aca00", "gas": "0x5208"}
+
+
+def make_config(base_dir):
+    config = MagicMock()
+    config.BASE_DIR = str(base_dir)
+    config.OUTPUT_FOLDER = "interesting_info"
+    (base_dir / "interesting_info").mkdir()
+    return config
+
+
+def make_sketch_store(base_dir):
+    database_manager = DatabaseManager(str(base_dir / "test.db"))
+    SchemaMigrator(database_manager).migrate()
+    return WalletSketchStore(database_manager)
+
+
+def load_output(base_dir, date):
+    with open(base_dir / "interesting_info" / f"{date}_hourly_data.json") as file:
+        return json.load(file)
+
+
+def load_sketches(sketch_store):
+    with sketch_store.db_manager as db:
+        return db.execute_query("SELECT kind, date, sketch FROM wallet_sketches ORDER BY kind, date").fetchall()
+
+
+@pytest.fixture
+def aggregator(tmp_path):
+    return IncrementalHourlyAggregator(
+        TransactionProcessor(),
+        WalletUpdater(),
+        WalletClassifier(),
+        TopWalletsGenerator(),
+        ResultFormatter(),
+        make_config(tmp_path)
+    )
+
+
+class TestIncrementalHourlyAggregator:
+
+    # tests add_block / get_hour_result #
+    def test_add_block_and_get_hour_result(self, aggregator):
+        aggregator.add_block({"block_number": 1, "timestamp": 1704067200,
+                              "transactions": [make_transaction("0xA", "0xB", 2 * 10**18)]})
+        hour = aggregator.add_block({"block_number": 2, "timestamp": 1704067212,
+                                     "transactions": [make_transaction("0xB", "0xC", 10**18)]})
+
+        result = aggregator.get_hour_result(hour)
+
+        assert hour == "2024-01-01 00:00:00"
+        assert result["transactions number"] == 2
+        assert result["average transaction fee"] == pytest.approx(0.000021)
+        assert result["wallet classification in eth balance"] == {"Below 0.1 ETH": 1, "1-10 ETH": 2}
+
+
+    def test_add_block_twice_is_ignored(self, aggregator):
+        block = {"block_number": 1, "timestamp": 1704067200, "transactions": [make_transaction("0xA", "0xB", 1)]}
+
+        aggregator.add_block(block)
+        aggregator.add_block(block)
+
+        assert aggregator.get_hour_result("2024-01-01 00:00:00")["transactions number"] == 1
+
+
+    # tests retract_block #
+    def test_retract_block_removes_its_contribution(self, aggregator):
+        aggregator.add_block({"block_number": 1, "timestamp": 1704067200,
+                              "transactions": [make_transaction("0xA", "0xB", 1)]})
+        aggregator.add_block({"block_number": 2, "timestamp": 1704067212,
+                              "transactions": [make_transaction("0xA", "0xB", 1), make_transaction("0xB", "0xC", 1)]})
+
+        assert aggregator.retract_block(2) == "2024-01-01 00:00:00"
+        assert aggregator.retract_block(2) is None
+        assert aggregator.get_hour_result("2024-01-01 00:00:00")["transactions number"] == 1
+
+
+    # tests flush #
+    def test_flush_saves_results_and_closes_old_hours(self, aggregator, tmp_path):
+        aggregator.add_block({"block_number": 1, "timestamp": 1704067200,
+                              "transactions": [make_transaction("0xA", "0xB", 1)]})
+        current_hour = aggregator.add_block({"block_number": 300, "timestamp": 1704070800,
+                                             "transactions": [make_transaction("0xA", "0xB", 1)]})
+
+        aggregator.flush(current_hour)
+
+        with open(tmp_path / "interesting_info" / "2024-01-01_hourly_data.json") as file:
+            saved = json.load(file)
+
+        assert [entry["time"] for entry in saved] == ["2024-01-01 00:00:00", "2024-01-01 01:00:00"]
+        assert list(aggregator.hours) == ["2024-01-01 01:00:00"]
+        assert aggregator.block_hours == {300: "2024-01-01 01:00:00"}
+
+
+    def test_flush_recomputes_only_changed_hours(self, aggregator, tmp_path):
+        aggregator.add_block({"block_number": 1, "timestamp": 1704067200,
+                              "transactions": [make_transaction("0xA", "0xB", 1)]})
+        aggregator.add_block({"block_number": 300, "timestamp": 1704070800,
+                              "transactions": [make_transaction("0xA", "0xB", 1)]})
+        aggregator.flush("2024-01-01 00:00:00")
+
+        aggregator.add_block({"block_number": 301, "timestamp": 1704070812,
+                              "transactions": [make_transaction("0xB", "0xC", 1)]})
+        results = aggregator.flush("2024-01-01 00:00:00")
+
+        assert [result["time"] for result in results] == ["2024-01-01 01:00:00"]
+        saved = load_output(tmp_path, "2024-01-01")
+        assert [entry["time"] for entry in saved] == ["2024-01-01 00:00:00", "2024-01-01 01:00:00"]
+        assert saved[1]["transactions number"] == 2
+        assert aggregator.flush("2024-01-01 00:00:00") == []
+
+
+    def test_flush_output_matches_batch_extraction(self, tmp_path):
+        blocks = [
+            {"block_number": 1, "timestamp": 1704067200, "transactions": [
+                make_transaction("0xA", "0xB", 2 * 10**18), make_transaction("0xC", "0xB", 5 * 10**17),
+            ]},
+            {"block_number": 2, "timestamp": 1704067212, "transactions": [make_transaction("0xB", "0xD", 10**18)]},
+            {"block_number": 300, "timestamp": 1704070800, "transactions": [make_transaction("0xD", "0xA", 3 * 10**18)]},
+        ]
+        (tmp_path / "stream").mkdir()
+        (tmp_path / "batch").mkdir()
+
+        stream_store = make_sketch_store(tmp_path / "stream")
+        aggregator = IncrementalHourlyAggregator(
+            TransactionProcessor(), WalletUpdater(), WalletClassifier(), TopWalletsGenerator(), ResultFormatter(),
+            make_config(tmp_path / "stream"), stream_store
+        )
+        for block in blocks:
+            aggregator.add_block(block)
+        aggregator.flush("2024-01-01 02:00:00")
+
+        transactions_grouper = MagicMock()
+        transactions_grouper.group_transactions_by_hour.return_value = {
+            "2024-01-01 00:00:00": blocks[0]["transactions"] + blocks[1]["transactions"],
+            "2024-01-01 01:00:00": blocks[2]["transactions"],
+        }
+        batch_store = make_sketch_store(tmp_path / "batch")
+        extractor = HourlyDataExtractor(
+            transactions_grouper, TransactionProcessor(), WalletUpdater(), WalletClassifier(), TopWalletsGenerator(),
+            ResultFormatter(), make_config(tmp_path / "batch"), batch_store
+        )
+        extractor.extract_data("2024-01-01 00:00:00")
+
+        streamed = load_output(tmp_path / "stream", "2024-01-01")
+        assert streamed == load_output(tmp_path / "batch", "2024-01-01")[:2]
+        assert all("wallet sketches" not in entry for entry in streamed)
+
+        batch_sketches = [row for row in load_sketches(batch_store) if row[1] < "2024-01-01 02:00:00"]
+        assert batch_sketches and load_sketches(stream_store) == batch_sketches
@@ -30,6 +30,7 @@ class TestResultFormatter:
             "time": start_hour_str,
             "transactions number": total_transactions,
             "average transaction fee": total_fees / total_transactions if total_transactions > 0 else 0,
+            "total transaction fee": total_fees,
             "wallet classification in eth balance": wallets_balances,
             "top 5 buyers": top_wallets_generator.get_top_wallets(wallets_transactions, top_n=5, is_seller=False),
             "top 5 sellers": top_wallets_generator.get_top_wallets(wallets_transactions, top_n=5, is_seller=True)
@@ -30,6 +30,32 @@ class TestTransactionProcessor:
             assert processor.total_value_eth == 1.0
         
 
+    def test_process_transaction_uses_receipt_gas(self, processor):
+        transaction = {
+            "from": "0xSenderAddress",
+            "to": "0xReceiverAddress",
+            "value": "0x0",
+            "gasPrice": "0x3b9aca00",
+            "gas": "0x7530",
+            "gasUsed": "0x5208",
+            "effectiveGasPrice": "0x77359400"
+        }
+
+        processor.process_transaction(transaction)
+
+        assert processor.total_fees_wei == 21000 * 2 * 10**9
+
+
+    def test_process_transaction_sums_exact_wei(self, processor):
+        transaction = {"from": "0xA", "to": "0xB", "value": hex(10**17 + 1), "gasPrice": "0x1", "gas": "0x1"}
+
+        for _ in range(10):
+            processor.process_transaction(transaction)
+
+        assert processor.total_value_wei == 10**18 + 10
+        assert processor.total_fees_wei == 10
+
+
     def test_process_transaction_missing_key(self, processor, caplog):        
         transaction = {
             "from": "0xSenderAddress",
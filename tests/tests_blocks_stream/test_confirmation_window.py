@@ -0,0 +1,85 @@
+import pytest
+from unittest.mock import MagicMock
+from blocks_stream import ConfirmationWindow
+
+
+def make_block(number, fork=""):
+    return {
+        "block_number": number, "hash": f"0x{fork}{number}", "parent_hash": f"0x{fork}{number - 1}",
+        "timestamp": 1704067200 + number * 12, "transactions": []
+    }
+
+
+@pytest.fixture
+def chain():
+    return {"fork": "", "fork_from": None}
+
+
+@pytest.fixture
+def confirmation_window(tmp_path, chain):
+    def canonical_block(number):
+        forked = chain["fork_from"] is not None and number >= chain["fork_from"]
+        block = make_block(number, chain["fork"] if forked else "")
+        if forked and number == chain["fork_from"]:
+            block["parent_hash"] = f"0x{number - 1}"
+        return block
+
+    config = MagicMock()
+    config.BLOCKS_DATA_DIR = str(tmp_path)
+
+    ether_api = MagicMock()
+    ether_api.get_block.side_effect = lambda number, full_transactions=True: {"hash": canonical_block(number)["hash"]}
+    block_service = MagicMock()
+    block_service.fetch_full_block.side_effect = canonical_block
+
+    return ConfirmationWindow(config, ether_api, block_service, MagicMock(), 3, str(tmp_path / "window.json"))
+
+
+class TestConfirmationWindow:
+
+    # tests revalidate #
+    def test_revalidate_unchanged_chain_costs_one_header(self, confirmation_window):
+        for number in range(10, 14):
+            confirmation_window.fetch_block(number)
+        confirmation_window.ether_api.get_block.reset_mock()
+
+        assert confirmation_window.revalidate() == []
+        assert confirmation_window.ether_api.get_block.call_count == 1
+
+
+    def test_revalidate_refetches_only_reorged_blocks(self, confirmation_window, chain):
+        for number in range(10, 14):
+            confirmation_window.fetch_block(number)
+        chain.update(fork="f", fork_from=12)
+        confirmation_window.block_service.fetch_full_block.reset_mock()
+        replaced = []
+
+        reorged = confirmation_window.revalidate(lambda number, block: replaced.append(number))
+
+        assert reorged == [12, 13]
+        assert replaced == [12, 13]
+        assert [c.args[0] for c in confirmation_window.block_service.fetch_full_block.call_args_list] == [12, 13]
+        assert confirmation_window.blocks[13]["hash"] == "0xf13"
+
+
+    # tests fetch_block #
+    def test_fetch_block_detects_broken_parent_chain(self, confirmation_window, chain):
+        for number in range(10, 13):
+            confirmation_window.fetch_block(number)
+        chain.update(fork="f", fork_from=11)
+        replaced = []
+
+        confirmation_window.fetch_block(13, lambda number, block: replaced.append(number))
+
+        assert replaced == [11, 12]
+        assert confirmation_window.blocks[13]["parent_hash"] == confirmation_window.blocks[12]["hash"]
+
+
+    # tests prune #
+    def test_prune_finalizes_blocks_below_depth(self, confirmation_window):
+        for number in range(10, 14):
+            confirmation_window.fetch_block(number)
+
+        assert confirmation_window.prune(14) == [10, 11]
+        assert sorted(confirmation_window.blocks) == [12, 13]
+        assert confirmation_window.oldest_block() == 12
@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import MagicMock
+from blocks_stream import HeadFollower
+
+
+@pytest.fixture
+def head_follower(tmp_path):
+    config = MagicMock()
+    config.BLOCKS_DATA_DIR = str(tmp_path)
+    config.BLOCKS_DATA_FILE = str(tmp_path / "blocks_data.json")
+
+    block_service = MagicMock()
+    block_service.fetch_full_block.side_effect = lambda number: {
+        "block_number": number, "hash": f"0x{number}", "parent_hash": f"0x{number - 1}",
+        "timestamp": 1704067200 + number * 12, "transactions": []
+    }
+    aggregator = MagicMock()
+    aggregator.add_block.return_value = "2024-01-01 00:00:00"
+    aggregator.block_hours = {}
+    state = MagicMock()
+    state.last_block = None
+
+    return HeadFollower(
+        config=config,
+        block_service=block_service,
+        file_manager=MagicMock(),
+        aggregator=aggregator,
+        state=state,
+        head_watcher=MagicMock(),
+        confirmation_depth=2,
+    )
+
+
+class TestHeadFollower:
+
+    # tests process_new_head #
+    def test_process_new_head_starts_at_confirmed_head(self, head_follower):
+        ingested = head_follower.process_new_head(100)
+
+        assert ingested == [98]
+        assert head_follower.state.last_block == 98
+
+
+    def test_process_new_head_ingests_each_block_once(self, head_follower):
+        head_follower.state.last_block = 95
+
+        assert head_follower.process_new_head(100) == [96, 97, 98]
+        assert head_follower.process_new_head(100) == []
+        assert head_follower.process_new_head(101) == [99]
+
+        fetched = [call.args[0] for call in head_follower.block_service.fetch_full_block.call_args_list]
+        assert fetched == [96, 97, 98, 99]
+        assert head_follower.aggregator.add_block.call_count == 4
+        assert head_follower.fetched_block_numbers == [96, 97, 98, 99]
+
+
+    def test_process_new_head_stops_on_interrupt(self, head_follower):
+        head_follower.state.last_block = 90
+
+        ingested = head_follower.process_new_head(100, check_interrupt=lambda: True)
+
+        assert ingested == []
+        head_follower.block_service.fetch_full_block.assert_not_called()
+        head_follower.aggregator.flush.assert_not_called()
+
+
+    # tests run #
+    def test_run_retries_after_failed_fetch(self, head_follower):
+        head_follower.head_watcher.latest_block = 100
+        head_follower.head_watcher.next_backoff.return_value = 0.01
+        head_follower.interrupt_poll_interval = 0.01
+        head_follower.state.last_block = 97
+        head_follower.state.open_blocks = []
+        fetch_full_block = head_follower.block_service.fetch_full_block.side_effect
+        head_follower.block_service.fetch_full_block.side_effect = [RuntimeError("rate limited"), fetch_full_block(98)]
+        head_follower.on_new_head(100)
+
+        head_follower.run(check_interrupt=lambda: head_follower.state.last_block == 98)
+
+        assert head_follower.block_service.fetch_full_block.call_count == 2
+        head_follower.aggregator.flush.assert_called_once()
+        head_follower.head_watcher.stop.assert_called_once()
+
+
+    def test_process_new_head_with_window_retracts_reorged_blocks(self, head_follower):
+        window = MagicMock()
+        window.revalidate.side_effect = lambda on_block_replaced: on_block_replaced(99, {"block_number": 99})
+        window.fetch_block.side_effect = lambda number, on_block_replaced: {"block_number": number}
+        window.oldest_block.return_value = None
+        head_follower.confirmation_window = window
+        head_follower.state.last_block = 99
+
+        assert head_follower.process_new_head(101) == [100, 101]
+        head_follower.aggregator.retract_block.assert_called_once_with(99)
+        window.prune.assert_called_once_with(101)
+        window.save.assert_called_once()
@@ -0,0 +1,92 @@
+import sqlite3
+import pytest
+from datetime import date
+from chart_data import ChartDataProvider, lttb_indices
+from database_tool import DatabaseManager, SchemaMigrator
+
+HOURLY_QUERY = 'SELECT date, transactions_number FROM combined_data WHERE data_type="hourly"'
+
+
+@pytest.fixture
+def db_filename(tmp_path):
+    db_filename = str(tmp_path / "test.db")
+    SchemaMigrator(DatabaseManager(db_filename)).migrate()
+    insert_hours(db_filename, [("2024-01-02 01:00:00", 1, 20), ("2024-01-01 05:00:00", 5, 10),
+                               ("2024-01-01 02:00:00", 2, 30)])
+    return db_filename
+
+
+@pytest.fixture
+def provider(db_filename):
+    database_manager = DatabaseManager(db_filename)
+    yield ChartDataProvider(database_manager)
+    database_manager.close_all()
+
+
+def insert_hours(db_filename, rows):
+    with sqlite3.connect(db_filename) as connection:
+        connection.executemany(
+            "INSERT INTO combined_data (data_type, date, hour, transactions_number) VALUES ('hourly', ?, ?, ?)", rows
+        )
+
+
+class TestChartDataProvider:
+
+    # tests get_chart_data #
+    def test_get_chart_data_sorts_in_sql(self, provider):
+        data_x, data_y = provider.get_chart_data(HOURLY_QUERY)
+
+        assert data_x == ["2024-01-01 02:00:00", "2024-01-01 05:00:00", "2024-01-02 01:00:00"]
+        assert data_y == [30, 10, 20]
+
+
+    def test_get_chart_data_filters_by_bound_date(self, provider):
+        data_x, _ = provider.get_chart_data(HOURLY_QUERY, date(2024, 1, 1))
+
+        assert data_x == ["2024-01-01 02:00:00", "2024-01-01 05:00:00"]
+        assert not provider.has_data(HOURLY_QUERY, date(2023, 1, 1))
+
+
+    def test_get_chart_data_is_cached_until_database_changes(self, provider, db_filename):
+        first = provider.get_chart_data(HOURLY_QUERY)
+        assert provider.get_chart_data(HOURLY_QUERY) is first
+
+        insert_hours(db_filename, [("2024-01-03 00:00:00", 0, 40)])
+
+        data_x, _ = provider.get_chart_data(HOURLY_QUERY)
+        assert data_x[-1] == "2024-01-03 00:00:00"
+
+
+    # tests build_query #
+    def test_build_query_keeps_existing_order(self):
+        query, parameters = ChartDataProvider.build_query("SELECT date, balance FROM wallet_balance ORDER BY date")
+
+        assert query.count("ORDER BY") == 1
+        assert parameters == ()
+
+
+class TestLttbIndices:
+
+    # tests lttb_indices #
+    def test_lttb_indices_keeps_short_series(self):
+        assert lttb_indices([1, 2, 3], 10) == [0, 1, 2]
+
+
+    def test_lttb_indices_limits_points_and_keeps_extremes(self):
+        data_y = [0] * 1000
+        data_y[500] = 100
+        data_y[700] = -100
+
+        selected = lttb_indices(data_y, 50)
+
+        assert len(selected) == 50
+        assert selected[0] == 0 and selected[-1] == 999
+        assert 500 in selected and 700 in selected
+        assert selected == sorted(selected)
+
+
+    def test_lttb_indices_on_visible_range(self):
+        selected = lttb_indices(list(range(1000)), 20, start=100, stop=300)
+
+        assert len(selected) == 20
+        assert selected[0] == 100 and selected[-1] == 299
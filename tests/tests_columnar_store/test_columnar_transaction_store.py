@@ -0,0 +1,128 @@
+import pytest
+import numpy as np
+from columnar_store import AddressRegistry, ColumnarTransactionStore
+from blocks_extractor import TransactionProcessor, WalletUpdater, TopWalletsGenerator, process_transactions
+from balance_ledger import BalanceLedger
+
+
+DAY_START = 1704067200
+
+
+def make_transaction(sender, receiver, value_wei, gas=21000, gas_price=10**9):
+    return {"from": sender, "to": receiver, "value": hex(value_wei), "gas": hex(gas), "gasPrice": hex(gas_price)}
+
+
+def make_blocks():
+    return [
+        {"block_number": 2, "timestamp": DAY_START + 3600 + 12, "transactions": [
+            make_transaction("0xa", "0xc", 3 * 10**18),
+            make_transaction("0xb", None, 40 * 10**18),
+        ]},
+        {"block_number": 1, "timestamp": DAY_START + 12, "transactions": [
+            make_transaction("0xa", "0xb", 5 * 10**18),
+            make_transaction("0xa", "0xb", 2 * 10**18, gas=50000),
+        ]},
+        {"block_number": 3, "timestamp": DAY_START - 12, "transactions": [
+            make_transaction("0xz", "0xz", 1),
+        ]},
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    registry = AddressRegistry(str(tmp_path / "addresses.txt"))
+    return ColumnarTransactionStore(str(tmp_path), registry)
+
+
+@pytest.fixture
+def block_file_processor():
+    blocks = {f"block_{block['block_number']}.json": block for block in make_blocks()}
+
+    class Processor:
+        def load_block_data(self, json_file):
+            return blocks[json_file]
+
+    return Processor()
+
+
+def process_with(transactions):
+    transaction_processor, wallet_updater = TransactionProcessor(), WalletUpdater()
+    for batch in transactions:
+        process_transactions(batch, transaction_processor, wallet_updater)
+    return transaction_processor, wallet_updater
+
+
+class TestColumnarTransactionStore:
+
+    # tests ingest_day #
+    def test_ingest_day_skips_blocks_of_other_days(self, store, block_file_processor):
+        stored = store.ingest_day("2024-01-01", block_file_processor, ["block_1.json", "block_2.json", "block_3.json"])
+
+        assert stored == 4
+        assert store.has_day("2024-01-01")
+        assert not store.has_day("2023-12-31")
+
+
+    # tests load_day #
+    def test_load_day_reads_memory_mapped_columns(self, store):
+        store.write_day("2024-01-01", make_blocks()[:2])
+        columns = store.load_day("2024-01-01").columns
+
+        assert isinstance(columns["value_lo"], np.memmap)
+        assert list(columns["block"]) == [1, 1, 2, 2]
+
+
+    # tests group_by_hour #
+    def test_group_by_hour_matches_dictionary_processing(self, store):
+        blocks = make_blocks()[:2]
+        store.write_day("2024-01-01", blocks)
+
+        by_hour = store.group_by_hour("2024-01-01")
+        assert list(by_hour) == ["2024-01-01 00:00:00", "2024-01-01 01:00:00"]
+        assert [len(hour) for hour in by_hour.values()] == [2, 2]
+
+        columnar_processor, columnar_updater = process_with(by_hour.values())
+        dict_processor, dict_updater = process_with([block["transactions"] for block in blocks])
+
+        assert columnar_processor.total_transactions == dict_processor.total_transactions
+        assert columnar_processor.total_fees_wei == dict_processor.total_fees_wei
+        assert columnar_processor.total_value_wei == dict_processor.total_value_wei
+
+        for is_seller in (False, True):
+            assert TopWalletsGenerator.get_top_wallets(columnar_updater.wallets_transactions, 2, is_seller) == \
+                   TopWalletsGenerator.get_top_wallets(dict_updater.wallets_transactions, 2, is_seller)
+
+
+    # tests net_flows_wei #
+    def test_net_flows_match_dictionary_flows(self, store):
+        blocks = make_blocks()[:2]
+        transactions = [transaction for block in blocks for transaction in block["transactions"]]
+        for transaction in transactions:
+            transaction["gasUsed"] = hex(21000)
+        store.write_day("2024-01-01", blocks)
+
+        view = store.load_day("2024-01-01")
+        assert view.net_flows_wei() == BalanceLedger.get_net_flows(transactions, True)
+        assert view.net_flows_wei(False) == BalanceLedger.get_net_flows(transactions)
+
+
+    # tests wide_sum #
+    def test_wide_sum_keeps_values_above_64_bits(self, store):
+        value_wei = 50_000 * 10**18
+        store.write_day("2024-01-01", [
+            {"block_number": 1, "timestamp": DAY_START, "transactions": [make_transaction("0xa", "0xb", value_wei)] * 3}
+        ])
+
+        assert store.load_day("2024-01-01").total_value_wei() == 3 * value_wei
+
+
+    # tests AddressRegistry #
+    def test_registry_ids_survive_reload(self, store, tmp_path):
+        store.write_day("2024-01-01", make_blocks()[:2])
+
+        registry = AddressRegistry(str(tmp_path / "addresses.txt"))
+        registry.load()
+
+        assert registry.get_address(registry.get_id("0xb")) == "0xb"
+        assert registry.addresses == store.registry.addresses
+        assert registry.get_address(0) is None
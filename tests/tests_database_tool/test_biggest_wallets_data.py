@@ -0,0 +1,46 @@
+import sqlite3
+import pytest
+from unittest.mock import MagicMock
+from database_tool import DatabaseManager, BiggestWalletsData
+from files_checker import FilesChecker
+
+
+@pytest.fixture
+def biggest_wallets_data(tmp_path):
+    (tmp_path / "interesting_info").mkdir()
+    config = MagicMock()
+    config.BASE_DIR = str(tmp_path)
+    database_manager = DatabaseManager(str(tmp_path / "test.db"))
+    FilesChecker(config, database_manager).initialize_database()
+    return BiggestWalletsData(config, database_manager)
+
+
+def read_balances(tmp_path):
+    with sqlite3.connect(tmp_path / "test.db") as connection:
+        return connection.execute(
+            "SELECT wallet_address, date, balance, top_buy_date FROM wallet_balance ORDER BY wallet_address, date"
+        ).fetchall()
+
+
+class TestBiggestWalletsData:
+
+    # tests save_wallet_activity_database #
+    def test_activity_export_writes_requested_dates(self, biggest_wallets_data, tmp_path):
+        with biggest_wallets_data.db_manager as db:
+            db.execute_many("INSERT INTO wallet_activity VALUES (?, ?, ?, ?, ?)",
+                            [("0xA", 5.0, "2024-01-01", None, None), ("0xB", None, None, -2.0, "2024-01-02")])
+            db.execute_many("INSERT INTO wallet_activity_balance VALUES (?, ?, ?)",
+                            [("0xA", "2024-01-01", 1.0), ("0xA", "2024-01-02", 4.0), ("0xB", "2024-01-02", 3.0)])
+
+        assert biggest_wallets_data.save_wallet_activity_database("2024-01-02", "2024-01-02") == 2
+        assert read_balances(tmp_path) == [("0xA", "2024-01-02", 4.0, "2024-01-01"),
+                                           ("0xB", "2024-01-02", 3.0, None)]
+
+        assert biggest_wallets_data.save_wallet_activity_database() == 2
+        assert len(read_balances(tmp_path)) == 3
+
+        with sqlite3.connect(tmp_path / "test.db") as connection:
+            ranking = connection.execute(
+                "SELECT wallet_address, total_balance FROM wallet_totals ORDER BY total_balance DESC, wallet_address"
+            ).fetchall()
+        assert ranking == [("0xA", 5.0), ("0xB", 3.0)]
@@ -0,0 +1,93 @@
+import sqlite3
+import pytest
+from unittest.mock import MagicMock
+from database_tool import DatabaseManager, DataCalculator
+from files_checker import FilesChecker
+
+
+def make_entry(time, transactions=10):
+    return {
+        "time": time,
+        "transactions number": transactions,
+        "average transaction fee": 0.001,
+        "wallet classification in eth balance": {"Below 0.1 ETH": 3, "1-10 ETH": 2},
+    }
+
+
+@pytest.fixture
+def db_filename(tmp_path):
+    return str(tmp_path / "test.db")
+
+
+@pytest.fixture
+def data_calculator(db_filename):
+    database_manager = DatabaseManager(db_filename)
+    FilesChecker(MagicMock(), database_manager).initialize_database()
+    return DataCalculator(database_manager)
+
+
+def count_rows(db_filename):
+    with sqlite3.connect(db_filename) as connection:
+        return connection.execute("SELECT COUNT(*) FROM combined_data").fetchone()[0]
+
+
+class TestDataCalculator:
+
+    # tests bulk_insert #
+    def test_bulk_insert_imports_hourly_rows(self, data_calculator, db_filename):
+        entries = [make_entry(f"2024-01-01 {hour:02d}:00:00") for hour in range(24)]
+
+        assert data_calculator.bulk_insert(entries, "hourly") == 24
+        assert count_rows(db_filename) == 24
+
+
+    def test_bulk_insert_skips_duplicates(self, data_calculator, db_filename):
+        data_calculator.bulk_insert([make_entry("2024-01-01 00:00:00")], "daily")
+        data_calculator.bulk_insert([make_entry("2024-01-01 00:00:00")], "hourly")
+
+        assert data_calculator.bulk_insert([make_entry("2024-01-01 00:00:00", 99)], "daily") == 0
+        assert data_calculator.bulk_insert([make_entry("2024-01-01 00:00:00", 99)], "hourly") == 0
+        assert count_rows(db_filename) == 2
+
+
+    def test_reimport_of_migrated_day_is_skipped(self, data_calculator, db_filename):
+        with sqlite3.connect(db_filename) as connection:
+            connection.execute("INSERT INTO combined_data (data_type, date) VALUES ('daily', '2024-01-01 00:00:00')")
+            connection.execute("UPDATE combined_data SET date = DATE(date) WHERE data_type = 'daily'")
+
+        assert data_calculator.bulk_insert([make_entry("2024-01-01")], "daily") == 0
+        assert data_calculator.bulk_insert([make_entry("2024-01-01 00:00:00")], "daily") == 0
+        assert data_calculator.bulk_insert([make_entry("2024-01-02")], "daily") == 1
+        with sqlite3.connect(db_filename) as connection:
+            dates = [row[0] for row in connection.execute("SELECT date FROM combined_data ORDER BY date")]
+        assert dates == ["2024-01-01", "2024-01-02"]
+
+
+    def test_bulk_insert_commits_once(self, data_calculator, monkeypatch):
+        commits = []
+        original_connect = data_calculator.db_manager.connect
+
+        def connect():
+            original_connect()
+            connection = data_calculator.db_manager.connection
+            if not isinstance(connection, CountingConnection):
+                data_calculator.db_manager.connection = CountingConnection(connection, commits)
+
+        monkeypatch.setattr(data_calculator.db_manager, "connect", connect)
+
+        data_calculator.bulk_insert([make_entry(f"2024-01-01 {hour:02d}:00:00") for hour in range(24)], "hourly")
+
+        assert len(commits) == 1
+
+
+class CountingConnection:
+    def __init__(self, connection, commits):
+        self.connection = connection
+        self.commits = commits
+
+    def commit(self):
+        self.commits.append(True)
+        self.connection.commit()
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
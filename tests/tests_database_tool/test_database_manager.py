@@ -0,0 +1,83 @@
+import threading
+import pytest
+from database_tool import DatabaseManager
+from error_handler import CustomProcessingError
+
+
+@pytest.fixture
+def database_manager(tmp_path):
+    database_manager = DatabaseManager(str(tmp_path / "test.db"))
+    with database_manager as db:
+        db.execute_query("CREATE TABLE items (value INTEGER)")
+    yield database_manager
+    database_manager.close_all()
+
+
+def count_items(db):
+    return db.execute_query("SELECT COUNT(*) FROM items").fetchone()[0]
+
+
+class TestDatabaseManager:
+
+    # tests connect #
+    def test_connection_is_reused_within_thread(self, database_manager):
+        with database_manager as db:
+            first_connection = db.connection
+        with database_manager as db:
+            assert db.connection is first_connection
+
+
+    def test_each_thread_gets_own_connection(self, database_manager):
+        with database_manager as db:
+            main_connection = db.connection
+        thread_connections = []
+
+        def worker():
+            with database_manager as db:
+                thread_connections.append(db.connection)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        assert thread_connections[0] is not main_connection
+        assert len(database_manager.connections) == 2
+
+
+    def test_connection_of_finished_thread_is_closed(self, database_manager):
+        thread = threading.Thread(target=lambda: database_manager.connect())
+        thread.start()
+        thread.join()
+        assert thread in database_manager.connections
+
+        with database_manager as db:
+            count_items(db)
+
+        assert list(database_manager.connections) == [threading.current_thread()]
+
+
+    def test_connect_enables_wal(self, database_manager):
+        with database_manager as db:
+            assert db.execute_query("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert db.execute_query("PRAGMA synchronous").fetchone()[0] == 1
+
+
+    # tests transaction #
+    def test_transaction_rolls_back_on_error(self, database_manager):
+        with pytest.raises(CustomProcessingError):
+            with database_manager.transaction() as db:
+                db.execute_query("INSERT INTO items VALUES (1)")
+                db.execute_query("INSERT INTO missing_table VALUES (1)")
+
+        with database_manager as db:
+            assert count_items(db) == 0
+
+
+    def test_nested_transaction_joins_outer_one(self, database_manager):
+        with database_manager.transaction() as db:
+            with db.transaction():
+                db.execute_query("INSERT INTO items VALUES (1)")
+            assert db.connection.in_transaction
+
+        with database_manager as db:
+            assert count_items(db) == 1
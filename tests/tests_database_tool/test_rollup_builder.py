@@ -0,0 +1,64 @@
+import pytest
+from database_tool import DatabaseManager, DataCalculator, RollupBuilder, SchemaMigrator
+
+
+def make_hour(time, transactions, fee_sum):
+    return {"time": time, "transactions number": transactions, "average transaction fee": fee_sum / transactions,
+            "total transaction fee": fee_sum, "wallet classification in eth balance": {}}
+
+
+@pytest.fixture
+def database_manager(tmp_path):
+    database_manager = DatabaseManager(str(tmp_path / "test.db"))
+    SchemaMigrator(database_manager).migrate()
+    yield database_manager
+    database_manager.close_all()
+
+
+@pytest.fixture
+def rollup_builder(database_manager):
+    return RollupBuilder(database_manager)
+
+
+@pytest.fixture
+def data_calculator(database_manager, rollup_builder):
+    return DataCalculator(database_manager, rollup_builder)
+
+
+class TestRollupBuilder:
+
+    # tests refresh #
+    def test_hourly_import_builds_rollups(self, data_calculator, rollup_builder):
+        data_calculator.bulk_insert([make_hour("2024-01-07 10:00:00", 10, 1.0),
+                                     make_hour("2024-01-07 11:00:00", 30, 1.0),
+                                     make_hour("2024-01-08 00:00:00", 20, 2.0)], "hourly")
+
+        assert rollup_builder.get_rollups("daily") == [("2024-01-07", 40, 2.0, 0.05, 2),
+                                                       ("2024-01-08", 20, 2.0, 0.1, 1)]
+        assert rollup_builder.get_rollups("weekly") == [("2024-01-01", 40, 2.0, 0.05, 2),
+                                                        ("2024-01-08", 20, 2.0, 0.1, 1)]
+        assert rollup_builder.get_rollups("monthly") == [("2024-01-01", 60, 4.0, 4.0 / 60, 3)]
+
+
+    def test_refresh_updates_only_affected_periods(self, data_calculator, rollup_builder):
+        data_calculator.bulk_insert([make_hour("2024-01-07 10:00:00", 10, 1.0)], "hourly")
+
+        refreshed = rollup_builder.refresh({"2024-02-01"})
+        data_calculator.bulk_insert([make_hour("2024-01-07 11:00:00", 10, 3.0)], "hourly")
+
+        assert refreshed == [("daily", "2024-02-01"), ("monthly", "2024-02-01"), ("weekly", "2024-01-29")]
+        assert rollup_builder.get_rollups("daily") == [("2024-01-07", 20, 4.0, 0.2, 2)]
+
+
+    # tests migrate backfill #
+    def test_migration_backfill_matches_incremental_refresh(self, data_calculator, rollup_builder, database_manager):
+        data_calculator.bulk_insert([make_hour("2024-01-07 10:00:00", 10, 1.0),
+                                     make_hour("2024-01-08 00:00:00", 20, 2.0)], "hourly")
+        incremental = {period: rollup_builder.get_rollups(period) for period in RollupBuilder.PERIODS}
+
+        with database_manager.transaction() as db:
+            db.execute_query("DELETE FROM rollups")
+            for statement in SchemaMigrator.MIGRATIONS[5][2][3:]:
+                db.execute_query(statement)
+
+        assert {period: rollup_builder.get_rollups(period) for period in RollupBuilder.PERIODS} == incremental
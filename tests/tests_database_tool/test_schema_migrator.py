@@ -0,0 +1,53 @@
+import sqlite3
+import pytest
+from database_tool import DatabaseManager, SchemaMigrator
+
+
+@pytest.fixture
+def db_filename(tmp_path):
+    return str(tmp_path / "test.db")
+
+
+def query_plan(db_filename, query, parameters=()):
+    with sqlite3.connect(db_filename) as connection:
+        return " ".join(row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {query}", parameters))
+
+
+class TestSchemaMigrator:
+
+    # tests migrate #
+    def test_migrate_creates_schema_and_sets_version(self, db_filename):
+        migrator = SchemaMigrator(DatabaseManager(db_filename))
+
+        version = migrator.migrate()
+
+        assert version == SchemaMigrator.MIGRATIONS[-1][0]
+        assert migrator.get_version() == version
+        assert migrator.migrate() == version
+
+
+    def test_migrate_upgrades_legacy_database(self, db_filename):
+        with sqlite3.connect(db_filename) as connection:
+            connection.execute("CREATE TABLE combined_data (id INTEGER PRIMARY KEY, data_type TEXT, date DATE, "
+                               "hour INTEGER, transactions_number INTEGER, average_transaction_fee REAL)")
+            connection.executemany("INSERT INTO combined_data (data_type, date, hour) VALUES (?, ?, ?)",
+                                   [("daily", "2024-01-01", None), ("daily", "2024-01-01 00:00:00", None),
+                                    ("hourly", "2024-01-01 05:00:00", 5)])
+
+        SchemaMigrator(DatabaseManager(db_filename)).migrate()
+
+        with sqlite3.connect(db_filename) as connection:
+            rows = connection.execute("SELECT data_type, date FROM combined_data ORDER BY id").fetchall()
+        assert rows == [("daily", "2024-01-01"), ("hourly", "2024-01-01 05:00:00")]
+
+
+    def test_migrate_indexes_chart_and_wallet_queries(self, db_filename):
+        SchemaMigrator(DatabaseManager(db_filename)).migrate()
+
+        day_plan = query_plan(db_filename, "SELECT * FROM combined_data WHERE data_type = ? AND DATE(date) = DATE(?)",
+                              ("hourly", "2024-01-01"))
+        wallet_plan = query_plan(db_filename, "SELECT wallet_address FROM wallet_balance "
+                                              "GROUP BY wallet_address ORDER BY SUM(balance) DESC")
+
+        assert "idx_combined_data_day" in day_plan
+        assert "COVERING INDEX idx_wallet_balance_address_balance" in wallet_plan
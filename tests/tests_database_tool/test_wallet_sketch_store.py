@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import MagicMock
+from database_tool import DatabaseManager, DataCalculator, RollupBuilder, WalletSketchStore
+from files_checker import FilesChecker
+from blocks_extractor import WalletClassifier
+from sketches import build_wallet_sketches, build_activity_sketches
+
+
+def make_sketches(flows):
+    wallets_transactions = {wallet: [{"value": value, "type": "buy" if value > 0 else "sell"}]
+                            for wallet, value in flows.items()}
+    return {
+        **build_wallet_sketches(wallets_transactions, capacity=3, width=64, depth=3),
+        **build_activity_sketches(wallets_transactions, WalletClassifier.classify_wallet),
+    }
+
+
+def make_hour(time, flows):
+    return {"time": time, "transactions number": len(flows), "average transaction fee": 0.001}
+
+
+@pytest.fixture
+def sketch_store(tmp_path):
+    database_manager = DatabaseManager(str(tmp_path / "test.db"))
+    FilesChecker(MagicMock(), database_manager).initialize_database()
+    return WalletSketchStore(database_manager)
+
+
+class TestWalletSketchStore:
+
+    # tests get_top_wallets #
+    def test_top_wallets_over_range_merge_hourly_sketches(self, sketch_store):
+        assert sketch_store.save_sketches({
+            "2024-01-01 00:00:00": make_sketches({"0xA": 5.0, "0xB": 4.0, "0xC": 1.0, "0xD": -2.0}),
+            "2024-01-01 01:00:00": make_sketches({"0xB": 4.0, "0xE": 3.0, "0xD": -1.0}),
+            "2024-01-03 00:00:00": make_sketches({"0xC": 50.0}),
+        }) > 0
+
+        top_wallets = sketch_store.get_top_wallets("inflow", "2024-01-01", "2024-01-02", top_n=2)
+
+        assert [wallet["wallet address"] for wallet in top_wallets] == ["0xB", "0xA"]
+        assert top_wallets[0]["inflow estimate"] == 8.0
+        assert top_wallets[0]["inflow lower bound"] <= 8.0
+
+        assert sketch_store.get_top_wallets("inflow", "2024-01-03", "2024-01-03", 1)[0]["wallet address"] == "0xC"
+        assert sketch_store.estimate_flow("outflow", "0xD", "2024-01-01", "2024-01-01") >= 3.0
+        assert sketch_store.get_top_wallets("inflow", "2023-01-01", "2023-01-31") == []
+
+
+    # tests count_distinct_wallets #
+    def test_distinct_wallets_come_from_hourly_unions(self, sketch_store):
+        hours = {
+            "2024-01-01 00:00:00": {"0xA": 5.0, "0xB": 4.0},
+            "2024-01-01 01:00:00": {"0xB": 4.0, "0xC": -3.0},
+            "2024-01-02 00:00:00": {"0xD": 0.05},
+        }
+        # sketches are saved by the extractor before its results are imported #
+        sketch_store.save_sketches({time: make_sketches(flows) for time, flows in hours.items()})
+
+        data_calculator = DataCalculator(sketch_store.db_manager, RollupBuilder(sketch_store.db_manager, sketch_store))
+        data_calculator.bulk_insert([make_hour(time, flows) for time, flows in hours.items()], "hourly")
+
+        assert sketch_store.count_distinct_wallets("2024-01-01", "2024-01-01") == 3
+        assert sketch_store.count_distinct_wallets("2024-01-01", "2024-01-02") == 4
+        assert sketch_store.count_distinct_wallets("2024-01-01", "2024-01-02", "Below 0.1 ETH") == 2
+
+        with sketch_store.db_manager as db:
+            rollups = db.execute_query(
+                "SELECT period, period_start, active_wallets FROM rollups ORDER BY period, period_start"
+            ).fetchall()
+
+        assert rollups == [("daily", "2024-01-01", 3), ("daily", "2024-01-02", 1),
+                           ("monthly", "2024-01-01", 4), ("weekly", "2024-01-01", 4)]
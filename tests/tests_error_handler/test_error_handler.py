@@ -0,0 +1,53 @@
+import pytest
+from error_handler import ErrorHandler, CustomProcessingError
+
+
+@ErrorHandler.ehdc()
+class Parser:
+    def parse_all(self, values):
+        parse = ErrorHandler.unwrap(self.parse)
+        return [parse(value) for value in values]
+
+
+    def parse(self, value):
+        return self.to_int(value)
+
+
+    @staticmethod
+    @ErrorHandler.skip_ehd
+    def to_int(value):
+        return int(value, 16)
+
+
+class TestErrorHandler:
+
+    # tests ehd #
+    def test_error_is_logged_with_context_of_decorated_method(self, caplog):
+        with caplog.at_level("ERROR"):
+            with pytest.raises(CustomProcessingError) as exc_info:
+                Parser().parse("not hex")
+
+        assert isinstance(exc_info.value.original_exception, ValueError)
+        record = caplog.records[-1]
+        assert (record.ex_custom_module, record.ex_custom_className, record.ex_custom_funcName) == \
+               (__name__, "Parser", "parse")
+
+
+    # tests skip_ehd #
+    def test_skipped_helper_raises_original_exception(self):
+        with pytest.raises(ValueError):
+            Parser.to_int("not hex")
+
+
+    # tests unwrap #
+    def test_unwrapped_calls_are_handled_by_decorated_caller(self, caplog):
+        parser = Parser()
+        assert ErrorHandler.unwrap(parser.parse)("0x10") == 16
+        assert ErrorHandler.unwrap(Parser.to_int) is Parser.to_int
+
+        with caplog.at_level("ERROR"):
+            with pytest.raises(CustomProcessingError):
+                parser.parse_all(["0x1", "not hex"])
+
+        assert len(caplog.records) == 1
+        assert caplog.records[0].ex_custom_funcName == "parse_all"
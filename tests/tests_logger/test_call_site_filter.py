@@ -0,0 +1,127 @@
+import queue
+import logging
+import pytest
+from logger import CallSiteFilter, CustomFormatter, DeferredQueueHandler
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+@pytest.fixture
+def call_site_filter():
+    return CallSiteFilter()
+
+
+@pytest.fixture
+def test_logger(call_site_filter):
+    handler = RecordingHandler()
+    handler.setFormatter(CustomFormatter('%(custom_module)s.%(custom_className)s.%(custom_funcName)s - %(message)s'))
+
+    test_logger = logging.getLogger("TestCallSiteFilter")
+    test_logger.setLevel(logging.DEBUG)
+    test_logger.propagate = False
+    test_logger.addFilter(call_site_filter)
+    test_logger.addHandler(handler)
+    yield test_logger, handler
+    test_logger.removeFilter(call_site_filter)
+    test_logger.removeHandler(handler)
+
+
+class Worker:
+    def run(self, test_logger):
+        for _ in range(3):
+            test_logger.info("working")
+
+
+def log_outside_class(test_logger):
+    test_logger.info("no class")
+
+
+class TestCallSiteFilter:
+
+    # tests filter #
+    def test_class_and_function_of_call_site(self, test_logger):
+        test_logger, handler = test_logger
+        Worker().run(test_logger)
+        log_outside_class(test_logger)
+
+        assert handler.lines[0] == "test_call_site_filter.Worker.run - working"
+        assert handler.lines[-1] == "test_call_site_filter.UnknownClass.log_outside_class - no class"
+
+
+    # tests filter #
+    def test_call_site_is_resolved_once(self, test_logger, call_site_filter, monkeypatch):
+        test_logger, handler = test_logger
+        calls = []
+        resolve_class_name = CallSiteFilter.resolve_class_name
+        monkeypatch.setattr(call_site_filter, "resolve_class_name",
+                            lambda record: calls.append(record.lineno) or resolve_class_name(record))
+
+        Worker().run(test_logger)
+        Worker().run(test_logger)
+
+        assert len(handler.lines) == 6
+        assert len(calls) == 1
+
+
+    # tests filter #
+    def test_explicit_call_site_is_kept(self, test_logger):
+        test_logger, handler = test_logger
+        test_logger.info("wrapped", extra={"ex_custom_module": "blocks_download",
+                                           "ex_custom_className": "EtherAPI",
+                                           "ex_custom_funcName": "get_block"})
+
+        assert handler.lines == ["blocks_download.EtherAPI.get_block - wrapped"]
+
+
+class TestDeferredQueueHandler:
+
+    # tests prepare #
+    def test_record_is_queued_unformatted(self):
+        log_queue = queue.SimpleQueue()
+        handler = DeferredQueueHandler(log_queue)
+        test_logger = logging.getLogger("TestDeferredQueueHandler")
+        test_logger.propagate = False
+        test_logger.addHandler(handler)
+        try:
+            test_logger.warning("block %s failed", 7)
+            try:
+                raise ValueError("bad block")
+            except ValueError:
+                test_logger.exception("block %s failed", 8)
+        finally:
+            test_logger.removeHandler(handler)
+
+        record = log_queue.get_nowait()
+        assert (record.msg, record.args) == ("block %s failed", (7,))
+
+        record = log_queue.get_nowait()
+        assert record.exc_info is None
+        assert "ValueError: bad block" in record.exc_text
+        assert logging.Formatter().format(record).startswith("block 8 failed\nTraceback")
+
+
+    # tests prepare #
+    def test_record_with_mutable_args_is_formatted_before_queueing(self):
+        log_queue = queue.SimpleQueue()
+        handler = DeferredQueueHandler(log_queue)
+        test_logger = logging.getLogger("TestDeferredQueueHandler")
+        test_logger.propagate = False
+        test_logger.addHandler(handler)
+        block = {"number": 7}
+        try:
+            test_logger.warning("block %s failed", block)
+            test_logger.warning("block %(number)s failed", block)
+        finally:
+            test_logger.removeHandler(handler)
+        block["number"] = 8
+
+        records = [log_queue.get_nowait(), log_queue.get_nowait()]
+        assert [record.args for record in records] == [None, None]
+        assert [record.getMessage() for record in records] == ["block {'number': 7} failed", "block 7 failed"]
@@ -0,0 +1,163 @@
+import pytest
+import requests
+from multiprocessing import Pool
+from metrics import MetricsRegistry, MetricsServer, metrics
+from database_tool import DatabaseManager
+from blocks_download import MultiProcessor, run_with_metrics
+
+
+def download_in_worker(block_number):
+    metrics.counter("api_response_bytes_total").inc(1000)
+    metrics.histogram("api_request_duration_seconds", action="eth_getBlockByNumber").observe(0.2)
+    if block_number < 0:
+        raise ValueError("Invalid block number")
+    return block_number, 1
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+class TestMetricsRegistry:
+
+    # tests counter #
+    def test_series_are_identified_by_name_and_labels(self, registry):
+        registry.counter("api_requests_total", "Requests", action="eth_blockNumber").inc()
+        registry.counter("api_requests_total", "Requests", action="eth_blockNumber").inc(2)
+        registry.counter("api_requests_total", "Requests", action="eth_getBlockByNumber").inc()
+
+        assert registry.counter("api_requests_total", action="eth_blockNumber").value == 3
+        assert registry.counter("api_requests_total", action="eth_getBlockByNumber").value == 1
+        with pytest.raises(Exception, match="already registered as a counter"):
+            registry.histogram("api_requests_total")
+
+
+    # tests histogram #
+    def test_histogram_quantiles_follow_observations(self, registry):
+        histogram = registry.histogram("api_request_duration_seconds")
+        for value in range(1, 101):
+            histogram.observe(value / 1000)
+
+        assert histogram.count == 100
+        assert histogram.sum == pytest.approx(5.05)
+        assert 0.025 <= histogram.quantile(0.5) <= 0.05
+        assert 0.05 <= histogram.quantile(0.99) <= 0.1
+        assert histogram.quantile(1.0) == pytest.approx(0.1)
+
+
+    # tests render_prometheus #
+    def test_prometheus_text_format(self, registry):
+        registry.counter("json_bytes_read_total", "Bytes read").inc(512)
+        with registry.timer("db_query_seconds", "Statements", statement="SELECT"):
+            pass
+
+        text = registry.render_prometheus()
+
+        assert "# HELP json_bytes_read_total Bytes read\n# TYPE json_bytes_read_total counter\n" in text
+        assert "json_bytes_read_total 512\n" in text
+        assert "# TYPE db_query_seconds histogram" in text
+        assert 'db_query_seconds_bucket{statement="SELECT",le="+Inf"} 1\n' in text
+        assert 'db_query_seconds_count{statement="SELECT"} 1\n' in text
+
+
+    # tests summary and dump #
+    def test_summary_and_file_dump(self, registry, tmp_path):
+        registry.gauge("download_blocks_per_second").set(12.5)
+        registry.histogram("extraction_hour_seconds").observe(0.2)
+        registry.dump(str(tmp_path / "metrics.prom"))
+
+        summary = registry.summary()
+        assert "download_blocks_per_second: 12.5" in summary
+        assert summary[1].startswith("extraction_hour_seconds: count=1 mean=0.2000")
+        assert (tmp_path / "metrics.prom").read_text() == registry.render_prometheus()
+
+
+    def test_summary_since_snapshot_leaves_out_earlier_values(self, registry):
+        registry.counter("api_requests_total").inc(5)
+        registry.counter("api_retries_total").inc(1)
+        registry.histogram("extraction_hour_seconds").observe(4.0)
+        snapshot = registry.export_state()
+
+        registry.counter("api_requests_total").inc(2)
+        registry.histogram("extraction_hour_seconds").observe(0.2)
+
+        summary = registry.summary(since=snapshot)
+        assert "api_requests_total: 2" in summary
+        assert not any(line.startswith("api_retries_total") for line in summary)
+        assert any(line.startswith("extraction_hour_seconds: count=1 mean=0.2000") for line in summary)
+        assert "api_requests_total: 7" in registry.summary()
+
+
+    # tests export_state / merge_state #
+    def test_state_of_another_registry_is_merged(self, registry):
+        registry.counter("api_requests_total", action="eth_blockNumber").inc(2)
+        registry.histogram("api_request_duration_seconds").observe(0.1)
+        worker = MetricsRegistry()
+        worker.counter("api_requests_total", "Requests", action="eth_blockNumber").inc(3)
+        worker.gauge("download_blocks_per_second").set(4)
+        worker.histogram("api_request_duration_seconds").observe(0.3)
+
+        registry.merge_state(worker.export_state())
+
+        assert registry.counter("api_requests_total", action="eth_blockNumber").value == 5
+        assert registry.gauge("download_blocks_per_second").value == 4
+        histogram = registry.histogram("api_request_duration_seconds")
+        assert (histogram.count, histogram.min, histogram.max) == (2, 0.1, 0.3)
+        assert histogram.sum == pytest.approx(0.4)
+
+
+class TestMetricsServer:
+
+    # tests start #
+    def test_metrics_endpoint(self, registry):
+        registry.counter("blocks_downloaded_total").inc(7)
+        server = MetricsServer(registry, 0)
+        server.start()
+        try:
+            response = requests.get(f"http://127.0.0.1:{server.port}/metrics")
+            missing = requests.get(f"http://127.0.0.1:{server.port}/other")
+        finally:
+            server.stop()
+
+        assert response.status_code == 200
+        assert "blocks_downloaded_total 7" in response.text
+        assert missing.status_code == 404
+
+
+class TestInstrumentation:
+
+    # tests DatabaseManager instrumentation #
+    def test_database_statements_are_timed(self, tmp_path):
+        db_manager = DatabaseManager(str(tmp_path / "test.db"))
+        inserts = metrics.histogram("db_query_seconds", statement="INSERT")
+        inserted_rows = metrics.counter("db_rows_total", statement="INSERT")
+        count_before, rows_before = inserts.count, inserted_rows.value
+
+        with db_manager as db:
+            db.execute_query("CREATE TABLE numbers (value INTEGER)")
+            db.execute_many("INSERT INTO numbers (value) VALUES (?)", [(i,) for i in range(5)])
+            db.execute_query("INSERT INTO numbers (value) VALUES (?)", (5,))
+
+        assert inserts.count - count_before == 2
+        assert inserted_rows.value - rows_before == 5
+        assert metrics.histogram("db_query_seconds", statement="CREATE").count >= 1
+
+
+    # tests MultiProcessor.handle_worker_result #
+    def test_worker_metrics_reach_parent_registry(self):
+        bytes_counter = metrics.counter("api_response_bytes_total")
+        latency = metrics.histogram("api_request_duration_seconds", action="eth_getBlockByNumber")
+        bytes_before, count_before = bytes_counter.value, latency.count
+        results, errors = [], []
+
+        with Pool(1) as pool:
+            outcomes = [pool.apply(run_with_metrics, (download_in_worker, (block_number,))) for block_number in (7, -1)]
+
+        for outcome in outcomes:
+            MultiProcessor.handle_worker_result(outcome, results.append, errors.append)
+
+        assert results == [(7, 1)]
+        assert isinstance(errors[0], ValueError)
+        assert bytes_counter.value - bytes_before == 2000
+        assert latency.count - count_before == 2
@@ -0,0 +1,82 @@
+import os
+import time
+import pstats
+import pytest
+from unittest.mock import MagicMock
+from profiler import StageProfiler, create_profiler
+from automation import TaskGraphExecutor
+
+
+def busy_work(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+
+class TestStageProfiler:
+
+    # tests profile #
+    def test_cprofile_mode_saves_stats_under_date_tag(self, tmp_path):
+        profiler = StageProfiler(str(tmp_path), mode="cprofile")
+
+        with profiler.profile("reports_generated", "2024-01-01"):
+            busy_work(0.05)
+
+        stage_dir = tmp_path / "2024-01-01"
+        assert sorted(os.listdir(stage_dir)) == ["reports_generated.prof", "reports_generated.txt"]
+        stats = pstats.Stats(str(stage_dir / "reports_generated.prof"))
+        assert any(function == "busy_work" for _, _, function in stats.stats)
+
+
+    # tests profile #
+    def test_sampling_mode_saves_folded_stacks(self, tmp_path):
+        profiler = StageProfiler(str(tmp_path), mode="sampling", interval=0.001)
+
+        with profiler.profile("data_exported", "2024-01-01"):
+            busy_work(0.1)
+
+        lines = (tmp_path / "2024-01-01" / "data_exported.folded").read_text().splitlines()
+        assert lines
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0
+        assert any("test_stage_profiler:busy_work" in line for line in lines)
+        assert (tmp_path / "2024-01-01" / "data_exported.txt").exists()
+
+
+    # tests profile #
+    def test_disabled_profiler_writes_nothing(self, tmp_path):
+        profiler = StageProfiler(str(tmp_path), enabled=False)
+
+        with profiler.profile("data_cleaned", "2024-01-01"):
+            busy_work(0.01)
+
+        assert os.listdir(tmp_path) == []
+        with pytest.raises(Exception, match="Unknown profile mode"):
+            StageProfiler(str(tmp_path), mode="tracing")
+
+
+    # tests create_profiler #
+    def test_parallel_stages_fall_back_to_sampling(self, tmp_path):
+        config = MagicMock(PROFILE=True, PROFILE_MODE="cprofile", PROFILE_INTERVAL=0.005, PROFILE_DIR=str(tmp_path))
+
+        assert create_profiler(config).mode == "cprofile"
+        assert create_profiler(config, workers=4).mode == "sampling"
+
+
+    # tests TaskGraphExecutor.run_single_task #
+    def test_every_task_is_profiled(self, tmp_path):
+        progress_manager = MagicMock()
+        progress_manager.is_task_complete.return_value = False
+        executor = TaskGraphExecutor(progress_manager, max_workers=2, profiler=StageProfiler(str(tmp_path)))
+        tasks = [
+            {"name": "reports_generated", "function": lambda target_date: busy_work(0.01), "depends_on": []},
+            {"name": "balances_updated", "function": lambda target_date: busy_work(0.01),
+             "depends_on": ["reports_generated"]},
+        ]
+
+        executor.run("2024-01-01", tasks)
+
+        assert {"reports_generated.prof", "balances_updated.prof"} <= set(os.listdir(tmp_path / "2024-01-01"))
@@ -0,0 +1,47 @@
+import pytest
+from sketches import HyperLogLog, build_activity_sketches, load_sketch
+from blocks_extractor import WalletClassifier
+
+
+class TestHyperLogLog:
+
+    # tests count #
+    @pytest.mark.parametrize("cardinality", [0, 10, 1000, 50000])
+    def test_count_is_close_to_cardinality(self, cardinality):
+        hyperloglog = HyperLogLog(precision=12)
+        for item in range(cardinality):
+            hyperloglog.add(f"0x{item:040x}")
+
+        assert abs(hyperloglog.count() - cardinality) <= max(2, 0.05 * cardinality)
+
+
+    # tests merge #
+    def test_merge_counts_union(self):
+        first, second = HyperLogLog(), HyperLogLog()
+        for item in range(3000):
+            first.add(item)
+        for item in range(2000, 6000):
+            second.add(item)
+
+        union = HyperLogLog.from_dict(first.merge(second).to_dict())
+        assert abs(union.count() - 6000) <= 0.1 * 6000
+
+        with pytest.raises(Exception):
+            first.merge(HyperLogLog(precision=8))
+
+
+class TestBuildActivitySketches:
+
+    # tests build_activity_sketches #
+    def test_build_activity_sketches_per_bucket(self):
+        wallets_transactions = {
+            "0xA": [{"value": 5.0, "type": "buy"}],
+            "0xB": [{"value": 2.0, "type": "buy"}],
+            "0xC": [{"value": -0.5, "type": "sell"}],
+        }
+
+        sketches = build_activity_sketches(wallets_transactions, WalletClassifier.classify_wallet)
+
+        assert set(sketches) == {"active_hll", "active_hll:1-10 ETH", "active_hll:Below 0.1 ETH"}
+        assert load_sketch("active_hll", sketches["active_hll"]).count() == 3
+        assert load_sketch("active_hll:1-10 ETH", sketches["active_hll:1-10 ETH"]).count() == 2
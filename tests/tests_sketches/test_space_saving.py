@@ -0,0 +1,86 @@
+import random
+import pytest
+from sketches import SpaceSaving, CountMinSketch, build_wallet_sketches
+
+
+@pytest.fixture
+def weights():
+    generator = random.Random(7)
+    weights = {f"0x{i}": generator.random() for i in range(500)}
+    weights.update({"0xwhale": 500.0, "0xshark": 300.0, "0xdolphin": 200.0})
+    return weights
+
+
+def split_windows(weights, windows=4):
+    return [{item: weight / windows for item, weight in weights.items()} for _ in range(windows)]
+
+
+class TestSpaceSaving:
+
+    # tests update #
+    def test_update_keeps_heavy_hitters(self, weights):
+        summary = SpaceSaving(capacity=20)
+        for item, weight in weights.items():
+            summary.update(item, weight)
+
+        assert [item for item, _, _ in summary.top(3)] == ["0xwhale", "0xshark", "0xdolphin"]
+        for item, count, error in summary.top(3):
+            assert count - error <= weights[item] <= count
+
+
+    # tests merge #
+    def test_merge_of_hourly_summaries_finds_range_leaders(self, weights):
+        merged = None
+        for window in split_windows(weights):
+            summary = SpaceSaving.from_weights(window, capacity=10)
+            merged = summary if merged is None else merged.merge(summary)
+
+        assert [item for item, _, _ in merged.top(3)] == ["0xwhale", "0xshark", "0xdolphin"]
+        assert len(merged.counters) == 10
+
+
+    # tests to_dict and from_dict #
+    def test_serialization_round_trip(self, weights):
+        summary = SpaceSaving.from_weights(weights, capacity=5)
+        assert SpaceSaving.from_dict(summary.to_dict()).top(5) == summary.top(5)
+
+
+class TestCountMinSketch:
+
+    # tests estimate #
+    def test_estimate_never_undercounts(self, weights):
+        sketch = CountMinSketch(width=64, depth=4)
+        for item, weight in weights.items():
+            sketch.update(item, weight)
+
+        assert all(sketch.estimate(item) >= weight - 1e-9 for item, weight in weights.items())
+        assert sketch.estimate("0xwhale") < 500.0 + sum(weights.values()) / 64 * 4
+
+
+    # tests merge #
+    def test_merge_adds_tables(self):
+        first, second = CountMinSketch(32, 3), CountMinSketch(32, 3)
+        first.update("0xA", 2.0)
+        second.update("0xA", 3.0)
+
+        merged = CountMinSketch.from_dict(first.merge(second).to_dict())
+        assert merged.estimate("0xA") >= 5.0
+
+        with pytest.raises(Exception):
+            first.merge(CountMinSketch(16, 3))
+
+
+class TestBuildWalletSketches:
+
+    # tests build_wallet_sketches #
+    def test_build_wallet_sketches_splits_directions(self):
+        wallets_transactions = {
+            "0xA": [{"value": -3.0, "type": "sell"}, {"value": 1.0, "type": "buy"}],
+            "0xB": [{"value": 3.0, "type": "buy"}],
+        }
+
+        sketches = build_wallet_sketches(wallets_transactions, capacity=5, width=16, depth=2)
+
+        assert SpaceSaving.from_dict(sketches["inflow_topk"]).top(2) == [("0xB", 3.0, 0.0), ("0xA", 1.0, 0.0)]
+        assert SpaceSaving.from_dict(sketches["outflow_topk"]).top(2) == [("0xA", 3.0, 0.0)]
+        assert CountMinSketch.from_dict(sketches["outflow_cm"]).estimate("0xA") >= 3.0
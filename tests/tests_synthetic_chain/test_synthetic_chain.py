@@ -0,0 +1,129 @@
+import pytest
+import requests
+from collections import Counter
+from unittest.mock import MagicMock
+from synthetic_chain import SyntheticChain, SyntheticChainServer
+from blocks_download import EtherAPI, BlockService
+from blocks_extractor import TransactionProcessor
+from error_handler import CustomProcessingError
+
+
+@pytest.fixture
+def chain():
+    return SyntheticChain(seed=3, first_block=100, head_block=199, transactions_per_block=40, address_count=500)
+
+
+def create_api(server):
+    config = MagicMock()
+    config.API_URL = server.url
+    config.API_KEY = "synthetic"
+    config.RPC_URL = ""
+    return EtherAPI(config)
+
+
+class TestSyntheticChain:
+
+    # tests get_block #
+    def test_blocks_are_reproducible_and_linked(self, chain):
+        other_chain = SyntheticChain(seed=3, first_block=100, head_block=199, transactions_per_block=40, address_count=500)
+
+        assert chain.get_block(150) == other_chain.get_block(150)
+        assert chain.get_block(151)["parentHash"] == chain.get_block(150)["hash"]
+        assert int(chain.get_block(151)["timestamp"], 16) - int(chain.get_block(150)["timestamp"], 16) == 12
+        assert 32 <= len(chain.get_block(150)["transactions"]) <= 48
+        assert chain.get_block(200) is None
+
+
+    # tests generate_block #
+    def test_address_skew_concentrates_activity(self, chain):
+        senders = Counter(
+            transaction["from"] for number in range(100, 150) for transaction in chain.get_block(number)["transactions"]
+        )
+        uniform_chain = SyntheticChain(seed=3, first_block=100, transactions_per_block=40, address_count=500,
+                                       address_skew=0)
+        uniform_senders = Counter(
+            transaction["from"] for number in range(100, 150)
+            for transaction in uniform_chain.get_block(number)["transactions"]
+        )
+
+        assert senders.most_common(1)[0][1] > 5 * uniform_senders.most_common(1)[0][1]
+
+
+    # tests reorg #
+    def test_reorg_replaces_only_recent_blocks(self, chain):
+        old_hashes = {number: chain.get_block_hash(number) for number in (196, 197, 199)}
+        assert chain.reorg(3) == 197
+
+        assert chain.get_block_hash(196) == old_hashes[196]
+        assert chain.get_block_hash(197) != old_hashes[197]
+        assert chain.get_block(197)["parentHash"] == old_hashes[196]
+        assert chain.get_block(199)["parentHash"] == chain.get_block_hash(198)
+
+
+    # tests get_block_data #
+    def test_block_data_matches_block_files(self, chain):
+        block_data = chain.get_block_data(120)
+
+        assert block_data["block_number"] == 120
+        assert block_data["timestamp"] == chain.get_timestamp(120)
+        assert all(TransactionProcessor.get_fee_wei(transaction) > 0 for transaction in block_data["transactions"])
+
+
+class TestSyntheticChainServer:
+
+    # tests handle_query #
+    def test_ether_api_downloads_from_stand_in(self, chain):
+        with SyntheticChainServer(chain) as server:
+            ether_api = create_api(server)
+            ether_api.config.RPC_URL = server.url
+            block_service = BlockService(ether_api, fetch_receipts=True)
+
+            assert create_api(server).get_latest_block_number() == 199
+            assert block_service.fetch_full_block(150) == chain.get_block_data(150)
+
+
+    # tests EtherAPI.get_block_receipts #
+    def test_receipts_without_block_receipts_action(self, chain):
+        with SyntheticChainServer(chain) as server:
+            ether_api = create_api(server)
+            endpoint = ether_api._build_endpoint("proxy", "eth_getBlockReceipts", {"tag": hex(150)})
+            with pytest.raises(CustomProcessingError, match="invalid Action name"):
+                ether_api._parse_rpc_result(requests.get(endpoint))
+            with pytest.raises(CustomProcessingError, match="RPC_URL"):
+                ether_api.get_block_receipts(150)
+
+            ether_api.config.RPC_URL = server.url
+            requests_before = server.stats["requests"]
+            assert ether_api.get_block_receipts(151) == chain.get_block_receipts(151)
+            assert server.stats["requests"] == requests_before + 1
+
+
+    # tests handle_batch #
+    def test_batch_calls_are_answered_in_order(self, chain):
+        batch = [{"jsonrpc": "2.0", "id": index, "method": "eth_getBlockByNumber", "params": [hex(100 + index), False]}
+                 for index in range(5)]
+        batch.append({"jsonrpc": "2.0", "id": 5, "method": "eth_sendRawTransaction", "params": []})
+
+        with SyntheticChainServer(chain, max_batch_size=10) as server:
+            responses = requests.post(server.url, json=batch).json()
+
+        assert [response["result"]["number"] for response in responses[:5]] == [hex(100 + i) for i in range(5)]
+        assert responses[5]["error"]["code"] == -32601
+        assert server.stats["requests"] == 1
+        assert server.stats["calls"] == 5
+
+
+    # tests admit_request #
+    def test_rate_limit_and_injected_errors(self, chain):
+        with SyntheticChainServer(chain, rate_limit=2) as server:
+            responses = [requests.get(f"{server.url}?module=proxy&action=eth_blockNumber").json() for _ in range(4)]
+
+        assert responses[0]["result"] == hex(199)
+        assert SyntheticChainServer.RATE_LIMIT_RESPONSE in responses
+        assert server.stats["rate_limited"] >= 1
+
+        with SyntheticChainServer(chain, error_rate=1.0) as server:
+            with pytest.raises(CustomProcessingError):
+                create_api(server).get_latest_block_number()
+
+        assert server.stats["errors"] == 1
@@ -0,0 +1,91 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from database_tool import DatabaseManager, SchemaMigrator
+from wallets_update import WalletActivityStore, WalletInfoManager
+
+
+def make_entry(address, balance, amount, transaction_type):
+    return {
+        "wallet address": address,
+        "wallet balance": balance,
+        "biggest transaction amount in ether": amount,
+        "biggest transaction type (buy/sell)": transaction_type,
+    }
+
+
+@pytest.fixture
+def activity_store(tmp_path):
+    database_manager = DatabaseManager(str(tmp_path / "test.db"))
+    SchemaMigrator(database_manager).migrate()
+    return WalletActivityStore(database_manager)
+
+
+class TestWalletActivityStore:
+
+    # tests update_top_wallets_info #
+    def test_update_keeps_biggest_transactions(self, activity_store):
+        activity_store.update_top_wallets_info([make_entry("0xA", 10.0, 5.0, "buy")], "2024-01-01")
+        activity_store.update_top_wallets_info([make_entry("0xA", 12.0, 3.0, "buy")], "2024-01-02")
+        activity_store.update_top_wallets_info([make_entry("0xA", 2.0, -8.0, "sell")], "2024-01-03")
+        activity_store.update_top_wallets_info([make_entry("0xA", 1.0, -4.0, "sell")], "2024-01-04")
+
+        wallet_info = activity_store.get_wallets_activity()["0xA"]
+
+        assert wallet_info["top_buy_transaction"] == {"amount": 5.0, "date": "2024-01-01"}
+        assert wallet_info["top_sell_transaction"] == {"amount": -8.0, "date": "2024-01-03"}
+        assert len(wallet_info["balance_history"]) == 4
+
+
+    def test_update_keeps_first_balance_of_a_date(self, activity_store):
+        activity_store.update_top_wallets_info([make_entry("0xA", 10.0, 5.0, "buy")], "2024-01-01")
+        activity_store.update_top_wallets_info([make_entry("0xA", 99.0, 1.0, "buy")], "2024-01-01")
+
+        assert activity_store.get_balance_history("0xA") == [{"date": "2024-01-01", "balance": 10.0}]
+
+
+    # tests get_wallets_activity #
+    def test_get_wallets_activity_filters_date_range(self, activity_store):
+        for day, address in (("2024-01-01", "0xA"), ("2024-01-02", "0xB"), ("2024-01-03", "0xA")):
+            activity_store.update_top_wallets_info([make_entry(address, 1.0, 1.0, "buy")], day)
+
+        wallets_activity = activity_store.get_wallets_activity("2024-01-02", "2024-01-03")
+
+        assert sorted(wallets_activity) == ["0xA", "0xB"]
+        assert wallets_activity["0xA"]["balance_history"] == [{"date": "2024-01-03", "balance": 1.0}]
+
+
+    # tests export_json and import_json #
+    def test_export_and_import_round_trip(self, activity_store, tmp_path):
+        activity_store.update_top_wallets_info(
+            [make_entry("0xA", 10.0, 5.0, "buy"), make_entry("0xB", -3.0, -3.0, "sell")], "2024-01-01"
+        )
+        activity_store.export_json(str(tmp_path / "activity.json"))
+
+        database_manager = DatabaseManager(str(tmp_path / "imported.db"))
+        SchemaMigrator(database_manager).migrate()
+        imported_store = WalletActivityStore(database_manager)
+        assert imported_store.is_empty()
+
+        assert imported_store.import_json(str(tmp_path / "activity.json")) == 2
+        assert imported_store.get_wallets_activity() == activity_store.get_wallets_activity()
+
+
+class TestWalletInfoManager:
+
+    # tests save_top_wallets_info #
+    def test_save_top_wallets_info_updates_only_daily_wallets(self, activity_store, tmp_path):
+        (tmp_path / "interesting_info").mkdir()
+        with open(tmp_path / "interesting_info" / "2024-01-01_daily_data.json", "w") as file:
+            json.dump({
+                "time": "2024-01-01",
+                "top 5 buyers": [make_entry("0xA", 10.0, 5.0, "buy")],
+                "top 5 sellers": [make_entry("0xB", -3.0, -3.0, "sell")],
+            }, file)
+
+        config = MagicMock()
+        config.BASE_DIR = str(tmp_path)
+        manager = WalletInfoManager(config, activity_store)
+
+        assert manager.save_top_wallets_info("2024-01-01_daily_data.json") == ["0xA", "0xB"]
+        assert activity_store.get_balance_history("0xB") == [{"date": "2024-01-01", "balance": -3.0}]
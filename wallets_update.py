@@ -1,94 +1,155 @@
 import os
 import json
 from config import Config
+from database_tool import DatabaseManager, SchemaMigrator
 from error_handler import ErrorHandler
 from logger import logger
 
 
 @ErrorHandler.ehdc()
-class WalletInfoUpdater:
-    def update_top_wallets_info(self, top_wallets_info, new_data, timestamp):
+class WalletActivityStore:
+    # the first balance recorded for a wallet on a given date is kept #
+    BALANCE_INSERT_QUERY = '''
+        INSERT INTO wallet_activity_balance (wallet_address, date, balance) VALUES (?, ?, ?)
+        ON CONFLICT(wallet_address, date) DO NOTHING
+    '''
+
+    # a missing transaction type (NULL) never replaces a recorded one #
+    ACTIVITY_UPSERT_QUERY = '''
+        INSERT INTO wallet_activity (
+            wallet_address, top_buy_amount, top_buy_date, top_sell_amount, top_sell_date
+        ) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(wallet_address) DO UPDATE SET
+            top_buy_amount = CASE WHEN excluded.top_buy_amount > IFNULL(top_buy_amount, excluded.top_buy_amount - 1)
+                             THEN excluded.top_buy_amount ELSE top_buy_amount END,
+            top_buy_date = CASE WHEN excluded.top_buy_amount > IFNULL(top_buy_amount, excluded.top_buy_amount - 1)
+                           THEN excluded.top_buy_date ELSE top_buy_date END,
+            top_sell_amount = CASE WHEN excluded.top_sell_amount < IFNULL(top_sell_amount, excluded.top_sell_amount + 1)
+                              THEN excluded.top_sell_amount ELSE top_sell_amount END,
+            top_sell_date = CASE WHEN excluded.top_sell_amount < IFNULL(top_sell_amount, excluded.top_sell_amount + 1)
+                            THEN excluded.top_sell_date ELSE top_sell_date END
+    '''
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def is_empty(self):
+        with self.db_manager as db:
+            return db.execute_query('SELECT 1 FROM wallet_activity LIMIT 1').fetchone() is None
+
+    def update_top_wallets_info(self, new_data, timestamp):
+        activity_rows = []
+        balance_rows = []
+
         for wallet_data in new_data:
             address = wallet_data["wallet address"]
-            balance = wallet_data["wallet balance"]
             transaction_amount = wallet_data["biggest transaction amount in ether"]
             transaction_type = wallet_data["biggest transaction type (buy/sell)"]
 
-            if address in top_wallets_info:
-                self._update_existing_wallet(
-                    top_wallets_info[address], balance, transaction_amount, transaction_type, timestamp)
-            else:
-                self._add_new_wallet(top_wallets_info,
-                                     address,
-                                     balance,
-                                     transaction_amount,
-                                     transaction_type,
-                                     timestamp
-                                     )
-
-                logger.info(f"New wallet added with balance {balance} ETH "
-                            f"and biggest {transaction_type} transaction {transaction_amount} ETH"
-                            )
-
-    def _update_existing_wallet(self, wallet_info, balance, transaction_amount, transaction_type, timestamp):
-        if not any(entry["date"] == timestamp for entry in wallet_info["balance_history"]):
-            wallet_info["balance_history"].append({"date": timestamp, "balance": balance})
-
-        if transaction_type == "buy":
-            if (wallet_info["top_buy_transaction"] is None or
-                transaction_amount > wallet_info["top_buy_transaction"]["amount"]):
-                wallet_info["top_buy_transaction"] = {
-                    "amount": transaction_amount, "date": timestamp
-                }
-
-            logger.info(f"New top buy transaction recorded for existing wallet: {transaction_amount} ETH")
-
-        elif transaction_type == "sell":
-            if (wallet_info["top_sell_transaction"] is None or
-                transaction_amount < wallet_info["top_sell_transaction"]["amount"]):
-                wallet_info["top_sell_transaction"] = {
-                    "amount": transaction_amount, "date": timestamp
+            activity_rows.append((
+                address,
+                transaction_amount if transaction_type == "buy" else None,
+                timestamp if transaction_type == "buy" else None,
+                transaction_amount if transaction_type == "sell" else None,
+                timestamp if transaction_type == "sell" else None,
+            ))
+            balance_rows.append((address, timestamp, wallet_data["wallet balance"]))
+
+        with self.db_manager as db:
+            with db.transaction():
+                db.execute_many(self.ACTIVITY_UPSERT_QUERY, activity_rows)
+                db.execute_many(self.BALANCE_INSERT_QUERY, balance_rows)
+
+        logger.info(f"Wallet activity updated for {len(activity_rows)} wallets on {timestamp}.")
+        return [row[0] for row in activity_rows]
+
+    def get_balance_history(self, wallet_address, start_date=None, end_date=None):
+        with self.db_manager as db:
+            rows = db.execute_query('''
+                SELECT date, balance FROM wallet_activity_balance
+                WHERE wallet_address = ? AND date BETWEEN ? AND ?
+                ORDER BY date
+            ''', (wallet_address, start_date or "0000-00-00", end_date or "9999-99-99")).fetchall()
+
+        return [{"date": date, "balance": balance} for date, balance in rows]
+
+    # same structure as the former Biggest_wallets_activity.json, limited to wallets active in the range #
+    def get_wallets_activity(self, start_date=None, end_date=None):
+        with self.db_manager as db:
+            rows = db.execute_query('''
+                SELECT b.wallet_address, b.date, b.balance,
+                       a.top_buy_amount, a.top_buy_date, a.top_sell_amount, a.top_sell_date
+                FROM wallet_activity_balance AS b
+                JOIN wallet_activity AS a ON a.wallet_address = b.wallet_address
+                WHERE b.date BETWEEN ? AND ?
+                ORDER BY b.wallet_address, b.date
+            ''', (start_date or "0000-00-00", end_date or "9999-99-99")).fetchall()
+
+        wallets_activity = {}
+        for address, date, balance, buy_amount, buy_date, sell_amount, sell_date in rows:
+            if address not in wallets_activity:
+                wallets_activity[address] = {
+                    "balance_history": [],
+                    "top_buy_transaction": {"amount": buy_amount, "date": buy_date} if buy_date else None,
+                    "top_sell_transaction": {"amount": sell_amount, "date": sell_date} if sell_date else None,
                 }
+            wallets_activity[address]["balance_history"].append({"date": date, "balance": balance})
 
-            logger.info(f"New top sell transaction recorded for existing wallet: {transaction_amount} ETH")
+        return wallets_activity
 
+    def export_json(self, output_file_path, start_date=None, end_date=None):
+        wallets_activity = self.get_wallets_activity(start_date, end_date)
 
-    def _add_new_wallet(self, top_wallets_info, address, balance, transaction_amount, transaction_type, timestamp):
-        top_buy_transaction = {
-            "amount": transaction_amount,
-            "date": timestamp
-        } if transaction_type == "buy" else None
-
-        top_sell_transaction = {
-            "amount": transaction_amount,
-            "date": timestamp
-        } if transaction_type == "sell" else None
+        with open(output_file_path, 'w') as output_file:
+            json.dump(wallets_activity, output_file, indent=4)
 
-        top_wallets_info[address] = {
-            "balance_history": [{"date": timestamp, "balance": balance}],
-            "top_buy_transaction": top_buy_transaction,
-            "top_sell_transaction": top_sell_transaction
-        }
+        logger.info(f"Exported activity of {len(wallets_activity)} wallets to {output_file_path}.")
+        return len(wallets_activity)
 
-        logger.info(f"New wallet added with initial balance {balance}")
+    def import_json(self, input_file_path):
+        with open(input_file_path, 'r') as input_file:
+            wallets_activity = json.load(input_file)
+
+        activity_rows = []
+        balance_rows = []
+        for address, wallet_info in wallets_activity.items():
+            top_buy_transaction = wallet_info.get("top_buy_transaction") or {}
+            top_sell_transaction = wallet_info.get("top_sell_transaction") or {}
+            activity_rows.append((
+                address,
+                top_buy_transaction.get("amount"), top_buy_transaction.get("date"),
+                top_sell_transaction.get("amount"), top_sell_transaction.get("date"),
+            ))
+            balance_rows.extend(
+                (address, entry["date"], entry["balance"]) for entry in wallet_info.get("balance_history", [])
+            )
+
+        with self.db_manager as db:
+            with db.transaction():
+                db.execute_many(self.ACTIVITY_UPSERT_QUERY, activity_rows)
+                db.execute_many(self.BALANCE_INSERT_QUERY, balance_rows)
+
+        logger.info(f"Imported activity of {len(activity_rows)} wallets from {input_file_path}.")
+        return len(activity_rows)
 
 
 @ErrorHandler.ehdc()
 class WalletInfoManager:
-    def __init__(self, config, updater):
-        self.config = config        
-        self.updater = updater
+    def __init__(self, config, activity_store):
+        self.config = config
+        self.activity_store = activity_store
 
     def save_top_wallets_info(self, input_file_name, progress_callback=None, check_interrupt=None):
         INPUT_FILE_PATH = os.path.join(self.config.BASE_DIR, "interesting_info", input_file_name)
 
         new_data, timestamp = self._load_new_data(INPUT_FILE_PATH)
-        top_wallets_info = self._load_existing_data(self.config.OUTPUT_FILE_PATH)
-
-        self.updater.update_top_wallets_info(top_wallets_info, new_data, timestamp)
-        self._save_data(self.config.OUTPUT_FILE_PATH, top_wallets_info)
+        updated_wallets = self.activity_store.update_top_wallets_info(new_data, timestamp)
 
         logger.info('Biggest wallets data updated!')
+        return updated_wallets
+
+    def export_wallets_activity(self, output_file_path=None, start_date=None, end_date=None):
+        return self.activity_store.export_json(output_file_path or self.config.OUTPUT_FILE_PATH, start_date, end_date)
 
     def _load_new_data(self, input_file_path):
         with open(input_file_path, 'r') as input_file:
@@ -97,29 +158,28 @@ class WalletInfoManager:
             timestamp = data["time"]
         return new_data, timestamp
 
-    def _load_existing_data(self, output_file_path):
-        with open(output_file_path, 'r') as output_file:
-            return json.load(output_file)
-
-    def _save_data(self, output_file_path, data):
-        with open(output_file_path, 'w') as output_file:
-            json.dump(data, output_file, indent=4)
-
 
 @ErrorHandler.ehdc()
 class WalletUpdaterFactory:
     @staticmethod
-    def create_wallets_updater():
-        config = Config()
-        updater = WalletInfoUpdater()
-        manager = WalletInfoManager(config, updater)
+    def create_wallets_updater(config=None):
+        config = config or Config()
+        db_manager = DatabaseManager.get_shared(config.DB_FILENAME, config.DB_CACHE_SIZE_KB, config.DB_MMAP_SIZE)
+        SchemaMigrator(db_manager).migrate()
+        activity_store = WalletActivityStore(db_manager)
+
+        # history tracked in the JSON file before the store existed is imported once #
+        if activity_store.is_empty() and os.path.exists(config.OUTPUT_FILE_PATH):
+            activity_store.import_json(config.OUTPUT_FILE_PATH)
+
+        manager = WalletInfoManager(config, activity_store)
         return manager
 
 
 if __name__ == "__main__":
     """
-    Mainly for testing    
+    Mainly for testing
     """
     input_file_name = "2024-10-02_daily_data.json"
     manager = WalletUpdaterFactory.create_wallets_updater()
-    manager.save_top_wallets_info(input_file_name)
\ No newline at end of file
+    manager.save_top_wallets_info(input_file_name)